@@ -0,0 +1,80 @@
+"""Count FSM storage lookups made by DestinyMiddleware per update, with and without the state index.
+
+Run: python -m benchmarks.destiny_lookups
+"""
+import asyncio
+import random
+from unittest.mock import Mock
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.handlers.bowel_movement import BowelMovementStates
+from bot.handlers.constants import (
+    BowelMovementCallbackKey, BowelMovementMessageCommand, MainCallbackKey, MainMessageCommand
+)
+from bot.middlewares.fsm_destiny import BOWEL_MOVEMENT, DestinyMiddleware
+from database.fsm_storage import StateIndex
+
+BOT_ID = 1
+USERS = 1_000
+UPDATES = 20_000
+WAITING_SHARE = 0.05
+TEXTS = [
+    "/start", MainMessageCommand.HELP.value, MainMessageCommand.USER_SETTINGS.value, "some random text",
+    BowelMovementMessageCommand.START_BOWEL_MOVEMENT.value,
+]
+CALLBACKS = [BowelMovementCallbackKey.STOOL_CONSISTENCY.value + ":4", MainCallbackKey.SETTINGS_TIMEZONE]
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lookups = 0
+
+    async def get_state(self, key: StorageKey):
+        self.lookups += 1
+        return await super().get_state(key)
+
+
+def make_update(rng: random.Random, user_id: int) -> Mock:
+    if rng.random() < 0.2:
+        return Mock(message=None, callback_query=Mock(data=rng.choice(CALLBACKS)))
+    message = Mock(text=rng.choice(TEXTS))
+    message.bot.id = BOT_ID
+    message.chat.id = user_id
+    message.from_user.id = user_id
+    return Mock(message=message, callback_query=None)
+
+
+async def run(use_index: bool) -> float:
+    rng = random.Random(42)
+    storage = CountingStorage()
+    state_index = StateIndex([BowelMovementStates.waiting_for_notes.state]) if use_index else None
+    waiting = []
+    for user_id in rng.sample(range(USERS), int(USERS * WAITING_SHARE)):
+        key = StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id, destiny=BOWEL_MOVEMENT)
+        await storage.set_state(key, BowelMovementStates.waiting_for_notes)
+        waiting.append(key)
+    if state_index is not None:
+        state_index.load(waiting)
+
+    async def handler(event, data):
+        return None
+
+    middleware = DestinyMiddleware(storage, state_index=state_index)
+    for _ in range(UPDATES):
+        await middleware(handler, make_update(rng, rng.randrange(USERS)), {})
+    return storage.lookups / UPDATES
+
+
+async def main() -> None:
+    before = await run(use_index=False)
+    after = await run(use_index=True)
+    print(f"updates: {UPDATES}, users: {USERS}, awaiting notes: {WAITING_SHARE:.0%}")
+    print(f"storage lookups per update without index: {before:.3f}")
+    print(f"storage lookups per update with index:    {after:.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
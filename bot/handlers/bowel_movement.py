@@ -1,10 +1,18 @@
+import logging
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
+
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery
 from pydantic import BaseModel, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.handlers.callback_routes import CallbackKeyFilter
 from bot.handlers.constants import BowelMovementMessageCommand, BowelMovementCallbackKey, \
     BackFromDeleteBowelMovementToPosition
 from bot.keyboards.bowel_movement import get_stool_consistency_msg_keyboard, get_skip_notes_keyboard, \
@@ -12,11 +20,14 @@ from bot.keyboards.bowel_movement import get_stool_consistency_msg_keyboard, get
     get_bowel_movement_init_text, get_blood_msg_text, get_blood_msg_keyboard, get_mucus_msg_text, \
     get_mucus_msg_keyboard, \
     get_msg_text_delete_record, get_result_msg_inline_keyboard, get_bowel_movement_init_keyboard, \
-    get_stool_consistency_msg_text, get_msg_confirm_delete_record_text, get_msg_confirm_delete_record_keyboard
-from database.models import User
+    get_stool_consistency_msg_text, get_msg_confirm_delete_record_text, get_msg_confirm_delete_record_keyboard, \
+    get_stats_msg_text
 from database.models.bowel_movement import BowelMovement
 from service.bowel_movement import BowelMovementService
-from service.user import UserService
+from service.user import UserProfile, UserService
+from service.utils import local_today
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -32,60 +43,115 @@ class BowelMovementStates(StatesGroup):
 
 
 class BowelMovementStateData(BaseModel):
-    bowel_movement_id: int
+    """Draft of the bowel movement being recorded, kept in the FSM data until it is saved"""
     bowel_movement_msg_id: int
     chat_id: int
+    started_at: datetime
+    stool_consistency: Optional[int] = None
+    mucus: Optional[int] = None
+    blood_lvl: Optional[int] = None
 
 
-@router.message(F.text == BowelMovementMessageCommand.START_BOWEL_MOVEMENT)
-async def start_bowel_movement_recording(
-        message: Message,
-        state: FSMContext,
+async def get_draft(state: FSMContext) -> Optional[BowelMovementStateData]:
+    try:
+        return BowelMovementStateData.model_validate(await state.get_data())
+    except ValidationError:
+        return None
+
+
+async def save_draft(
         session: AsyncSession,
-        bowel_movement_service: BowelMovementService
-):
-    """Start the bowel movement recording process"""
+        bowel_movement_service: BowelMovementService,
+        user_id: int,
+        draft: BowelMovementStateData,
+        notes: Optional[str] = None,
+        is_false_urge: bool = False,
+) -> BowelMovement:
+    """Persist the draft with a single INSERT"""
+    return await bowel_movement_service.create_bowel_movement(
+        session=session,
+        user_id=user_id,
+        movement_date=draft.started_at.astimezone().date(),
+        movement_time=draft.started_at,
+        notes=notes,
+        stool_consistency=draft.stool_consistency,
+        mucus=draft.mucus,
+        blood_lvl=draft.blood_lvl,
+        is_false_urge=is_false_urge,
+    )
+
+
+async def show_saved_result(message: Message, bowel_movement: BowelMovement, timezone_offset: int, edit) -> None:
+    """
+    Turn the draft message into the result one. The record is saved before this is called,
+    so a failed edit (message deleted or too old) falls back to a new message instead of failing the update
+    """
+    text = get_result_msg_text(bowel_movement, timezone_offset)
+    reply_markup = get_result_msg_inline_keyboard(bowel_movement.id)
+    try:
+        await edit(text=text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        logger.warning("Failed to edit draft message of record %s: %s", bowel_movement.id, e)
+        await message.answer(text=text, reply_markup=reply_markup)
+
+
+@router.message(F.text == BowelMovementMessageCommand.START_BOWEL_MOVEMENT)
+async def start_bowel_movement_recording(message: Message, state: FSMContext):
+    """Start the bowel movement recording process, nothing is written to the database until it is finished"""
     current_state = await state.get_state()
     # Get all states from the BowelMovementStates group
     bowel_movement_states = [s.state for s in BowelMovementStates.__states__]
     if current_state in bowel_movement_states:
         await message.answer(text="Пожалуйста, завершите предыдущую запись")
         return
-    bowel_movement: BowelMovement = await bowel_movement_service.create_bowel_movement(session, message.from_user.id)
+    started_at = datetime.now(timezone.utc)
     sent_msg: Message = await message.answer(
         text=get_bowel_movement_init_text(),
-        reply_markup=get_bowel_movement_init_keyboard(bowel_movement.id)
-    )
-    await state.update_data(
-        bowel_movement_id=bowel_movement.id,
-        bowel_movement_msg_id=sent_msg.message_id,
-        chat_id=sent_msg.chat.id
+        reply_markup=get_bowel_movement_init_keyboard()
     )
+    await state.set_data({
+        "bowel_movement_msg_id": sent_msg.message_id,
+        "chat_id": sent_msg.chat.id,
+        "started_at": started_at.isoformat(),
+    })
     await state.set_state(BowelMovementStates.init_conditional)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.DELETE_CONFIRMATION))
+# Registered before save_notes, otherwise the command typed during a draft is saved as its notes
+@router.message(Command("stats"))
+@router.message(F.text == BowelMovementMessageCommand.STATS)
+async def show_stats(message: Message, session: AsyncSession, bowel_movement_service: BowelMovementService,
+                     user_service: UserService):
+    """Show statistics of the last 30 days from the daily rollup"""
+    user: UserProfile = await user_service.get_user_profile(session, message.from_user.id)
+    summary = await bowel_movement_service.get_stats(
+        session, message.from_user.id, end_date=local_today(user.timezone_offset)
+    )
+    await message.answer(text=get_stats_msg_text(summary))
+
+
+async def _record_not_found(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.message.edit_text(
+        text="Запись не найдена. Начните новую запись.",
+        reply_markup=None,
+    )
+    await state.clear()
+
+
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.DELETE_CONFIRMATION))
 async def delete_bowel_movement_confirmation(
         callback: CallbackQuery,
         state: FSMContext,
 ):
-    try:
-        state_data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-        bowel_movement_id: int = state_data.bowel_movement_id
-    except ValidationError:
-        bowel_movement_id = BowelMovementService.parse_optional_int(callback.data)
-    if bowel_movement_id is None:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
-        return
-    current_state = await state.get_state()
-    if current_state is None:
+    # The result message carries the id of the saved record, a draft has none yet
+    bowel_movement_id = BowelMovementService.parse_optional_int(callback.data)
+    if bowel_movement_id is not None:
         back_to: BackFromDeleteBowelMovementToPosition = BackFromDeleteBowelMovementToPosition.FINAL_STEP
-    else:
+    elif await get_draft(state) is not None:
         back_to = BackFromDeleteBowelMovementToPosition.INIT_STEP
+    else:
+        await _record_not_found(callback, state)
+        return
     await callback.message.edit_text(
         text=get_msg_confirm_delete_record_text(),
         reply_markup=get_msg_confirm_delete_record_keyboard(
@@ -96,42 +162,41 @@ async def delete_bowel_movement_confirmation(
     await state.set_state(BowelMovementStates.delete_confirmation)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION))
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION))
 async def back_from_delete_confirmation(
         callback: CallbackQuery,
         session: AsyncSession,
         state: FSMContext,
         bowel_movement_service: BowelMovementService,
 ):
+    data_from_callback: list[str] = callback.data.split('|')
     try:
-        data_from_callback: list[str] = callback.data.split('|')
         back_to: str = data_from_callback[0].split(':')[1]
-        bowel_movement_id: int = int(data_from_callback[1].split(':')[1])
-    except (IndexError, ValueError):
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
+    except IndexError:
+        await _record_not_found(callback, state)
         return
     if back_to == BackFromDeleteBowelMovementToPosition.INIT_STEP:
+        if await get_draft(state) is None:
+            await _record_not_found(callback, state)
+            return
         await callback.message.edit_text(
             text=get_bowel_movement_init_text(),
-            reply_markup=get_bowel_movement_init_keyboard(bowel_movement_id)
+            reply_markup=get_bowel_movement_init_keyboard()
         )
         await state.set_state(BowelMovementStates.init_conditional)
     else:
+        try:
+            bowel_movement_id: int = int(data_from_callback[1].split(':')[1])
+        except (IndexError, ValueError):
+            await _record_not_found(callback, state)
+            return
         bowel_movement: BowelMovement = await bowel_movement_service.get_bowel_movement_by_id(
             bowel_movement_id=bowel_movement_id,
             session=session,
             user_id=callback.from_user.id,
         )
         if bowel_movement is None:
-            await callback.message.edit_text(
-                text="Запись не найдена. Начните новую запись.",
-                reply_markup=None,
-            )
-            await state.clear()
+            await _record_not_found(callback, state)
             return
         await callback.message.edit_text(
             text=get_result_msg_text(bowel_movement=bowel_movement),
@@ -140,7 +205,7 @@ async def back_from_delete_confirmation(
         await state.clear()
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.DELETE_RECORD))
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.DELETE_RECORD))
 async def delete_bowel_movement(
         callback: CallbackQuery,
         state: FSMContext,
@@ -149,17 +214,16 @@ async def delete_bowel_movement(
 ):
     bowel_movement_id = BowelMovementService.parse_optional_int(callback.data)
     if bowel_movement_id is None:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
+        # A draft was never saved, dropping the FSM data is enough
+        if await get_draft(state) is None:
+            await _record_not_found(callback, state)
+            return
+    else:
+        await bowel_movement_service.delete_bowel_movement(
+            session=session,
+            bowel_movement_id=bowel_movement_id,
+            user_id=callback.from_user.id,
         )
-        await state.clear()
-        return
-    await bowel_movement_service.delete_bowel_movement(
-        session=session,
-        bowel_movement_id=bowel_movement_id,
-        user_id=callback.from_user.id,
-    )
     await callback.message.edit_text(
         text=get_msg_text_delete_record(),
         reply_markup=None,
@@ -167,27 +231,20 @@ async def delete_bowel_movement(
     await state.clear()
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.FALSE_URGE)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.FALSE_URGE))
 async def set_false_urge_to_bowel_movement(
         callback: CallbackQuery,
         state: FSMContext,
         session: AsyncSession,
         bowel_movement_service: BowelMovementService
 ):
-    state_data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-    bowel_movement: BowelMovement = await bowel_movement_service.update_bowel_movement(
-        session=session,
-        bowel_movement_id=state_data.bowel_movement_id,
-        is_false_urge=True,
-        user_id=callback.from_user.id,
-    )
-    if bowel_movement is None:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
+    draft = await get_draft(state)
+    if draft is None:
+        await _record_not_found(callback, state)
         return
+    bowel_movement: BowelMovement = await save_draft(
+        session, bowel_movement_service, callback.from_user.id, draft, is_false_urge=True
+    )
     await callback.message.edit_text(
         text=get_result_msg_text(bowel_movement),
         reply_markup=get_result_msg_inline_keyboard(bowel_movement.id)
@@ -195,7 +252,7 @@ async def set_false_urge_to_bowel_movement(
     await state.clear()
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.GO_TO_STOOL_CONSISTENCY)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.GO_TO_STOOL_CONSISTENCY))
 async def stool_consistency_msg(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
         text=get_stool_consistency_msg_text(),
@@ -204,20 +261,12 @@ async def stool_consistency_msg(callback: CallbackQuery, state: FSMContext):
     await state.set_state(BowelMovementStates.stool_consistency)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.STOOL_CONSISTENCY))
-async def add_stool_consistency(callback: CallbackQuery, state: FSMContext, session: AsyncSession,
-                                bowel_movement_service: BowelMovementService):
-    """Add information about stool consistency to the bowel movement"""
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.STOOL_CONSISTENCY))
+async def add_stool_consistency(callback: CallbackQuery, state: FSMContext):
+    """Add information about stool consistency to the draft"""
     stool_consistency_val: int | None = BowelMovementService.parse_optional_int(callback.data)
     if stool_consistency_val is not None:
-        state_data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-        bowel_movement_id = state_data.bowel_movement_id
-        await bowel_movement_service.update_bowel_movement(
-            session=session,
-            bowel_movement_id=bowel_movement_id,
-            stool_consistency=stool_consistency_val,
-            user_id=callback.from_user.id,
-        )
+        await state.update_data(stool_consistency=stool_consistency_val)
     await callback.message.edit_text(
         text=get_mucus_msg_text(),
         reply_markup=get_mucus_msg_keyboard(),
@@ -225,37 +274,23 @@ async def add_stool_consistency(callback: CallbackQuery, state: FSMContext, sess
     await state.set_state(BowelMovementStates.mucus)
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.BACK_FROM_STOOL_CONSISTENCY)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.BACK_FROM_STOOL_CONSISTENCY))
 async def back_from_stool_consistency_to_init_conditional(callback: CallbackQuery, state: FSMContext):
-    try:
-        bowel_movement_id = BowelMovementStateData.model_validate(await state.get_data()).bowel_movement_id
-    except ValidationError:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
+    if await get_draft(state) is None:
+        await _record_not_found(callback, state)
         return
     await callback.message.edit_text(
         text=get_bowel_movement_init_text(),
-        reply_markup=get_bowel_movement_init_keyboard(bowel_movement_id)
+        reply_markup=get_bowel_movement_init_keyboard()
     )
     await state.set_state(BowelMovementStates.init_conditional)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.STOOL_MUCUS))
-async def add_stool_mucus(callback: CallbackQuery, state: FSMContext, session: AsyncSession,
-                          bowel_movement_service: BowelMovementService):
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.STOOL_MUCUS))
+async def add_stool_mucus(callback: CallbackQuery, state: FSMContext):
     mucus: int | None = BowelMovementService.parse_optional_int(callback.data)
     if mucus is not None:
-        state_data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-        bowel_movement_id = state_data.bowel_movement_id
-        await bowel_movement_service.update_bowel_movement(
-            session=session,
-            bowel_movement_id=bowel_movement_id,
-            mucus=mucus,
-            user_id=callback.from_user.id,
-        )
+        await state.update_data(mucus=mucus)
     await callback.message.edit_text(
         text=get_blood_msg_text(),
         reply_markup=get_blood_msg_keyboard(),
@@ -263,7 +298,7 @@ async def add_stool_mucus(callback: CallbackQuery, state: FSMContext, session: A
     await state.set_state(BowelMovementStates.blood)
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.BACK_FROM_MUCUS)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.BACK_FROM_MUCUS))
 async def back_from_mucus_to_stool_consistency(callback: CallbackQuery, state: FSMContext):
     """Back to the stool consistency recording process"""
     await callback.message.edit_text(
@@ -273,20 +308,12 @@ async def back_from_mucus_to_stool_consistency(callback: CallbackQuery, state: F
     await state.set_state(BowelMovementStates.stool_consistency)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.STOOL_BLOOD))
-async def add_stool_blood(callback: CallbackQuery, state: FSMContext, session: AsyncSession,
-                          bowel_movement_service: BowelMovementService):
-    """Add information about stool blood level to the bowel movement"""
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.STOOL_BLOOD))
+async def add_stool_blood(callback: CallbackQuery, state: FSMContext):
+    """Add information about stool blood level to the draft"""
     blood_lvl: int | None = BowelMovementService.parse_optional_int(callback.data)
     if blood_lvl is not None:
-        state_data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-        bowel_movement_id = state_data.bowel_movement_id
-        await bowel_movement_service.update_bowel_movement(
-            session=session,
-            bowel_movement_id=bowel_movement_id,
-            blood_lvl=blood_lvl,
-            user_id=callback.from_user.id,
-        )
+        await state.update_data(blood_lvl=blood_lvl)
     await callback.message.edit_text(
         text="Если хотите оставить заметку, пришлите ее в сообщении\nИли пропустите этот шаг",
         reply_markup=get_skip_notes_keyboard()
@@ -294,7 +321,7 @@ async def add_stool_blood(callback: CallbackQuery, state: FSMContext, session: A
     await state.set_state(BowelMovementStates.waiting_for_notes)
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.BACK_FROM_BLOOD)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.BACK_FROM_BLOOD))
 async def back_from_blood_to_mucus_state(callback: CallbackQuery, state: FSMContext):
     """Back to the mucus recording process"""
     await callback.message.edit_text(
@@ -307,72 +334,46 @@ async def back_from_blood_to_mucus_state(callback: CallbackQuery, state: FSMCont
 @router.message(BowelMovementStates.waiting_for_notes)
 async def save_notes(message: Message, state: FSMContext, session: AsyncSession,
                      bowel_movement_service: BowelMovementService, user_service: UserService):
-    """Save notes"""
-    try:
-        data: BowelMovementStateData = BowelMovementStateData.model_validate(await state.get_data())
-    except ValidationError:
+    """Save the draft with notes"""
+    draft = await get_draft(state)
+    if draft is None:
         await message.answer(text="Запись не найдена. Начните новую запись.")
         await state.clear()
         return
-    bowel_movement_id = data.bowel_movement_id
-    bot_msg_id = data.bowel_movement_msg_id
-    chat_id = data.chat_id
-    bowel_movement: BowelMovement = await bowel_movement_service.update_bowel_movement(
-        session=session,
-        bowel_movement_id=bowel_movement_id,
-        notes=message.text,
-        user_id=message.from_user.id,
+    bowel_movement: BowelMovement = await save_draft(
+        session, bowel_movement_service, message.from_user.id, draft, notes=message.text
     )
-    if bowel_movement is None:
-        await message.answer(text="Запись не найдена. Начните новую запись.")
-        await state.clear()
-        return
-    user: User = await user_service.get_or_create_user(session, message.from_user.id)
+    user: UserProfile = await user_service.get_user_profile(session, message.from_user.id)
+    await session.commit()
     await state.clear()
-    await message.bot.edit_message_text(
-        text=get_result_msg_text(bowel_movement, user.timezone_offset),
-        message_id=bot_msg_id,
-        reply_markup=get_result_msg_inline_keyboard(bowel_movement_id),
-        chat_id=chat_id
+    await show_saved_result(
+        message,
+        bowel_movement,
+        user.timezone_offset,
+        partial(message.bot.edit_message_text, message_id=draft.bowel_movement_msg_id, chat_id=draft.chat_id),
     )
-    await message.delete()
+    try:
+        await message.delete()
+    except TelegramBadRequest as e:
+        logger.warning("Failed to delete notes message %s: %s", message.message_id, e)
 
 
-@router.callback_query(F.data == BowelMovementCallbackKey.SKIP_NOTES.value)
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.SKIP_NOTES))
 async def skip_notes(callback: CallbackQuery, state: FSMContext, session: AsyncSession,
                      bowel_movement_service: BowelMovementService, user_service: UserService):
-    """User skipped notes"""
-    try:
-        data = BowelMovementStateData.model_validate(await state.get_data())
-    except ValidationError:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
-        return
-    bowel_movement_id: int = data.bowel_movement_id
-    bowel_movement: BowelMovement = await bowel_movement_service.get_bowel_movement_by_id(
-        bowel_movement_id=bowel_movement_id,
-        session=session,
-        user_id=callback.from_user.id,
-    )
-    if bowel_movement is None:
-        await callback.message.edit_text(
-            text="Запись не найдена. Начните новую запись.",
-            reply_markup=None,
-        )
-        await state.clear()
+    """User skipped notes, save the draft as is"""
+    draft = await get_draft(state)
+    if draft is None:
+        await _record_not_found(callback, state)
         return
-    user: User = await user_service.get_or_create_user(session, callback.from_user.id)
-    await callback.message.edit_text(
-        text=get_result_msg_text(bowel_movement, user.timezone_offset),
-        reply_markup=get_result_msg_inline_keyboard(bowel_movement_id),
-    )
+    bowel_movement: BowelMovement = await save_draft(session, bowel_movement_service, callback.from_user.id, draft)
+    user: UserProfile = await user_service.get_user_profile(session, callback.from_user.id)
+    await session.commit()
     await state.clear()
+    await show_saved_result(callback.message, bowel_movement, user.timezone_offset, callback.message.edit_text)
 
 
-@router.callback_query(F.data.startswith(BowelMovementCallbackKey.BACK_FROM_NOTES))
+@router.callback_query(CallbackKeyFilter(BowelMovementCallbackKey.BACK_FROM_NOTES))
 async def back_from_notes_to_blood_record(callback: CallbackQuery, state: FSMContext):
     """Back to the blood lvl recording process"""
     await callback.message.edit_text(
@@ -0,0 +1,65 @@
+from typing import NamedTuple, Optional
+
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery
+
+from bot.handlers.constants import BowelMovementCallbackKey, MainCallbackKey
+
+BOWEL_MOVEMENT = "bowel_movement"
+TIMEZONE = "timezone"
+
+# Callback data is "<key>" or "<key>:<payload>"
+CALLBACK_KEY_SEPARATOR = ":"
+
+
+class CallbackRoute(NamedTuple):
+    """FSM destiny and handler key of a callback"""
+    destiny: str
+    key: str
+
+
+def _build_routes() -> dict[str, CallbackRoute]:
+    routes: dict[str, CallbackRoute] = {}
+    for key in BowelMovementCallbackKey:
+        if key != BowelMovementCallbackKey.SKIP:
+            routes[key.value] = CallbackRoute(BOWEL_MOVEMENT, key.value)
+    for key in (
+            MainCallbackKey.SETTINGS_TIMEZONE,
+            MainCallbackKey.SET_HOUR_TIMEZONE,
+            MainCallbackKey.SET_MINUTE_TIMEZONE,
+    ):
+        routes[key.value] = CallbackRoute(TIMEZONE, key.value)
+    return routes
+
+
+# Keys are matched exactly, so a key that is a prefix of another one (skip / skip_notes) can't be confused
+CALLBACK_ROUTES: dict[str, CallbackRoute] = _build_routes()
+
+
+def callback_key(data: str) -> str:
+    return data.split(CALLBACK_KEY_SEPARATOR, 1)[0]
+
+
+def resolve_callback(data: Optional[str]) -> Optional[CallbackRoute]:
+    """Route of callback data in a single dict lookup"""
+    if not data:
+        return None
+    return CALLBACK_ROUTES.get(callback_key(data))
+
+
+class CallbackKeyFilter(Filter):
+    """Match callbacks by key.
+
+    Uses the route resolved by DestinyMiddleware for the update and resolves it itself
+    when the middleware is not installed.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = str(key)
+        if self.key not in CALLBACK_ROUTES:
+            raise ValueError(f"Unknown callback key: {self.key}")
+
+    async def __call__(self, callback: CallbackQuery, callback_route: Optional[CallbackRoute] = None) -> bool:
+        if callback_route is None:
+            callback_route = resolve_callback(callback.data)
+        return callback_route is not None and callback_route.key == self.key
@@ -4,6 +4,7 @@ from enum import StrEnum
 class BowelMovementMessageCommand(StrEnum):
     """Message commands for bowel movement handler"""
     START_BOWEL_MOVEMENT = '📝 Начать запись'
+    STATS = '📊 Статистика'
 
 
 class BowelMovementCallbackKey(StrEnum):
@@ -5,11 +5,11 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.handlers.callback_routes import CallbackKeyFilter
 from bot.handlers.constants import BowelMovementMessageCommand, MainMessageCommand, MainCallbackKey
 from bot.keyboards.main_keyboard import get_main_keyboard, get_timezone_hour_keyboard, get_timezone_minutes_keyboard, \
     get_settings_keyboard
-from database.models import User
-from service.user import UserService
+from service.user import UserProfile, UserService
 from service.utils import format_timezone
 
 router = Router()
@@ -49,15 +49,15 @@ async def cmd_start(message: Message, session: AsyncSession, state: FSMContext,
         )
 
 
-@router.callback_query(F.data.startswith(MainCallbackKey.SET_HOUR_TIMEZONE))
-async def set_hour_timezone(callback: CallbackQuery, state: FSMContext, session: AsyncSession, user_service: UserService):
-    """Set user hour timezone"""
+@router.callback_query(CallbackKeyFilter(MainCallbackKey.SET_HOUR_TIMEZONE))
+async def set_hour_timezone(callback: CallbackQuery, state: FSMContext):
+    """Remember the hours of the timezone, it is saved once the minutes are chosen"""
     data_val: str = callback.data.split(':')[1]
     if data_val == MainCallbackKey.SKIP:
-        timezone_offset = 0
+        hours = 0
     else:
-        timezone_offset: int = int(data_val)
-    await user_service.set_user_hour_timezone(session, callback.from_user.id, timezone_offset)
+        hours: int = int(data_val)
+    await state.update_data(timezone_hours=hours)
     await callback.message.edit_text(
         text="Укажите минуты таймзоны",
         reply_markup=get_timezone_minutes_keyboard()
@@ -65,17 +65,26 @@ async def set_hour_timezone(callback: CallbackQuery, state: FSMContext, session:
     await state.set_state(StartStates.timezone_minute)
 
 
-@router.callback_query(F.data.startswith(MainCallbackKey.SET_MINUTE_TIMEZONE))
+@router.callback_query(CallbackKeyFilter(MainCallbackKey.SET_MINUTE_TIMEZONE))
 async def set_minute_timezone(callback: CallbackQuery, state: FSMContext, session: AsyncSession,
                             user_service: UserService):
-    """Set user minute timezone"""
+    """Save the timezone with the hours chosen on the previous step"""
+    hours: int | None = await state.get_value("timezone_hours")
+    if hours is None:
+        # Minutes keyboard of a finished or expired flow, start over from the hours
+        await state.set_state(StartStates.timezone_hour)
+        await callback.message.edit_text(
+            text="Укажите часы таймзоны",
+            reply_markup=get_timezone_hour_keyboard()
+        )
+        return
     data_val: str = callback.data.split(':')[1]
     if data_val == MainCallbackKey.SKIP.value:
-        timezone_offset = 0
+        minutes = 0
     else:
-        timezone_offset: int = int(data_val)
-    user: User = await user_service.set_user_minute_timezone(session, callback.from_user.id, timezone_offset)
-    timezone: str = format_timezone(user.timezone_offset)
+        minutes: int = int(data_val)
+    offset: int | None = await user_service.set_user_timezone(session, callback.from_user.id, hours, minutes)
+    timezone: str = format_timezone(offset)
     await callback.message.edit_text(
         text=f"Таймзона успешно установлена\n\nВаша текущая таймзона: {timezone}"
     )
@@ -88,7 +97,7 @@ async def set_minute_timezone(callback: CallbackQuery, state: FSMContext, sessio
 @router.message(F.text == MainMessageCommand.USER_SETTINGS)
 async def user_settings(message: Message, state: FSMContext, session: AsyncSession, user_service: UserService):
     """Show user settings"""
-    user: User = await user_service.get_or_create_user(session, message.from_user.id)
+    user: UserProfile = await user_service.get_user_profile(session, message.from_user.id)
     timezone: str = format_timezone(user.timezone_offset)
     await message.answer(
         text=f"Ваша текущая таймзона: {timezone}",
@@ -96,7 +105,7 @@ async def user_settings(message: Message, state: FSMContext, session: AsyncSessi
     )
 
 
-@router.callback_query(F.data == MainCallbackKey.SETTINGS_TIMEZONE.value)
+@router.callback_query(CallbackKeyFilter(MainCallbackKey.SETTINGS_TIMEZONE))
 async def timezone_settings(callback: CallbackQuery, state: FSMContext):
     """Edit timezone settings"""
     await state.set_state(StartStates.timezone_hour)
@@ -113,6 +122,7 @@ async def cmd_help(message: Message):
         "📚 <b>Справка по командам бота:</b>\n\n"
         "<b>Основные команды:</b>\n"
         "/start - Начать работу с ботом\n"
+        "/stats - Статистика за 30 дней\n"
         "/about - Информация о боте\n"
         "/help - Показать эту справку\n\n"
         "<b>Для записи данных используйте кнопку:</b>\n"
@@ -1,10 +1,13 @@
 from datetime import timedelta
+from typing import Optional
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import Row
 
 from bot.handlers.constants import BowelMovementCallbackKey, BackFromDeleteBowelMovementToPosition
 from database.models import BowelMovement
 from database.models.bowel_movement import StoolConsistency, StoolBlood, Mucus
+from service.bowel_movement import StatsSummary
 
 SKIP_BTN_TEXT = "➡️ Пропустить"
 BACK_BTN_TEXT = "⬅️ Назад"
@@ -19,7 +22,7 @@ def get_bowel_movement_init_text() -> str:
     )
 
 
-def get_bowel_movement_init_keyboard(bowel_movement_id: int) -> InlineKeyboardMarkup:
+def get_bowel_movement_init_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -37,7 +40,7 @@ def get_bowel_movement_init_keyboard(bowel_movement_id: int) -> InlineKeyboardMa
             [
                 InlineKeyboardButton(
                     text=DELETE_BTN_TEXT,
-                    callback_data=f'{BowelMovementCallbackKey.DELETE_CONFIRMATION}:{bowel_movement_id}'
+                    callback_data=BowelMovementCallbackKey.DELETE_CONFIRMATION,
                 )
             ]
         ]
@@ -99,21 +102,25 @@ def get_msg_confirm_delete_record_text() -> str:
 
 
 def get_msg_confirm_delete_record_keyboard(
-        bowel_movement_id: int,
+        bowel_movement_id: Optional[int],
         back_to: BackFromDeleteBowelMovementToPosition,
 ) -> InlineKeyboardMarkup:
+    """A draft that is not saved yet has no id"""
+    back_callback_data = f'{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:{back_to}'
+    delete_callback_data = str(BowelMovementCallbackKey.DELETE_RECORD)
+    if bowel_movement_id is not None:
+        back_callback_data += f'|id:{bowel_movement_id}'
+        delete_callback_data += f':{bowel_movement_id}'
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
                     text="Отмена",
-                    callback_data=(
-                        f'{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:{back_to}'
-                        f'|id:{bowel_movement_id}'),
+                    callback_data=back_callback_data,
                 ),
                 InlineKeyboardButton(
                     text="❌ Удалить",
-                    callback_data=f'{BowelMovementCallbackKey.DELETE_RECORD}:{bowel_movement_id}',
+                    callback_data=delete_callback_data,
                 ),
             ]
         ]
@@ -221,9 +228,9 @@ def get_skip_notes_keyboard():
     )
 
 
-def get_result_msg_text(bowel_movement: BowelMovement, timezone_offset: int | None = 0) -> str:
+def get_result_msg_text(bowel_movement: BowelMovement | Row, timezone_offset: int | None = 0) -> str:
     offset_minutes = timezone_offset or 0
-    local_dt = bowel_movement.created_at + timedelta(minutes=offset_minutes)
+    local_dt = bowel_movement.time + timedelta(minutes=offset_minutes)
     if bowel_movement.is_false_urge:
         return (
             "📝 <b>Запись произведена успешно</b>\n\n"
@@ -266,3 +273,28 @@ def get_result_msg_inline_keyboard(bowel_movement_id: int) -> InlineKeyboardMark
             ]
         ]
     )
+
+
+def _percent(part: int, whole: int) -> str:
+    return f"{part * 100 // whole}%" if whole else "—"
+
+
+def get_stats_msg_text(summary: StatsSummary, last_days: int = 7) -> str:
+    if summary.total == 0:
+        return f"📊 <b>Статистика за {summary.days} дней</b>\n\nЗа этот период записей нет"
+    consistency_lines = "\n".join(
+        f"• {consistency.label}: {count}" for consistency, count in summary.consistency.items()
+    )
+    day_lines = "\n".join(
+        f"{day.strftime('%d.%m')}: {summary.per_day.get(day, 0)}"
+        for day in (summary.end_date - timedelta(days=offset) for offset in range(last_days))
+    )
+    return (
+        f"📊 <b>Статистика за {summary.days} дней</b>\n\n"
+        f"Походов в туалет: {summary.real} (в среднем {summary.real / summary.days:.1f} в день)\n"
+        f"Ложные позывы: {summary.false_urges} ({_percent(summary.false_urges, summary.total)})\n\n"
+        f"<b>Консистенция стула:</b>\n{consistency_lines}\n\n"
+        f"Кровь в стуле: {summary.with_blood} ({_percent(summary.with_blood, summary.real)})\n"
+        f"Слизь в стуле: {summary.with_mucus} ({_percent(summary.with_mucus, summary.real)})\n\n"
+        f"<b>Записей по дням:</b>\n{day_lines}"
+    )
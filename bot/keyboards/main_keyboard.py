@@ -11,6 +11,9 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     # Recording button
     builder.add(KeyboardButton(text=BowelMovementMessageCommand.START_BOWEL_MOVEMENT.value))
 
+    # Statistics button
+    builder.add(KeyboardButton(text=BowelMovementMessageCommand.STATS.value))
+
     # User settings button
     builder.add(KeyboardButton(text=MainMessageCommand.USER_SETTINGS.value))
 
@@ -1,18 +1,24 @@
 import asyncio
 import logging
+from datetime import timedelta
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import SimpleEventIsolation
 
 from bot.handlers import main_handler, bowel_movement
-from bot.middlewares import DatabaseMiddleware
+from bot.handlers.bowel_movement import BowelMovementStates
+from bot.middlewares import ConnectionScopeMiddleware, DatabaseMiddleware
 from bot.middlewares.error_handler import ErrorHandlerMiddleware
 from bot.middlewares.fsm_destiny import DestinyMiddleware
 from bot.middlewares.patched_fsm import PatchedFSMContextMiddleware
+from bot.tasks.draft_reaper import DraftReaper, run_draft_reaper
+from bot.tasks.fsm_sweeper import run_fsm_sweeper
+from bot.tasks.partition_maintenance import run_partition_maintenance
 from config.settings import settings
-from database.fsm_storage import PostgresStorage
+from database.cache import LRUCache
+from database.fsm_isolation import LocalEventIsolation, PostgresEventIsolation
+from database.fsm_storage import CachedStorage, PostgresStorage, StateIndex
 from database.repository.bowel_movements import BowelMovementRepository
 from database.repository.user import UserRepository
 from database.session import engine
@@ -36,17 +42,30 @@ async def main():
         token=settings.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    storage = PostgresStorage(engine=engine)
+    if settings.FSM_EVENT_ISOLATION == "postgres":
+        events_isolation = PostgresEventIsolation(engine=engine)
+        # Other replicas change states too, so an in-process index could go stale
+        state_index = None
+    else:
+        events_isolation = LocalEventIsolation()
+        state_index = StateIndex([BowelMovementStates.waiting_for_notes.state])
+    postgres_storage = PostgresStorage(engine=engine, state_index=state_index)
+    storage = postgres_storage
+    if settings.FSM_CACHE_SIZE > 0:
+        storage = CachedStorage(postgres_storage, max_size=settings.FSM_CACHE_SIZE, ttl=settings.FSM_CACHE_TTL)
 
     # Create repository and service instances
     user_repo = UserRepository()
     bowel_movement_repo = BowelMovementRepository()
-    user_service = UserService(user_repository=user_repo)
+    profile_cache = None
+    if settings.USER_CACHE_SIZE > 0:
+        profile_cache = LRUCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+    user_service = UserService(user_repository=user_repo, profile_cache=profile_cache)
     bowel_movement_service = BowelMovementService(bowel_movement_repository=bowel_movement_repo)
 
     dp = Dispatcher(
         storage=storage,
-        events_isolation=SimpleEventIsolation(),
+        events_isolation=events_isolation,
         disable_fsm=True,
         # Pass services to all handlers
         user_service=user_service,
@@ -55,17 +74,56 @@ async def main():
 
     # Register middlewares
     dp.update.outer_middleware(ErrorHandlerMiddleware())
-    dp.update.outer_middleware(DestinyMiddleware(storage))
-    dp.update.outer_middleware(PatchedFSMContextMiddleware(storage, events_isolation=SimpleEventIsolation()))
+    # Handler writes and the FSM flush after them are committed together
+    dp.update.outer_middleware(ConnectionScopeMiddleware())
+    dp.update.outer_middleware(DestinyMiddleware(storage, state_index=state_index))
+    dp.update.outer_middleware(PatchedFSMContextMiddleware(storage, events_isolation=events_isolation))
     dp.update.middleware(DatabaseMiddleware())
 
     # Register routers
     dp.include_router(bowel_movement.router)
     dp.include_router(main_handler.router)
 
+    # Start background tasks
+    background_tasks: list[asyncio.Task] = []
+    if settings.FSM_TTL_HOURS > 0:
+        background_tasks.append(asyncio.create_task(run_fsm_sweeper(
+            postgres_storage,
+            ttl=timedelta(hours=settings.FSM_TTL_HOURS),
+            interval=settings.FSM_SWEEP_INTERVAL,
+            batch_size=settings.FSM_SWEEP_BATCH_SIZE,
+        )))
+    if settings.DRAFT_IDLE_MINUTES > 0:
+        draft_reaper = DraftReaper(
+            bot,
+            storage,
+            events_isolation,
+            bowel_movement_service=bowel_movement_service,
+            user_service=user_service,
+            idle_after=timedelta(minutes=settings.DRAFT_IDLE_MINUTES),
+            batch_size=settings.DRAFT_REAPER_BATCH_SIZE,
+            concurrency=settings.DRAFT_REAPER_CONCURRENCY,
+        )
+        background_tasks.append(asyncio.create_task(
+            run_draft_reaper(draft_reaper, interval=settings.DRAFT_REAPER_INTERVAL)
+        ))
+    background_tasks.append(asyncio.create_task(run_partition_maintenance(
+        engine,
+        months_ahead=settings.PARTITION_MONTHS_AHEAD,
+        retain_months=settings.PARTITION_RETAIN_MONTHS,
+        interval=settings.PARTITION_MAINTENANCE_INTERVAL,
+    )))
+
+    # Load users awaiting notes, until then destinies are resolved from the storage
+    await postgres_storage.warm_up_index()
+
     # Start bot
     logger.info("Bot started successfully")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        for task in background_tasks:
+            task.cancel()
 
 
 if __name__ == "__main__":
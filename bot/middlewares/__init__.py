@@ -1,3 +1,3 @@
-from .database import DatabaseMiddleware
+from .database import ConnectionScopeMiddleware, DatabaseMiddleware
 
-__all__ = ["DatabaseMiddleware"]
+__all__ = ["ConnectionScopeMiddleware", "DatabaseMiddleware"]
@@ -1,9 +1,9 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, Update
 
-from database.session import get_db
+from database.session import LazySession, transaction_hooks_scope, update_connection_scope
 
 
 class DatabaseMiddleware(BaseMiddleware):
@@ -15,9 +15,11 @@ class DatabaseMiddleware(BaseMiddleware):
             event: Message | CallbackQuery,
             data: Dict[str, Any]
     ) -> Any:
-        # Get database session
-        async for session in get_db():
-            data["session"] = session
+        # The session is opened only if a handler uses it
+        session = LazySession()
+        data["session"] = session
+        # Hooks registered by services run once the session is committed
+        async with transaction_hooks_scope():
             try:
                 result = await handler(event, data)
                 await session.commit()
@@ -27,3 +29,20 @@ class DatabaseMiddleware(BaseMiddleware):
                 raise
             finally:
                 await session.close()
+
+
+class ConnectionScopeMiddleware(BaseMiddleware):
+    """
+    Middleware to run FSM storage and repositories on one connection and in one transaction per update.
+    It must wrap PatchedFSMContextMiddleware: the FSM record is flushed after DatabaseMiddleware
+    has committed the session, only the shared transaction makes both writes succeed or fail together.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        async with update_connection_scope():
+            return await handler(event, data)
@@ -1,16 +1,19 @@
+from typing import Optional
+
 from aiogram import BaseMiddleware
 from aiogram.fsm.storage.base import StorageKey
 
 from bot.handlers.bowel_movement import BowelMovementStates
-from bot.handlers.constants import BowelMovementMessageCommand, BowelMovementCallbackKey, MainCallbackKey
-
-BOWEL_MOVEMENT = "bowel_movement"
-TIMEZONE = "timezone"
+from bot.handlers.callback_routes import BOWEL_MOVEMENT, resolve_callback
+from bot.handlers.constants import BowelMovementMessageCommand
+from database.fsm_storage import StateIndex
 
 
 class DestinyMiddleware(BaseMiddleware):
-    def __init__(self, storage):
+    def __init__(self, storage, state_index: Optional[StateIndex] = None):
         self.storage = storage
+        # Users awaiting notes are looked up in memory, the storage is queried only while the index is cold
+        self.state_index = state_index
 
     async def __call__(self, handler, event, data):
         destiny = None
@@ -22,15 +25,12 @@ class DestinyMiddleware(BaseMiddleware):
                 destiny = BOWEL_MOVEMENT
 
 
-        elif callback_query and callback_query.data:
-            if any(callback_query.data.startswith(k.value) for k in BowelMovementCallbackKey):
-                destiny = BOWEL_MOVEMENT
-            elif callback_query.data.startswith(MainCallbackKey.SET_HOUR_TIMEZONE):
-                destiny = TIMEZONE
-            elif callback_query.data.startswith(MainCallbackKey.SET_MINUTE_TIMEZONE):
-                destiny = TIMEZONE
-            elif callback_query.data == MainCallbackKey.SETTINGS_TIMEZONE:
-                destiny = TIMEZONE
+        elif callback_query:
+            # Resolved once per update, handlers match on it with CallbackKeyFilter
+            route = resolve_callback(callback_query.data)
+            data["callback_route"] = route
+            if route:
+                destiny = route.destiny
 
         if destiny is None and message:
             key = StorageKey(
@@ -39,11 +39,18 @@ class DestinyMiddleware(BaseMiddleware):
                 user_id=message.from_user.id,
                 destiny=BOWEL_MOVEMENT,
             )
-            state = await self.storage.get_state(key)
-            if state == BowelMovementStates.waiting_for_notes.state:
+            if await self._is_waiting_for_notes(key):
                 destiny = BOWEL_MOVEMENT
 
         if destiny:
             data["destiny"] = destiny
 
         return await handler(event, data)
+
+    async def _is_waiting_for_notes(self, key: StorageKey) -> bool:
+        if self.state_index is not None:
+            waiting = self.state_index.contains(key)
+            if waiting is not None:
+                return waiting
+        state = await self.storage.get_state(key)
+        return state == BowelMovementStates.waiting_for_notes.state
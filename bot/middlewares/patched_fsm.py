@@ -1,10 +1,73 @@
-from typing import Any
+from typing import Any, Mapping, Optional
 
 from aiogram import Bot
+from aiogram.fsm.context import FSMContext
 from aiogram.fsm.middleware import FSMContextMiddleware
-from aiogram.fsm.storage.base import DEFAULT_DESTINY
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, StateType, StorageKey
 from aiogram.types import TelegramObject
 
+from database.fsm_storage import FSMRecord
+
+
+class UnitOfWorkFSMContext(FSMContext):
+    """FSM context that works on an in-memory copy of the record during an update.
+
+    The record is loaded with a single query, all mutations are applied in memory
+    and :meth:`flush` writes the final record with one statement (or deletes it).
+    """
+
+    def __init__(self, storage, key: StorageKey) -> None:
+        super().__init__(storage=storage, key=key)
+        self._record: Optional[FSMRecord] = None
+        self._loaded: Optional[FSMRecord] = None
+
+    async def load(self) -> FSMRecord:
+        if self._record is None:
+            self._loaded = await self.storage.get_record(self.key)
+            self._record = FSMRecord(state=self._loaded.state, data=dict(self._loaded.data))
+        return self._record
+
+    @property
+    def is_dirty(self) -> bool:
+        return self._record is not None and self._record != self._loaded
+
+    async def flush(self) -> None:
+        """Write pending changes to the storage"""
+        if not self.is_dirty:
+            return
+        await self.storage.set_record(self.key, self._record)
+        self._loaded = FSMRecord(state=self._record.state, data=dict(self._record.data))
+
+    async def get_state(self) -> Optional[str]:
+        return (await self.load()).state
+
+    async def get_data(self) -> dict[str, Any]:
+        return dict((await self.load()).data)
+
+    async def get_value(self, key: str, default: Any = None) -> Any:
+        return (await self.load()).data.get(key, default)
+
+    async def set_state(self, state: StateType = None) -> None:
+        record = await self.load()
+        record.state = state.state if isinstance(state, State) else state
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        record = await self.load()
+        record.data = dict(data)
+
+    async def update_data(self, data: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        record = await self.load()
+        record.data.update(kwargs)
+        return dict(record.data)
+
+    async def clear(self) -> None:
+        record = await self.load()
+        record.state = None
+        record.data = {}
+
 
 class PatchedFSMContextMiddleware(FSMContextMiddleware):
     async def __call__(
@@ -22,5 +85,29 @@ class PatchedFSMContextMiddleware(FSMContextMiddleware):
             # State should be loaded after lock is acquired
             async with self.events_isolation.lock(key=context.key):
                 data.update({"state": context, "raw_state": await context.get_state()})
-                return await handler(event, data)
+                result = await handler(event, data)
+                # Pending FSM changes are written once, while the lock is still held
+                await context.flush()
+                return result
         return await handler(event, data)
+
+    def get_context(
+        self,
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        thread_id: int | None = None,
+        business_connection_id: str | None = None,
+        destiny: str = DEFAULT_DESTINY,
+    ) -> UnitOfWorkFSMContext:
+        return UnitOfWorkFSMContext(
+            storage=self.storage,
+            key=StorageKey(
+                user_id=user_id,
+                chat_id=chat_id,
+                bot_id=bot.id,
+                thread_id=thread_id,
+                business_connection_id=business_connection_id,
+                destiny=destiny,
+            ),
+        )
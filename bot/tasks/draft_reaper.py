@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from pydantic import ValidationError
+
+from bot.handlers.bowel_movement import BowelMovementStateData, BowelMovementStates, save_draft
+from bot.keyboards.bowel_movement import (
+    get_msg_text_delete_record, get_result_msg_inline_keyboard, get_result_msg_text
+)
+from database.fsm_storage import CachedStorage, FSMRecord, PostgresStorage
+from database.session import LazySession, update_connection_scope
+from service.bowel_movement import BowelMovementService
+from service.user import UserService
+
+logger = logging.getLogger(__name__)
+
+DRAFT_STATES = frozenset(state.state for state in BowelMovementStates.__states__)
+
+
+class DraftReaper:
+    """Finalizes bowel movement drafts abandoned in the middle of the wizard.
+
+    A draft idle for ``idle_after`` is saved with whatever the user has filled in,
+    one waiting for delete confirmation is dropped. The FSM record is removed in the same
+    transaction as the INSERT and the bot message is edited to its final state.
+    Drafts are processed under the FSM event isolation lock of their key, at most
+    ``concurrency`` at a time, so live updates are never blocked for long.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            storage: Union[PostgresStorage, CachedStorage],
+            events_isolation: BaseEventIsolation,
+            bowel_movement_service: BowelMovementService,
+            user_service: UserService,
+            idle_after: timedelta,
+            batch_size: int = 100,
+            concurrency: int = 4,
+    ) -> None:
+        self.bot = bot
+        self.storage = storage
+        self.events_isolation = events_isolation
+        self.bowel_movement_service = bowel_movement_service
+        self.user_service = user_service
+        self.idle_after = idle_after
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def reap(self) -> int:
+        """Finalize idle drafts in batches, return the number of removed FSM records"""
+        reaped = 0
+        while True:
+            keys = await self.storage.idle_keys(DRAFT_STATES, self.idle_after, limit=self.batch_size)
+            results = await asyncio.gather(*(self._reap_one(key) for key in keys), return_exceptions=True)
+            failed = 0
+            for key, result in zip(keys, results):
+                if isinstance(result, Exception):
+                    failed += 1
+                    logger.error("Failed to finalize draft of user %s: %s", key.user_id, result, exc_info=result)
+                elif result:
+                    reaped += 1
+            # Failed drafts would be picked up again, they are retried on the next run instead
+            if len(keys) < self.batch_size or failed:
+                return reaped
+
+    async def _reap_one(self, key: StorageKey) -> bool:
+        async with self.semaphore:
+            async with self.events_isolation.lock(key):
+                async with update_connection_scope():
+                    record = await self.storage.pop_idle_record(key, DRAFT_STATES, self.idle_after)
+                    if record is None:
+                        # The user came back to the draft
+                        return False
+                    text, reply_markup = await self._finalize(key, record)
+            await self._edit_message(record, text, reply_markup)
+            return True
+
+    async def _finalize(self, key: StorageKey, record: FSMRecord):
+        """Save the draft and return the final text and keyboard of its message"""
+        try:
+            draft = BowelMovementStateData.model_validate(record.data)
+        except ValidationError:
+            # Flow started before drafts were kept in FSM, its row already exists
+            return None, None
+        if record.state == BowelMovementStates.delete_confirmation.state:
+            return get_msg_text_delete_record(), None
+        session = LazySession()
+        try:
+            bowel_movement = await save_draft(session, self.bowel_movement_service, key.user_id, draft)
+            profile = await self.user_service.get_user_profile(session, key.user_id)
+            await session.commit()
+        finally:
+            await session.close()
+        return (
+            get_result_msg_text(bowel_movement, profile.timezone_offset),
+            get_result_msg_inline_keyboard(bowel_movement.id),
+        )
+
+    async def _edit_message(self, record: FSMRecord, text: Optional[str], reply_markup) -> None:
+        message_id = record.data.get("bowel_movement_msg_id")
+        chat_id = record.data.get("chat_id")
+        if message_id is None or chat_id is None:
+            return
+        try:
+            if text is None:
+                await self.bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=None)
+            else:
+                await self.bot.edit_message_text(
+                    text=text, chat_id=chat_id, message_id=message_id, reply_markup=reply_markup
+                )
+        except TelegramAPIError as e:
+            # The message may be deleted or too old to edit, the draft is finalized anyway
+            logger.warning("Failed to edit draft message %s in chat %s: %s", message_id, chat_id, e)
+
+
+async def run_draft_reaper(reaper: DraftReaper, interval: float) -> None:
+    """Periodically finalize abandoned bowel movement drafts"""
+    while True:
+        try:
+            reaped: int = await reaper.reap()
+            if reaped:
+                logger.info("Finalized %d abandoned drafts", reaped)
+        except Exception as e:
+            logger.exception("Draft reaper failed: %s", e)
+        await asyncio.sleep(interval)
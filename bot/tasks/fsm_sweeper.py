@@ -0,0 +1,24 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from database.fsm_storage import PostgresStorage
+
+logger = logging.getLogger(__name__)
+
+
+async def run_fsm_sweeper(
+        storage: PostgresStorage,
+        ttl: timedelta,
+        interval: float,
+        batch_size: int = 500,
+) -> None:
+    """Periodically remove FSM records of abandoned flows"""
+    while True:
+        try:
+            removed: int = await storage.delete_expired(older_than=ttl, batch_size=batch_size)
+            if removed:
+                logger.info("Removed %d expired FSM records", removed)
+        except Exception as e:
+            logger.exception("FSM sweeper failed: %s", e)
+        await asyncio.sleep(interval)
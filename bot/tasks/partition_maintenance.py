@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database.partitions import create_future_partitions, detach_old_partitions
+
+logger = logging.getLogger(__name__)
+
+
+async def run_partition_maintenance(
+        engine: AsyncEngine,
+        months_ahead: int,
+        retain_months: int,
+        interval: float,
+) -> None:
+    """Periodically create upcoming bowel_movements partitions and detach expired ones"""
+    while True:
+        try:
+            await create_future_partitions(engine, months_ahead=months_ahead)
+            if retain_months > 0:
+                detached = await detach_old_partitions(engine, retain_months=retain_months)
+                if detached:
+                    logger.info("Detached bowel_movements partitions: %s", ", ".join(detached))
+        except Exception as e:
+            logger.exception("Partition maintenance failed: %s", e)
+        await asyncio.sleep(interval)
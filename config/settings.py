@@ -38,6 +38,35 @@ class Settings:
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # In-process cache in front of the FSM storage (0 disables it)
+    FSM_CACHE_SIZE: int = int(os.getenv("FSM_CACHE_SIZE", "0"))
+    FSM_CACHE_TTL: float = float(os.getenv("FSM_CACHE_TTL", "60"))
+
+    # Event isolation: "memory" for a single replica, "postgres" for advisory locks across replicas
+    FSM_EVENT_ISOLATION: str = os.getenv("FSM_EVENT_ISOLATION", "memory")
+
+    # Removal of FSM records of abandoned flows (0 disables the sweeper)
+    FSM_TTL_HOURS: float = float(os.getenv("FSM_TTL_HOURS", "168"))
+    FSM_SWEEP_INTERVAL: float = float(os.getenv("FSM_SWEEP_INTERVAL", "600"))
+    FSM_SWEEP_BATCH_SIZE: int = int(os.getenv("FSM_SWEEP_BATCH_SIZE", "500"))
+
+    # Finalization of bowel movement drafts idle for N minutes (0 disables the reaper),
+    # check interval in seconds, drafts per batch and drafts processed at the same time
+    DRAFT_IDLE_MINUTES: float = float(os.getenv("DRAFT_IDLE_MINUTES", "60"))
+    DRAFT_REAPER_INTERVAL: float = float(os.getenv("DRAFT_REAPER_INTERVAL", "300"))
+    DRAFT_REAPER_BATCH_SIZE: int = int(os.getenv("DRAFT_REAPER_BATCH_SIZE", "100"))
+    DRAFT_REAPER_CONCURRENCY: int = int(os.getenv("DRAFT_REAPER_CONCURRENCY", "4"))
+
+    # In-process cache of user profiles (0 disables it), TTL in seconds bounds staleness across replicas
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", "300"))
+
+    # Monthly partitions of bowel_movements: how many future months to create in advance,
+    # how many months to keep attached (0 keeps all) and check interval in seconds
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+    PARTITION_RETAIN_MONTHS: int = int(os.getenv("PARTITION_RETAIN_MONTHS", "0"))
+    PARTITION_MAINTENANCE_INTERVAL: float = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "86400"))
+
     # Admin user IDs (comma-separated)
     ADMIN_IDS: list[int] = field(default_factory=list)
 
@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+@dataclass
+class CacheStats:
+    """Counters of a cache instance"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Entries are evicted when the cache grows over ``max_size`` (least recently used first)
+    or when they are older than ``ttl`` seconds. ``ttl=None`` disables expiration.
+    """
+
+    _MISSING = object()
+
+    def __init__(
+            self,
+            max_size: int = 10_000,
+            ttl: Optional[float] = None,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self._MISSING, count=False) is not self._MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > self._clock():
+                self._entries.move_to_end(key)
+                if count:
+                    self.stats.hits += 1
+                return value
+            del self._entries[key]
+            self.stats.evictions += 1
+        if count:
+            self.stats.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
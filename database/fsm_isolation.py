@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Dict
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import func
+
+from database.session import begin_connection, engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IsolationStats:
+    """Contention counters of an event isolation"""
+    acquisitions: int = 0
+    contended: int = 0
+    active_holds: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+    hold_time_total: float = 0.0
+    hold_time_max: float = 0.0
+
+
+@dataclass
+class _LockEntry:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+
+class LocalEventIsolation(BaseEventIsolation):
+    """In-process event isolation with a bounded lock table.
+
+    A lock is kept only while someone holds or waits for it, so the table size
+    is bounded by the number of updates in flight.
+    """
+
+    def __init__(self) -> None:
+        self._locks: Dict[StorageKey, _LockEntry] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = _LockEntry()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[key]
+
+    async def close(self) -> None:
+        self._locks.clear()
+
+
+class PostgresEventIsolation(BaseEventIsolation):
+    """Event isolation across bot replicas backed by transaction-level advisory locks.
+
+    The lock lives as long as the transaction that took it. When the update is bound to one
+    connection (see ConnectionScopeMiddleware) the lock is taken on it and released on commit,
+    otherwise a separate connection is held while the update is processed.
+    """
+
+    def __init__(self, engine: AsyncEngine = default_engine, slow_wait_threshold: float = 1.0) -> None:
+        self.engine = engine
+        self.slow_wait_threshold = slow_wait_threshold
+        self.stats = IsolationStats()
+
+    @staticmethod
+    def lock_id(key: StorageKey) -> int:
+        """Signed 64-bit advisory lock id for a storage key"""
+        raw = f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or 0}:{key.destiny}"
+        digest = hashlib.blake2b(raw.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        lock_id = self.lock_id(key)
+        started_at = time.monotonic()
+        async with begin_connection(self.engine) as conn:
+            acquired = await conn.scalar(select(func.pg_try_advisory_xact_lock(lock_id)))
+            if not acquired:
+                self.stats.contended += 1
+                await conn.execute(select(func.pg_advisory_xact_lock(lock_id)))
+            locked_at = time.monotonic()
+            self._record_wait(key, locked_at - started_at)
+            self.stats.active_holds += 1
+            try:
+                yield
+            finally:
+                self.stats.active_holds -= 1
+                hold_time = time.monotonic() - locked_at
+                self.stats.hold_time_total += hold_time
+                self.stats.hold_time_max = max(self.stats.hold_time_max, hold_time)
+
+    def _record_wait(self, key: StorageKey, wait_time: float) -> None:
+        self.stats.acquisitions += 1
+        self.stats.wait_time_total += wait_time
+        self.stats.wait_time_max = max(self.stats.wait_time_max, wait_time)
+        if wait_time >= self.slow_wait_threshold:
+            logger.warning("Waited %.2fs for FSM lock of user %s", wait_time, key.user_id)
+
+    async def close(self) -> None:
+        pass
@@ -1,31 +1,118 @@
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import partial
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
 
 from aiogram.fsm.state import State
 from aiogram.fsm.storage.base import (
+    DEFAULT_DESTINY,
     BaseStorage,
-    DefaultKeyBuilder,
-    KeyBuilder,
     StateType,
     StorageKey,
 )
-from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, select, text, update
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, MetaData, PrimaryKeyConstraint, SmallInteger, String, Table,
+    delete, exists, select, text, tuple_, update
+)
 from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.sql import func
 
-from database.session import engine as default_engine
+from database.cache import LRUCache
+from database.session import after_commit, after_rollback, begin_connection, engine as default_engine
 
 _metadata = MetaData()
 
+_EMPTY_DATA = text("'{}'::jsonb")
+
+# Destinies are stored as small integers, a code must never be reused for another destiny
+DESTINY_CODES: Dict[str, int] = {
+    DEFAULT_DESTINY: 0,
+    "bowel_movement": 1,
+    "timezone": 2,
+}
+
 fsm_storage_table = Table(
     "fsm_storage",
     _metadata,
-    Column("key", String(256), primary_key=True),
+    Column("bot_id", BigInteger, nullable=False),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("user_id", BigInteger, nullable=False),
+    Column("thread_id", BigInteger, nullable=False, server_default=text("0")),
+    Column("destiny", SmallInteger, nullable=False),
     Column("state", String(128), nullable=True),
-    Column("data", JSONB, nullable=False, server_default=text("'{}'::jsonb")),
+    Column("data", JSONB, nullable=False, server_default=_EMPTY_DATA),
     Column("updated_at", DateTime(timezone=True), server_default=func.now(), onupdate=func.now()),
+    PrimaryKeyConstraint("bot_id", "chat_id", "user_id", "thread_id", "destiny", name="fsm_storage_pkey"),
+    # BRIN keeps state updates HOT, see migration 20261017_0009
+    Index("ix_fsm_storage_updated_at", "updated_at", postgresql_using="brin"),
 )
 
+_KEY_COLUMNS = list(fsm_storage_table.primary_key.columns)
+
+
+def _key_clause(storage_key: Mapping[str, int]) -> list:
+    return [fsm_storage_table.c[name] == value for name, value in storage_key.items()]
+
+
+def _delete_or_update_stmt(storage_key: Mapping[str, int], delete_if, values: Dict[str, Any]):
+    """Delete the row when ``delete_if`` holds, otherwise update it with ``values``, in one statement"""
+    deleted = (
+        delete(fsm_storage_table)
+        .where(*_key_clause(storage_key), delete_if)
+        .returning(fsm_storage_table.c.user_id)
+        .cte("deleted")
+    )
+    return (
+        update(fsm_storage_table)
+        .where(*_key_clause(storage_key), ~exists(select(deleted.c.user_id)))
+        .values(**values, updated_at=func.now())
+        .add_cte(deleted)
+    )
+
+
+@dataclass
+class FSMRecord:
+    """State and data stored for a single FSM key"""
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class StateIndex:
+    """In-memory set of FSM keys that are currently in one of the watched states.
+
+    PostgresStorage keeps it up to date on every committed state write. Until the current keys
+    are loaded from the database (cold start) membership is unknown and lookups return None.
+    The index only sees writes of its own process, so it is exact for a single replica.
+    """
+
+    def __init__(self, states: Iterable[str]) -> None:
+        self.states = frozenset(states)
+        self.is_warm = False
+        self._keys: Set[Tuple] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _index_key(key: StorageKey) -> Tuple:
+        return key.bot_id, key.chat_id, key.user_id, key.thread_id or 0, key.destiny
+
+    def contains(self, key: StorageKey) -> Optional[bool]:
+        if not self.is_warm:
+            return None
+        return self._index_key(key) in self._keys
+
+    def update(self, key: StorageKey, state: Optional[str]) -> None:
+        if state in self.states:
+            self._keys.add(self._index_key(key))
+        else:
+            self._keys.discard(self._index_key(key))
+
+    def load(self, keys: Iterable[StorageKey]) -> None:
+        self._keys.update(self._index_key(key) for key in keys)
+        self.is_warm = True
+
 
 class PostgresStorage(BaseStorage):
     """FSM storage backed by PostgreSQL."""
@@ -33,98 +120,365 @@ class PostgresStorage(BaseStorage):
     def __init__(
         self,
         engine: AsyncEngine = default_engine,
-        key_builder: Optional[KeyBuilder] = None,
+        destiny_codes: Optional[Mapping[str, int]] = None,
+        state_index: Optional[StateIndex] = None,
     ) -> None:
-        if key_builder is None:
-            key_builder = DefaultKeyBuilder(with_destiny=True)
         self.engine = engine
-        self.key_builder = key_builder
+        self.destiny_codes = DESTINY_CODES if destiny_codes is None else destiny_codes
+        self.state_index = state_index
+
+    def _index_state(self, key: StorageKey, state: Optional[str]) -> None:
+        if self.state_index is not None:
+            self.state_index.update(key, state)
+
+    async def _index_committed_state(self, key: StorageKey, state: Optional[str]) -> None:
+        # The write may still be rolled back together with the update it belongs to
+        if self.state_index is not None:
+            await after_commit(partial(self._index_state, key, state))
+
+    def _storage_key_from_row(self, row) -> StorageKey:
+        destinies = {code: destiny for destiny, code in self.destiny_codes.items()}
+        return StorageKey(
+            bot_id=row.bot_id,
+            chat_id=row.chat_id,
+            user_id=row.user_id,
+            thread_id=row.thread_id or None,
+            destiny=destinies[row.destiny],
+        )
+
+    async def warm_up_index(self) -> None:
+        """Load keys in the watched states into the state index"""
+        if self.state_index is None:
+            return
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                select(*_KEY_COLUMNS).where(fsm_storage_table.c.state.in_(self.state_index.states))
+            )
+            self.state_index.load(self._storage_key_from_row(row) for row in result)
 
     async def close(self) -> None:
         pass
 
+    def build_key(self, key: StorageKey) -> Dict[str, int]:
+        """Primary key values of the row that stores ``key``"""
+        try:
+            destiny = self.destiny_codes[key.destiny]
+        except KeyError:
+            raise ValueError(f"Unknown FSM destiny: {key.destiny}") from None
+        return {
+            "bot_id": key.bot_id,
+            "chat_id": key.chat_id,
+            "user_id": key.user_id,
+            "thread_id": key.thread_id or 0,
+            "destiny": destiny,
+        }
+
     async def set_state(self, key: StorageKey, state: StateType = None) -> None:
-        storage_key = self.key_builder.build(key)
+        storage_key = self.build_key(key)
         state_value = state.state if isinstance(state, State) else state
 
-        async with self.engine.begin() as conn:
+        async with begin_connection(self.engine) as conn:
             if state_value is None:
-                result = await conn.execute(
-                    select(fsm_storage_table.c.data).where(fsm_storage_table.c.key == storage_key)
+                await conn.execute(
+                    _delete_or_update_stmt(storage_key, fsm_storage_table.c.data == _EMPTY_DATA, {"state": None})
                 )
-                row = result.first()
-                if row is None:
-                    return
-                if not row.data:
-                    await conn.execute(
-                        delete(fsm_storage_table).where(fsm_storage_table.c.key == storage_key)
+            else:
+                stmt = (
+                    pg_insert(fsm_storage_table)
+                    .values(**storage_key, state=state_value, data={})
+                    .on_conflict_do_update(
+                        index_elements=_KEY_COLUMNS,
+                        set_={"state": state_value, "updated_at": func.now()},
                     )
-                else:
-                    await conn.execute(
-                        update(fsm_storage_table)
-                        .where(fsm_storage_table.c.key == storage_key)
-                        .values(state=None, updated_at=func.now())
-                    )
-                return
-
-            stmt = (
-                pg_insert(fsm_storage_table)
-                .values(key=storage_key, state=state_value, data={})
-                .on_conflict_do_update(
-                    index_elements=[fsm_storage_table.c.key],
-                    set_={"state": state_value, "updated_at": func.now()},
                 )
-            )
-            await conn.execute(stmt)
+                await conn.execute(stmt)
+        await self._index_committed_state(key, state_value)
 
     async def get_state(self, key: StorageKey) -> Optional[str]:
-        storage_key = self.key_builder.build(key)
-        async with self.engine.begin() as conn:
+        storage_key = self.build_key(key)
+        async with begin_connection(self.engine) as conn:
             result = await conn.execute(
-                select(fsm_storage_table.c.state).where(fsm_storage_table.c.key == storage_key)
+                select(fsm_storage_table.c.state).where(*_key_clause(storage_key))
             )
             row = result.first()
             return row.state if row else None
 
     async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
-        storage_key = self.key_builder.build(key)
-        async with self.engine.begin() as conn:
+        storage_key = self.build_key(key)
+        async with begin_connection(self.engine) as conn:
             if not data:
-                result = await conn.execute(
-                    select(fsm_storage_table.c.state).where(fsm_storage_table.c.key == storage_key)
+                await conn.execute(
+                    _delete_or_update_stmt(storage_key, fsm_storage_table.c.state.is_(None), {"data": _EMPTY_DATA})
                 )
-                row = result.first()
-                if row is None:
-                    return
-                if row.state is None:
-                    await conn.execute(
-                        delete(fsm_storage_table).where(fsm_storage_table.c.key == storage_key)
-                    )
-                else:
-                    await conn.execute(
-                        update(fsm_storage_table)
-                        .where(fsm_storage_table.c.key == storage_key)
-                        .values(data={}, updated_at=func.now())
-                    )
                 return
 
             stmt = (
                 pg_insert(fsm_storage_table)
-                .values(key=storage_key, data=data)
+                .values(**storage_key, data=data)
                 .on_conflict_do_update(
-                    index_elements=[fsm_storage_table.c.key],
+                    index_elements=_KEY_COLUMNS,
                     set_={"data": data, "updated_at": func.now()},
                 )
             )
             await conn.execute(stmt)
 
     async def get_data(self, key: StorageKey) -> Dict[str, Any]:
-        storage_key = self.key_builder.build(key)
-        async with self.engine.begin() as conn:
+        storage_key = self.build_key(key)
+        async with begin_connection(self.engine) as conn:
             result = await conn.execute(
-                select(fsm_storage_table.c.data).where(fsm_storage_table.c.key == storage_key)
+                select(fsm_storage_table.c.data).where(*_key_clause(storage_key))
             )
             row = result.first()
             if row is None or row.data is None:
                 return {}
             return dict(row.data)
+
+    async def set_record(self, key: StorageKey, record: FSMRecord) -> None:
+        """Write state and data with a single statement, an empty record removes the row"""
+        if record.state is None and not record.data:
+            await self.clear(key)
+            return
+        storage_key = self.build_key(key)
+        stmt = pg_insert(fsm_storage_table).values(**storage_key, state=record.state, data=record.data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_KEY_COLUMNS,
+            set_={"state": stmt.excluded.state, "data": stmt.excluded.data, "updated_at": func.now()},
+        )
+        async with begin_connection(self.engine) as conn:
+            await conn.execute(stmt)
+        await self._index_committed_state(key, record.state)
+
+    async def clear(self, key: StorageKey) -> None:
+        """Remove both state and data with a single statement"""
+        storage_key = self.build_key(key)
+        async with begin_connection(self.engine) as conn:
+            await conn.execute(delete(fsm_storage_table).where(*_key_clause(storage_key)))
+        await self._index_committed_state(key, None)
+
+    async def delete_expired(self, older_than: timedelta, batch_size: int = 500) -> int:
+        """Remove records not updated for ``older_than`` in small batches, return the number of removed rows"""
+        expired = (
+            select(*_KEY_COLUMNS)
+            .where(fsm_storage_table.c.updated_at < func.now() - older_than)
+            .limit(batch_size)
+        )
+        stmt = delete(fsm_storage_table).where(tuple_(*_KEY_COLUMNS).in_(expired)).returning(*_KEY_COLUMNS)
+        removed = 0
+        while True:
+            async with self.engine.begin() as conn:
+                rows = (await conn.execute(stmt)).all()
+            for row in rows:
+                self._index_state(self._storage_key_from_row(row), None)
+            removed += len(rows)
+            if len(rows) < batch_size:
+                return removed
+
+    async def idle_keys(self, states: Iterable[str], older_than: timedelta, limit: int = 100) -> List[StorageKey]:
+        """Keys in one of ``states`` not updated for ``older_than``, oldest first"""
+        stmt = (
+            select(*_KEY_COLUMNS)
+            .where(
+                fsm_storage_table.c.state.in_(list(states)),
+                fsm_storage_table.c.updated_at < func.now() - older_than,
+            )
+            .order_by(fsm_storage_table.c.updated_at)
+            .limit(limit)
+        )
+        async with begin_connection(self.engine) as conn:
+            rows = (await conn.execute(stmt)).all()
+        return [self._storage_key_from_row(row) for row in rows]
+
+    async def pop_idle_record(
+        self, key: StorageKey, states: Iterable[str], older_than: timedelta
+    ) -> Optional[FSMRecord]:
+        """Remove the record if it is still idle in one of ``states`` and return it, None otherwise"""
+        stmt = (
+            delete(fsm_storage_table)
+            .where(
+                *_key_clause(self.build_key(key)),
+                fsm_storage_table.c.state.in_(list(states)),
+                fsm_storage_table.c.updated_at < func.now() - older_than,
+            )
+            .returning(fsm_storage_table.c.state, fsm_storage_table.c.data)
+        )
+        async with begin_connection(self.engine) as conn:
+            row = (await conn.execute(stmt)).first()
+        if row is None:
+            return None
+        await self._index_committed_state(key, None)
+        return FSMRecord(state=row.state, data=dict(row.data or {}))
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data into the stored document on the server side and return the result"""
+        if not data:
+            return await self.get_data(key)
+        storage_key = self.build_key(key)
+        stmt = pg_insert(fsm_storage_table).values(**storage_key, data=data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_KEY_COLUMNS,
+            set_={
+                "data": fsm_storage_table.c.data.op("||", return_type=JSONB)(stmt.excluded.data),
+                "updated_at": func.now(),
+            },
+        ).returning(fsm_storage_table.c.data)
+        async with begin_connection(self.engine) as conn:
+            result = await conn.execute(stmt)
+            return dict(result.scalar_one())
+
+    async def get_record(self, key: StorageKey) -> FSMRecord:
+        """Load state and data with a single query"""
+        storage_key = self.build_key(key)
+        async with begin_connection(self.engine) as conn:
+            result = await conn.execute(
+                select(fsm_storage_table.c.state, fsm_storage_table.c.data)
+                .where(*_key_clause(storage_key))
+            )
+            row = result.first()
+            if row is None:
+                return FSMRecord()
+            return FSMRecord(state=row.state, data=dict(row.data or {}))
+
+
+_UNKNOWN: Any = object()
+
+
+@dataclass
+class _CachedRecord:
+    state: Any = _UNKNOWN
+    data: Any = _UNKNOWN
+
+
+class CachedStorage(BaseStorage):
+    """Write-through L1 cache in front of another FSM storage.
+
+    Reads are served from memory when possible, writes always go to the wrapped storage
+    first and update the cache afterwards, records cached during an update that is rolled back
+    are dropped. The cache is local to the process, so it is only safe when a single bot replica
+    works with the FSM table.
+    """
+
+    def __init__(
+        self,
+        storage: PostgresStorage,
+        max_size: int = 10_000,
+        ttl: Optional[float] = 60,
+    ) -> None:
+        self.storage = storage
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    async def close(self) -> None:
+        self.cache.clear()
+        await self.storage.close()
+
+    def _cache_key(self, key: StorageKey) -> Hashable:
+        return tuple(self.storage.build_key(key).values())
+
+    def _lookup(self, key: StorageKey, part: str) -> Any:
+        record = self.cache.get(self._cache_key(key), count=False)
+        value = getattr(record, part) if record is not None else _UNKNOWN
+        if value is _UNKNOWN:
+            self.cache.stats.misses += 1
+        else:
+            self.cache.stats.hits += 1
+        return value
+
+    def _put_record(self, key: StorageKey, record: _CachedRecord) -> None:
+        self.cache.set(self._cache_key(key), record)
+        # Written or read inside the update's transaction, the record is not committed yet
+        after_rollback(partial(self.invalidate, key))
+
+    def _record_for_write(self, key: StorageKey) -> _CachedRecord:
+        return self.cache.get(self._cache_key(key), count=False) or _CachedRecord()
+
+    def invalidate(self, key: StorageKey) -> None:
+        self.cache.pop(self._cache_key(key))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_value = state.state if isinstance(state, State) else state
+        try:
+            await self.storage.set_state(key, state_value)
+        except Exception:
+            self.invalidate(key)
+            raise
+        record = self._record_for_write(key)
+        record.state = state_value
+        self._put_record(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state = self._lookup(key, "state")
+        if state is not _UNKNOWN:
+            return state
+        state = await self.storage.get_state(key)
+        record = self._record_for_write(key)
+        record.state = state
+        self._put_record(key, record)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        try:
+            await self.storage.set_data(key, data)
+        except Exception:
+            self.invalidate(key)
+            raise
+        record = self._record_for_write(key)
+        record.data = dict(data)
+        self._put_record(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = self._lookup(key, "data")
+        if data is not _UNKNOWN:
+            return dict(data)
+        data = await self.storage.get_data(key)
+        record = self._record_for_write(key)
+        record.data = dict(data)
+        self._put_record(key, record)
+        return data
+
+    async def set_record(self, key: StorageKey, record: FSMRecord) -> None:
+        try:
+            await self.storage.set_record(key, record)
+        except Exception:
+            self.invalidate(key)
+            raise
+        self._put_record(key, _CachedRecord(state=record.state, data=dict(record.data)))
+
+    async def clear(self, key: StorageKey) -> None:
+        try:
+            await self.storage.clear(key)
+        except Exception:
+            self.invalidate(key)
+            raise
+        self._put_record(key, _CachedRecord(state=None, data={}))
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            merged = await self.storage.update_data(key, data)
+        except Exception:
+            self.invalidate(key)
+            raise
+        record = self._record_for_write(key)
+        record.data = dict(merged)
+        self._put_record(key, record)
+        return merged
+
+    async def idle_keys(self, states: Iterable[str], older_than: timedelta, limit: int = 100) -> List[StorageKey]:
+        return await self.storage.idle_keys(states, older_than, limit=limit)
+
+    async def pop_idle_record(
+        self, key: StorageKey, states: Iterable[str], older_than: timedelta
+    ) -> Optional[FSMRecord]:
+        # The removal may still be rolled back by the caller's transaction, so the key is not cached as empty
+        try:
+            return await self.storage.pop_idle_record(key, states, older_than)
+        finally:
+            self.invalidate(key)
+
+    async def get_record(self, key: StorageKey) -> FSMRecord:
+        record = self.cache.get(self._cache_key(key), count=False)
+        if record is not None and record.state is not _UNKNOWN and record.data is not _UNKNOWN:
+            self.cache.stats.hits += 1
+            return FSMRecord(state=record.state, data=dict(record.data))
+        self.cache.stats.misses += 1
+        loaded = await self.storage.get_record(key)
+        self._put_record(key, _CachedRecord(state=loaded.state, data=dict(loaded.data)))
+        return loaded
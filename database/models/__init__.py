@@ -4,3 +4,4 @@ Base = declarative_base()
 
 from .user import User  # noqa: E402,F401
 from .bowel_movement import BowelMovement  # noqa: E402,F401
+from .bowel_movement_daily_stats import BowelMovementDailyStats  # noqa: E402,F401
@@ -1,7 +1,7 @@
 from datetime import date
 
 from sqlalchemy import (
-    Column, Date, DateTime, ForeignKey,
+    BigInteger, Column, Date, DateTime, ForeignKey, Index,
     Integer, Text, Boolean, false
 )
 from sqlalchemy.orm import relationship
@@ -13,10 +13,13 @@ from database.models import Base
 class BowelMovement(Base):
     """Record of bowel movement"""
     __tablename__ = "bowel_movements"
+    # Fetch server-generated values in the INSERT/UPDATE itself, repositories only flush
+    __mapper_args__ = {"eager_defaults": True}
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.telegram_id", ondelete="CASCADE"), nullable=False)
-    date = Column(Date, default=date.today, nullable=False, index=True)
+    # The table is partitioned by month on date, so the primary key has to include it
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, ForeignKey("users.telegram_id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, primary_key=True, default=date.today, nullable=False)
     time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Additional notes
@@ -30,6 +33,19 @@ class BowelMovement(Base):
     # Relationships
     user = relationship("User", back_populates="bowel_movements")
 
+    __table_args__ = (
+        # Keyset pagination of the user history
+        Index("ix_bowel_movements_user_id_date_time_id", user_id, date.desc(), time.desc(), id.desc()),
+        # Common filters: real records and records with blood
+        Index(
+            "ix_bowel_movements_user_id_date_time_real", user_id, date, time,
+            postgresql_where=~is_false_urge,
+        ),
+        Index("ix_bowel_movements_user_id_date_blood", user_id, date, postgresql_where=blood_lvl > 0),
+        # Monthly partitions are created by bot/tasks/partition_maintenance.py
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
 
 from enum import IntEnum
 
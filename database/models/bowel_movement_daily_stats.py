@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer, text
+
+from database.models import Base
+
+
+def _counter() -> Column:
+    return Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+
+class BowelMovementDailyStats(Base):
+    """Per-user daily rollup of bowel movements, kept up to date by BowelMovementRepository"""
+    __tablename__ = "bowel_movement_daily_stats"
+
+    user_id = Column(BigInteger, ForeignKey("users.telegram_id", ondelete="CASCADE"), primary_key=True)
+    # Date in the user's timezone at the time of writing, python -m database.rebuild_stats recomputes it
+    local_date = Column(Date, primary_key=True)
+
+    total = _counter()
+    false_urges = _counter()
+    consistency_liquid = _counter()
+    consistency_mushy = _counter()
+    consistency_normal = _counter()
+    consistency_hard = _counter()
+    with_blood = _counter()
+    with_mucus = _counter()
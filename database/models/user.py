@@ -10,8 +10,10 @@ from database.models import Base
 class User(Base):
     """Bot user model"""
     __tablename__ = "users"
+    # Fetch server-generated values in the INSERT/UPDATE itself, repositories only flush
+    __mapper_args__ = {"eager_defaults": True}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     telegram_id = Column(BigInteger, unique=True, index=True, nullable=False)
     language_code = Column(String(10), default="ru")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,76 @@
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# bowel_movements is range-partitioned by month on "date"
+PARTITIONED_TABLE = "bowel_movements"
+
+_PARTITION_NAME = re.compile(rf"^{PARTITIONED_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month of a partition created by :func:`create_partition_sql`, None for other tables"""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_partition_sql(month: date) -> str:
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+async def create_future_partitions(engine: AsyncEngine, months_ahead: int, today: Optional[date] = None) -> None:
+    """Make sure partitions exist from the current month up to ``months_ahead`` months later"""
+    current = month_start(today or date.today())
+    async with engine.begin() as conn:
+        for offset in range(months_ahead + 1):
+            await conn.execute(text(create_partition_sql(add_months(current, offset))))
+
+
+async def detach_old_partitions(engine: AsyncEngine, retain_months: int, today: Optional[date] = None) -> List[str]:
+    """
+    Detach partitions that end before the last ``retain_months`` months and return their names.
+    Detached tables keep their rows and can be archived or dropped separately.
+    """
+    cutoff = add_months(month_start(today or date.today()), -retain_months)
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        names = sorted(
+            name for name in result.scalars()
+            if (month := partition_month(name)) is not None and month < cutoff
+        )
+        await conn.rollback()
+        # DETACH ... CONCURRENTLY doesn't block queries but can't run inside a transaction
+        autocommit_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name in names:
+            await autocommit_conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name} CONCURRENTLY"))
+    return names
@@ -0,0 +1,63 @@
+"""Rebuild bowel_movement_daily_stats from bowel_movements.
+
+Usage:
+    python -m database.rebuild_stats [--user-id TELEGRAM_ID] [--batch-size N]
+
+Users are processed in batches, each in its own short transaction, so the bot can keep
+writing while the rollup is rebuilt: only the users rows of the current batch are locked.
+"""
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from database.models import User
+from database.repository.daily_stats import rebuild_daily_stats
+from database.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild(user_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """Rebuild the rollup of one user or of all users, return the number of written rows"""
+    if user_id is not None:
+        async with engine.begin() as conn:
+            return await rebuild_daily_stats(conn, [user_id])
+
+    written = 0
+    last_id: Optional[int] = None
+    while True:
+        query = select(User.telegram_id).order_by(User.telegram_id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(User.telegram_id > last_id)
+        async with engine.begin() as conn:
+            user_ids: List[int] = list((await conn.execute(query)).scalars())
+            if not user_ids:
+                return written
+            written += await rebuild_daily_stats(conn, user_ids)
+        last_id = user_ids[-1]
+        logger.info("Rebuilt daily stats up to user %s, %d rows so far", last_id, written)
+
+
+async def _run(user_id: Optional[int], batch_size: int) -> int:
+    try:
+        return await rebuild(user_id=user_id, batch_size=batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild bowel_movement_daily_stats from bowel_movements")
+    parser.add_argument("--user-id", type=int, help="Telegram ID of the only user to rebuild")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    written = asyncio.run(_run(args.user_id, args.batch_size))
+    logger.info("Daily stats rebuilt, %d rows written", written)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,39 @@
-from datetime import date, datetime
-from typing import List, Optional
+import base64
+import binascii
+import struct
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlalchemy import select, delete, and_
+from sqlalchemy import select, delete, and_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database.models import BowelMovementDailyStats
 from database.models.bowel_movement import BowelMovement
+from database.repository.daily_stats import STATS_SOURCE_COLUMNS, apply_daily_stats_delta, stats_delta
+
+# Cursor payload: date ordinal, time in microseconds since the epoch (UTC), id
+_CURSOR_FORMAT = struct.Struct(">Iqq")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_history_cursor(bowel_movement: BowelMovement) -> str:
+    """Opaque cursor pointing right after ``bowel_movement`` in the history order (27 characters)"""
+    movement_time = bowel_movement.time
+    if movement_time.tzinfo is None:
+        movement_time = movement_time.replace(tzinfo=timezone.utc)
+    micros = (movement_time - _EPOCH) // timedelta(microseconds=1)
+    payload = _CURSOR_FORMAT.pack(bowel_movement.date.toordinal(), micros, bowel_movement.id)
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_history_cursor(cursor: str) -> Tuple[date, datetime, int]:
+    """Position encoded by :func:`encode_history_cursor`, raises ValueError for a malformed cursor"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ordinal, micros, movement_id = _CURSOR_FORMAT.unpack(payload)
+        return date.fromordinal(ordinal), _EPOCH + timedelta(microseconds=micros), movement_id
+    except (binascii.Error, struct.error, ValueError, OverflowError):
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from None
 
 
 class BowelMovementRepository:
@@ -31,6 +60,50 @@ class BowelMovementRepository:
         return list(result.scalars().all())
 
 
+    async def get_bowel_movements_page(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 20,
+    ) -> Tuple[List[BowelMovement], Optional[str]]:
+        """
+        Page of the user history, newest first, and the cursor of the next page (None on the last page).
+        Served by ix_bowel_movements_user_id_date_time_id, so every page costs the same.
+        """
+        query = select(BowelMovement).where(BowelMovement.user_id == user_id)
+        if cursor is not None:
+            query = query.where(
+                tuple_(BowelMovement.date, BowelMovement.time, BowelMovement.id) < decode_history_cursor(cursor)
+            )
+        query = query.order_by(
+            BowelMovement.date.desc(), BowelMovement.time.desc(), BowelMovement.id.desc()
+        ).limit(limit + 1)
+
+        result = await session.execute(query)
+        bowel_movements = list(result.scalars().all())
+        if len(bowel_movements) <= limit:
+            return bowel_movements, None
+        bowel_movements = bowel_movements[:limit]
+        return bowel_movements, encode_history_cursor(bowel_movements[-1])
+
+
+    async def iter_bowel_movements(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            cursor: Optional[str] = None,
+            page_size: int = 100,
+    ) -> AsyncIterator[BowelMovement]:
+        """Stream the user history page by page, newest first"""
+        while True:
+            bowel_movements, cursor = await self.get_bowel_movements_page(session, user_id, cursor, page_size)
+            for bowel_movement in bowel_movements:
+                yield bowel_movement
+            if cursor is None:
+                return
+
+
     async def create_bowel_movement(
             self,
             session: AsyncSession,
@@ -38,7 +111,10 @@ class BowelMovementRepository:
             movement_date: Optional[date] = None,
             movement_time: Optional[datetime] = None,
             notes: Optional[str] = None,
-            stool_consistency: Optional[int] = None
+            stool_consistency: Optional[int] = None,
+            mucus: Optional[int] = None,
+            blood_lvl: Optional[int] = None,
+            is_false_urge: bool = False,
     ) -> BowelMovement:
         """Create a new bowel movement record (fact of going to the toilet)"""
 
@@ -48,48 +124,14 @@ class BowelMovementRepository:
             time=movement_time,
             notes=notes,
             stool_consistency=stool_consistency,
-
+            mucus=mucus,
+            blood_lvl=blood_lvl,
+            is_false_urge=is_false_urge,
         )
         session.add(bowel_movement)
-        await session.commit()
-        await session.refresh(bowel_movement)
-        return bowel_movement
-
-
-    async def update_bowel_movement(
-            self,
-            user_id: int,
-            session: AsyncSession,
-            movement_id: int,
-            notes: Optional[str] = None,
-            stool_consistency: Optional[int] = None,
-            blood_lvl: Optional[int] = None,
-            mucus: Optional[int] = None,
-            is_false_urge: Optional[bool] = None,
-    ) -> Optional[BowelMovement]:
-        """Update bowel movement fields if provided."""
-        result = await session.execute(
-            select(BowelMovement).where(
-                and_(BowelMovement.id == movement_id, BowelMovement.user_id == user_id)
-            )
-        )
-        bowel_movement = result.scalar_one_or_none()
-        if bowel_movement is None:
-            return None
-
-        if notes is not None:
-            bowel_movement.notes = notes
-        if stool_consistency is not None:
-            bowel_movement.stool_consistency = stool_consistency
-        if blood_lvl is not None:
-            bowel_movement.blood_lvl = blood_lvl
-        if mucus is not None:
-            bowel_movement.mucus = mucus
-        if is_false_urge is not None:
-            bowel_movement.is_false_urge = is_false_urge
-
-        await session.commit()
-        await session.refresh(bowel_movement)
+        # Server defaults come back with INSERT ... RETURNING, DatabaseMiddleware commits the update
+        await session.flush()
+        await apply_daily_stats_delta(session, user_id, bowel_movement.time, stats_delta(bowel_movement))
         return bowel_movement
 
 
@@ -101,12 +143,15 @@ class BowelMovementRepository:
     ) -> bool:
         """Delete bowel movement by ID"""
         result = await session.execute(
-            delete(BowelMovement).where(
-                and_(BowelMovement.id == bowel_movement_id, BowelMovement.user_id == user_id)
-            )
+            delete(BowelMovement)
+            .where(and_(BowelMovement.id == bowel_movement_id, BowelMovement.user_id == user_id))
+            .returning(BowelMovement.time, *(getattr(BowelMovement, name) for name in STATS_SOURCE_COLUMNS))
         )
-        await session.commit()
-        return result.rowcount == 1
+        row = result.one_or_none()
+        if row is None:
+            return False
+        await apply_daily_stats_delta(session, user_id, row.time, stats_delta(row, sign=-1))
+        return True
 
 
     async def get_bowel_movement_by_id(
@@ -122,3 +167,24 @@ class BowelMovementRepository:
 
         result: BowelMovement = await session.scalar(query)
         return result
+
+
+    async def get_daily_stats(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            start_date: date,
+            end_date: date,
+    ) -> List[BowelMovementDailyStats]:
+        """Daily rollup rows of the user between two local dates, oldest first"""
+        query = (
+            select(BowelMovementDailyStats)
+            .where(
+                BowelMovementDailyStats.user_id == user_id,
+                BowelMovementDailyStats.local_date >= start_date,
+                BowelMovementDailyStats.local_date <= end_date,
+            )
+            .order_by(BowelMovementDailyStats.local_date)
+        )
+        result = await session.scalars(query)
+        return list(result.all())
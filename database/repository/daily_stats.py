@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import Date, DateTime, Integer, cast, delete, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.sql import func
+
+from database.models import BowelMovement, BowelMovementDailyStats, User
+from database.models.bowel_movement import StoolConsistency
+
+STATS_COUNTERS = (
+    "total",
+    "false_urges",
+    "consistency_liquid",
+    "consistency_mushy",
+    "consistency_normal",
+    "consistency_hard",
+    "with_blood",
+    "with_mucus",
+)
+
+CONSISTENCY_COUNTERS = {
+    StoolConsistency.LIQUID: "consistency_liquid",
+    StoolConsistency.MUSHY: "consistency_mushy",
+    StoolConsistency.NORMAL: "consistency_normal",
+    StoolConsistency.HARD: "consistency_hard",
+}
+
+# Columns of bowel_movements the counters depend on
+STATS_SOURCE_COLUMNS = ("stool_consistency", "blood_lvl", "mucus", "is_false_urge")
+
+_stats_table = BowelMovementDailyStats.__table__
+
+
+def stats_delta(bowel_movement: Any, sign: int = 1) -> Dict[str, int]:
+    """Counter changes caused by adding (sign=1) or removing (sign=-1) one bowel movement"""
+    delta = dict.fromkeys(STATS_COUNTERS, 0)
+    delta["total"] = sign
+    if bowel_movement.is_false_urge:
+        delta["false_urges"] = sign
+    consistency_counter = CONSISTENCY_COUNTERS.get(bowel_movement.stool_consistency)
+    if consistency_counter is not None:
+        delta[consistency_counter] = sign
+    if (bowel_movement.blood_lvl or 0) > 0:
+        delta["with_blood"] = sign
+    if (bowel_movement.mucus or 0) > 0:
+        delta["with_mucus"] = sign
+    return delta
+
+
+def local_date(movement_time, timezone_offset):
+    """SQL expression of the date of ``movement_time`` shifted by ``timezone_offset`` minutes"""
+    # Constants are inlined so that the same expression in SELECT and GROUP BY has no bind parameters
+    return cast(
+        func.timezone(literal_column("'UTC'"), movement_time)
+        + literal_column("interval '1 minute'") * func.coalesce(timezone_offset, literal_column("0")),
+        Date,
+    )
+
+
+async def apply_daily_stats_delta(
+        session: AsyncSession,
+        user_id: int,
+        movement_time: datetime,
+        delta: Dict[str, int],
+) -> None:
+    """Add ``delta`` to the user's counters of the day of ``movement_time`` with a single upsert
+
+    The user row is share-locked, so the delta waits for a concurrent timezone change and its rebuild.
+    """
+    if not any(delta.values()):
+        return
+    source = select(
+        User.telegram_id,
+        local_date(literal(movement_time, DateTime(timezone=True)), User.timezone_offset),
+        *(literal(delta[counter], Integer) for counter in STATS_COUNTERS),
+    ).where(User.telegram_id == user_id).with_for_update(read=True, of=User)
+    stmt = pg_insert(_stats_table).from_select(["user_id", "local_date", *STATS_COUNTERS], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_stats_table.c.user_id, _stats_table.c.local_date],
+        set_={counter: _stats_table.c[counter] + stmt.excluded[counter] for counter in STATS_COUNTERS},
+    )
+    await session.execute(stmt)
+
+
+def daily_stats_rollup(user_ids: Optional[Sequence[int]] = None):
+    """SELECT computing the rollup rows from bowel_movements, for all users or only ``user_ids``"""
+    day = local_date(BowelMovement.time, User.timezone_offset)
+    counters = [
+        func.count().label("total"),
+        func.count().filter(BowelMovement.is_false_urge).label("false_urges"),
+        *(
+            func.count().filter(BowelMovement.stool_consistency == consistency.value).label(counter)
+            for consistency, counter in CONSISTENCY_COUNTERS.items()
+        ),
+        func.count().filter(BowelMovement.blood_lvl > 0).label("with_blood"),
+        func.count().filter(BowelMovement.mucus > 0).label("with_mucus"),
+    ]
+    query = (
+        select(BowelMovement.user_id, day.label("local_date"), *counters)
+        .join(User, User.telegram_id == BowelMovement.user_id)
+        .group_by(BowelMovement.user_id, day)
+    )
+    if user_ids is not None:
+        query = query.where(BowelMovement.user_id.in_(user_ids))
+    return query
+
+
+async def rebuild_daily_stats(conn: AsyncConnection, user_ids: Sequence[int]) -> int:
+    """Recompute the rollup of ``user_ids`` from bowel_movements, return the number of written rows
+
+    The users rows are locked first, in key order: deltas share-lock them too, so a concurrent
+    insert either lands before the rebuild reads bowel_movements or waits until it commits.
+    """
+    await conn.execute(
+        select(User.telegram_id)
+        .where(User.telegram_id.in_(user_ids))
+        .order_by(User.telegram_id)
+        .with_for_update()
+    )
+    await conn.execute(delete(_stats_table).where(_stats_table.c.user_id.in_(user_ids)))
+    result = await conn.execute(
+        pg_insert(_stats_table).from_select(["user_id", "local_date", *STATS_COUNTERS], daily_stats_rollup(user_ids))
+    )
+    return result.rowcount
@@ -1,9 +1,11 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import exists, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models.user import User
+from database.repository.daily_stats import rebuild_daily_stats
 
 
 class UserRepository:
@@ -29,11 +31,58 @@ class UserRepository:
             timezone_offset=timezone_offset
         )
         session.add(user)
-        await session.commit()
-        await session.refresh(user)
+        # Server defaults come back with INSERT ... RETURNING, DatabaseMiddleware commits the update
+        await session.flush()
+        return user
+
+    async def get_or_create_user(
+            self,
+            session: AsyncSession,
+            telegram_id: int,
+            language_code: Optional[str] = "ru",
+            timezone_offset: int = 0,
+    ) -> User:
+        """
+        Get user or create a new one. Existing users are read with a plain SELECT,
+        only a miss falls back to INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        or the existing row when a concurrent update inserted it first.
+        """
+        user = await self.get_user_by_telegram_id(session, telegram_id)
+        if user is not None:
+            return user
+
+        users = User.__table__
+        inserted = (
+            pg_insert(users)
+            .values(telegram_id=telegram_id, language_code=language_code, timezone_offset=timezone_offset)
+            .on_conflict_do_nothing(index_elements=[users.c.telegram_id])
+            .returning(*users.c)
+            .cte("inserted")
+        )
+        existing = select(*users.c).where(users.c.telegram_id == telegram_id, ~exists(select(inserted.c.id)))
+        stmt = select(User).from_statement(union_all(select(*inserted.c), existing))
+        user = (await session.scalars(stmt)).first()
+        if user is None:
+            # The conflicting row was committed by a concurrent update after this statement started
+            user = await self.get_user_by_telegram_id(session, telegram_id)
         return user
 
     async def update_user(self, session: AsyncSession, user: User) -> User:
         session.add(user)
-        await session.commit()
+        await session.flush()
         return user
+
+    async def set_timezone_offset(self, session: AsyncSession, telegram_id: int, offset: int) -> Optional[int]:
+        """Set the timezone offset in minutes, return it or None if the user doesn't exist"""
+        result = await session.execute(
+            update(User)
+            .where(User.telegram_id == telegram_id)
+            .values(timezone_offset=offset)
+            .returning(User.timezone_offset)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def rebuild_user_daily_stats(self, session: AsyncSession, telegram_id: int) -> None:
+        """Recount the user's stats rollup in the session transaction"""
+        await rebuild_daily_stats(await session.connection(), [telegram_id])
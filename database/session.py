@@ -1,7 +1,20 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import inspect
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection, AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
 
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
@@ -17,6 +30,169 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+class _UpdateConnection:
+    """Connection of the update, checked out from the pool only when something needs it"""
+
+    def __init__(self, async_engine: AsyncEngine, single_transaction: bool) -> None:
+        self.engine = async_engine
+        self.single_transaction = single_transaction
+        self.conn: Optional[AsyncConnection] = None
+
+    async def connection(self) -> AsyncConnection:
+        if self.conn is None:
+            conn = self.engine.connect()
+            await conn.start()
+            if self.single_transaction:
+                try:
+                    await conn.begin()
+                except BaseException:
+                    await conn.close()
+                    raise
+            self.conn = conn
+        return self.conn
+
+    async def finish(self, commit: bool) -> None:
+        if self.conn is None:
+            return
+        try:
+            if self.conn.in_transaction():
+                if commit:
+                    await self.conn.commit()
+                else:
+                    await self.conn.rollback()
+        finally:
+            await self.conn.close()
+
+
+# Connection bound to the update that is currently processed (see update_connection_scope)
+_update_connection: ContextVar[Optional[_UpdateConnection]] = ContextVar("update_connection", default=None)
+
+
+@dataclass
+class _TransactionHooks:
+    on_commit: List[Callable[[], Any]] = field(default_factory=list)
+    on_rollback: List[Callable[[], Any]] = field(default_factory=list)
+
+
+# Callbacks waiting for the end of the current update (see transaction_hooks_scope)
+_transaction_hooks: ContextVar[Optional[_TransactionHooks]] = ContextVar("transaction_hooks", default=None)
+
+
+async def _run_hooks(callbacks: List[Callable[[], Any]]) -> None:
+    for callback in callbacks:
+        try:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            # The transaction is already over, the remaining callbacks must run anyway
+            logger.exception("Transaction hook %r failed: %s", callback, e)
+
+
+@asynccontextmanager
+async def transaction_hooks_scope() -> AsyncIterator[None]:
+    """
+    Run callbacks of after_commit() when the block exits normally and of after_rollback() when it raises.
+    Nested scopes join the outermost one, so callbacks wait for the end of the whole update.
+    """
+    if _transaction_hooks.get() is not None:
+        yield
+        return
+    hooks = _TransactionHooks()
+    token = _transaction_hooks.set(hooks)
+    try:
+        yield
+    except BaseException:
+        _transaction_hooks.reset(token)
+        await _run_hooks(hooks.on_rollback)
+        raise
+    _transaction_hooks.reset(token)
+    await _run_hooks(hooks.on_commit)
+
+
+async def after_commit(callback: Callable[[], Any]) -> None:
+    """Run ``callback`` once the current update is committed, right away outside of a hooks scope"""
+    hooks = _transaction_hooks.get()
+    if hooks is None:
+        await _run_hooks([callback])
+    else:
+        hooks.on_commit.append(callback)
+
+
+def after_rollback(callback: Callable[[], Any]) -> None:
+    """Run ``callback`` if the current update is rolled back, nothing to undo outside of a hooks scope"""
+    hooks = _transaction_hooks.get()
+    if hooks is not None:
+        hooks.on_rollback.append(callback)
+
+
+@asynccontextmanager
+async def update_connection_scope(
+        single_transaction: bool = True,
+        async_engine: AsyncEngine = engine,
+) -> AsyncIterator[None]:
+    """
+    Bind one pool connection to the current update.
+    FSM storage and sessions from get_db() reuse it instead of checking out their own.
+    The connection is checked out on first use, updates that never touch the database don't take one.
+    With single_transaction=True everything done during the update is committed at once.
+    Transaction hooks run after the connection is committed and released.
+    """
+    scope = _UpdateConnection(async_engine, single_transaction)
+    async with transaction_hooks_scope():
+        token = _update_connection.set(scope)
+        try:
+            yield
+        except BaseException:
+            await scope.finish(commit=False)
+            raise
+        else:
+            await scope.finish(commit=True)
+        finally:
+            _update_connection.reset(token)
+
+
+@asynccontextmanager
+async def begin_connection(async_engine: AsyncEngine = engine) -> AsyncIterator[AsyncConnection]:
+    """
+    Connection with an open transaction for a short unit of work.
+    Reuses the connection bound to the current update when it belongs to the same engine.
+    """
+    scope = _update_connection.get()
+    if scope is None or scope.engine.sync_engine is not async_engine.sync_engine:
+        async with async_engine.begin() as new_conn:
+            yield new_conn
+        return
+    conn = await scope.connection()
+    if conn.in_transaction():
+        yield conn
+    else:
+        async with conn.begin():
+            yield conn
+
+
+class _UpdateSession(Session):
+    """Session that takes the update connection when it executes its first statement"""
+
+    def __init__(self, *args: Any, update_connection: _UpdateConnection, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.update_connection = update_connection
+
+    def get_bind(self, *args: Any, **kwargs: Any):
+        conn = self.update_connection.conn
+        if conn is None:
+            # Statements run in the greenlet of AsyncSession, so the connection can be awaited here
+            conn = await_only(self.update_connection.connection())
+        return conn.sync_connection
+
+
+def _new_session() -> AsyncSession:
+    scope = _update_connection.get()
+    if scope is None:
+        return AsyncSessionLocal()
+    return AsyncSessionLocal(sync_session_class=_UpdateSession, update_connection=scope)
+
+
 async def get_db() -> AsyncSession:
     """
     Dependency function to get database session.
@@ -24,8 +200,40 @@ async def get_db() -> AsyncSession:
         async with get_db() as session:
             await session.execute(...)
     """
-    async with AsyncSessionLocal() as session:
+    async with _new_session() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+class LazySession:
+    """
+    Proxy to an AsyncSession that is created on first use.
+    Updates that never touch the database don't create a session,
+    and commit/rollback are skipped when no transaction was started.
+    """
+
+    def __init__(self) -> None:
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def is_used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = _new_session()
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        if self._session is not None and self._session.in_transaction():
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None and self._session.in_transaction():
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
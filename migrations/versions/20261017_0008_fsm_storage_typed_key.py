@@ -0,0 +1,119 @@
+"""key fsm_storage rows by typed columns
+
+Revision ID: 20261017_0008
+Revises: 20260223_0007
+Create Date: 2026-10-17
+
+The new table is filled in small committed batches while the bot keeps using the old one,
+then rows changed during the backfill are copied again and the tables are swapped
+under a short exclusive lock. The old table is kept as fsm_storage_legacy.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from config.settings import settings
+
+revision: str = "20261017_0008"
+down_revision: Union[str, None] = "20260223_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+# Old keys were built by DefaultKeyBuilder(with_destiny=True):
+#   fsm:<chat_id>:<user_id>:<destiny> or fsm:<chat_id>:<thread_id>:<user_id>:<destiny>
+COPY_ROWS_SQL = """
+INSERT INTO fsm_storage_v2 (bot_id, chat_id, user_id, thread_id, destiny, state, data, updated_at)
+SELECT :bot_id,
+       parts[2]::bigint,
+       parts[array_length(parts, 1) - 1]::bigint,
+       CASE WHEN array_length(parts, 1) = 5 THEN parts[3]::bigint ELSE 0 END,
+       CASE parts[array_length(parts, 1)]
+           WHEN 'default' THEN 0
+           WHEN 'bowel_movement' THEN 1
+           WHEN 'timezone' THEN 2
+       END,
+       state,
+       data,
+       updated_at
+FROM (SELECT string_to_array(key, ':') AS parts, state, data, updated_at FROM fsm_storage {where}) AS old
+WHERE parts[array_length(parts, 1)] IN ('default', 'bowel_movement', 'timezone')
+ON CONFLICT (bot_id, chat_id, user_id, thread_id, destiny)
+DO UPDATE SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fsm_storage_v2",
+        sa.Column("bot_id", sa.BigInteger(), nullable=False),
+        sa.Column("chat_id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("thread_id", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("destiny", sa.SmallInteger(), nullable=False),
+        sa.Column("state", sa.String(length=128), nullable=True),
+        sa.Column(
+            "data",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'{}'::jsonb"),
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint(
+            "bot_id", "chat_id", "user_id", "thread_id", "destiny",
+            name="fsm_storage_v2_pkey",
+        ),
+    )
+    # Leave free space in pages so state updates stay HOT
+    op.execute("ALTER TABLE fsm_storage_v2 SET (fillfactor = 70)")
+
+    bot_id = int(settings.BOT_TOKEN.split(":")[0])
+    conn = op.get_bind()
+    # Margin for transactions that were already running when the backfill started
+    started_at = conn.execute(sa.text("SELECT now() - interval '1 minute'")).scalar_one()
+
+    # Backfill in committed batches without blocking the running bot
+    with op.get_context().autocommit_block():
+        last_key = ""
+        while True:
+            keys = conn.execute(
+                sa.text("SELECT key FROM fsm_storage WHERE key > :last_key ORDER BY key LIMIT :limit"),
+                {"last_key": last_key, "limit": BATCH_SIZE},
+            ).scalars().all()
+            if not keys:
+                break
+            conn.execute(
+                sa.text(COPY_ROWS_SQL.format(where="WHERE key = ANY(:keys)")),
+                {"bot_id": bot_id, "keys": list(keys)},
+            )
+            last_key = keys[-1]
+
+    # Catch up with rows changed during the backfill and swap the tables
+    op.execute("LOCK TABLE fsm_storage IN ACCESS EXCLUSIVE MODE")
+    conn.execute(
+        sa.text(COPY_ROWS_SQL.format(where="WHERE updated_at >= :started_at")),
+        {"bot_id": bot_id, "started_at": started_at},
+    )
+    # Rows deleted from the old table after they were copied, however recently, must not come back
+    conn.execute(
+        sa.text(
+            "DELETE FROM fsm_storage_v2 AS new WHERE NOT EXISTS ("
+            "SELECT 1 FROM fsm_storage AS old WHERE old.key = concat_ws(':', 'fsm', new.chat_id::text, "
+            "NULLIF(new.thread_id, 0)::text, new.user_id::text, "
+            "CASE new.destiny WHEN 0 THEN 'default' WHEN 1 THEN 'bowel_movement' WHEN 2 THEN 'timezone' END))"
+        )
+    )
+    op.rename_table("fsm_storage", "fsm_storage_legacy")
+    op.execute("ALTER TABLE fsm_storage_legacy RENAME CONSTRAINT fsm_storage_pkey TO fsm_storage_legacy_pkey")
+    op.rename_table("fsm_storage_v2", "fsm_storage")
+    op.execute("ALTER TABLE fsm_storage RENAME CONSTRAINT fsm_storage_v2_pkey TO fsm_storage_pkey")
+
+
+def downgrade() -> None:
+    # FSM changes made after the upgrade are not copied back
+    op.drop_table("fsm_storage")
+    op.rename_table("fsm_storage_legacy", "fsm_storage")
+    op.execute("ALTER TABLE fsm_storage RENAME CONSTRAINT fsm_storage_legacy_pkey TO fsm_storage_pkey")
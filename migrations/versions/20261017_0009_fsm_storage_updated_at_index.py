@@ -0,0 +1,35 @@
+"""index fsm_storage.updated_at for the TTL sweeper
+
+Revision ID: 20261017_0009
+Revises: 20261017_0008
+Create Date: 2026-10-17
+
+Every FSM write changes updated_at, so a B-tree index on it would make every update
+non-HOT and the fillfactor of fsm_storage useless. A BRIN index is a summarizing one,
+since PostgreSQL 16 it doesn't prevent HOT updates. It is coarse because rows are
+updated in place, which is fine for the sweeper that runs rarely and deletes in batches.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "20261017_0009"
+down_revision: Union[str, None] = "20261017_0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fsm_storage_updated_at",
+            "fsm_storage",
+            ["updated_at"],
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_fsm_storage_updated_at", table_name="fsm_storage", postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""index bowel_movements for keyset-paginated history
+
+Revision ID: 20261017_0010
+Revises: 20261017_0009
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261017_0010"
+down_revision: Union[str, None] = "20261017_0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bowel_movements_user_id_date_time_id",
+            "bowel_movements",
+            ["user_id", sa.text("date DESC"), sa.text("time DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bowel_movements_user_id_date_time_id",
+            table_name="bowel_movements",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,57 @@
+"""partial indexes for bowel_movements, drop redundant ones
+
+Revision ID: 20261017_0011
+Revises: 20261017_0010
+Create Date: 2026-10-17
+
+Per-user range scans are served by ix_bowel_movements_user_id_date_time_id (20261017_0010),
+a btree is read in both directions, so it covers (user_id, date, time) as well.
+It also replaces the single-column user_id index, date is never filtered without user_id,
+and the primary key already indexes id.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261017_0011"
+down_revision: Union[str, None] = "20261017_0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bowel_movements_user_id_date_time_real",
+            "bowel_movements",
+            ["user_id", "date", "time"],
+            postgresql_where=sa.text("NOT is_false_urge"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_bowel_movements_user_id_date_blood",
+            "bowel_movements",
+            ["user_id", "date"],
+            postgresql_where=sa.text("blood_lvl > 0"),
+            postgresql_concurrently=True,
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bowel_movements_user_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bowel_movements_date")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bowel_movements_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_bowel_movements_date", "bowel_movements", ["date"], postgresql_concurrently=True)
+        op.create_index("ix_bowel_movements_user_id", "bowel_movements", ["user_id"], postgresql_concurrently=True)
+        op.drop_index(
+            "ix_bowel_movements_user_id_date_blood",
+            table_name="bowel_movements",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_bowel_movements_user_id_date_time_real",
+            table_name="bowel_movements",
+            postgresql_concurrently=True,
+        )
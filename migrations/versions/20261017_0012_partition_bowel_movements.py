@@ -0,0 +1,142 @@
+"""partition bowel_movements by month on date
+
+Revision ID: 20261017_0012
+Revises: 20261017_0011
+Create Date: 2026-10-17
+
+The table is recreated as a range-partitioned one under an exclusive lock:
+the old table is renamed to bowel_movements_legacy, monthly partitions are created
+from the oldest record up to PARTITION_MONTHS_AHEAD months from now and rows are copied.
+The primary key becomes (id, date) since it must include the partition key,
+ids keep coming from the same sequence. id and user_id are created as bigint
+while the table is rewritten anyway, so they don't need an online conversion later.
+Later partitions are created by bot/tasks/partition_maintenance.py.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261017_0012"
+down_revision: Union[str, None] = "20261017_0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, user_id, date, time, notes, created_at, stool_consistency, blood_lvl, mucus, is_false_urge"
+)
+
+INDEXES = (
+    "ix_bowel_movements_user_id_date_time_id",
+    "ix_bowel_movements_user_id_date_time_real",
+    "ix_bowel_movements_user_id_date_blood",
+)
+
+
+# Date helpers and partition DDL are copied from database/partitions.py as of this revision,
+# so later changes to the application module don't alter the migration
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    name = f"bowel_movements_y{month.year:04d}m{month.month:02d}"
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF bowel_movements "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        "ix_bowel_movements_user_id_date_time_id",
+        "bowel_movements",
+        ["user_id", sa.text("date DESC"), sa.text("time DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_bowel_movements_user_id_date_time_real",
+        "bowel_movements",
+        ["user_id", "date", "time"],
+        postgresql_where=sa.text("NOT is_false_urge"),
+    )
+    op.create_index(
+        "ix_bowel_movements_user_id_date_blood",
+        "bowel_movements",
+        ["user_id", "date"],
+        postgresql_where=sa.text("blood_lvl > 0"),
+    )
+
+
+def _rename_table(old: str, new: str) -> None:
+    op.rename_table(old, new)
+    op.execute(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey")
+    op.execute(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_user_id_fkey TO {new}_user_id_fkey")
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX {index.replace('bowel_movements', old, 1)} RENAME TO "
+                   f"{index.replace('bowel_movements', new, 1)}")
+
+
+def upgrade() -> None:
+    op.execute("LOCK TABLE bowel_movements IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq AS bigint")
+    _rename_table("bowel_movements", "bowel_movements_legacy")
+    op.execute("ALTER TABLE bowel_movements_legacy ALTER COLUMN id DROP DEFAULT")
+
+    op.create_table(
+        "bowel_movements",
+        sa.Column(
+            "id", sa.BigInteger(), nullable=False, server_default=sa.text("nextval('bowel_movements_id_seq')")
+        ),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.telegram_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date(), server_default=sa.text("CURRENT_DATE"), nullable=False),
+        sa.Column("time", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("stool_consistency", sa.Integer(), nullable=True),
+        sa.Column("blood_lvl", sa.Integer(), nullable=True),
+        sa.Column("mucus", sa.Integer(), nullable=True),
+        sa.Column("is_false_urge", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.PrimaryKeyConstraint("id", "date", name="bowel_movements_pkey"),
+        postgresql_partition_by="RANGE (date)",
+    )
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq OWNED BY bowel_movements.id")
+
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text("SELECT min(date) FROM bowel_movements_legacy")).scalar()
+    current = _month_start(date.today())
+    month = _month_start(oldest) if oldest is not None and oldest < current else current
+    last = _add_months(current, PARTITION_MONTHS_AHEAD)
+    newest = conn.execute(sa.text("SELECT max(date) FROM bowel_movements_legacy")).scalar()
+    if newest is not None and _month_start(newest) > last:
+        last = _month_start(newest)
+    while month <= last:
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    op.execute(f"INSERT INTO bowel_movements ({COLUMNS}) SELECT {COLUMNS} FROM bowel_movements_legacy")
+    _create_indexes()
+    op.execute("ANALYZE bowel_movements")
+
+
+def downgrade() -> None:
+    # Rows written after the upgrade are copied back before the partitioned table is dropped
+    op.execute("LOCK TABLE bowel_movements IN ACCESS EXCLUSIVE MODE")
+    op.execute("TRUNCATE bowel_movements_legacy")
+    op.execute(f"INSERT INTO bowel_movements_legacy ({COLUMNS}) SELECT {COLUMNS} FROM bowel_movements")
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq OWNED BY NONE")
+    op.drop_table("bowel_movements")
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq AS integer")
+    _rename_table("bowel_movements_legacy", "bowel_movements")
+    op.execute("ALTER TABLE bowel_movements ALTER COLUMN id SET DEFAULT nextval('bowel_movements_id_seq')")
+    op.execute("ALTER SEQUENCE bowel_movements_id_seq OWNED BY bowel_movements.id")
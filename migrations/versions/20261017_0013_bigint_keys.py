@@ -0,0 +1,91 @@
+"""bigint keys for users
+
+Revision ID: 20261017_0013
+Revises: 20261017_0012
+Create Date: 2026-10-17
+
+users.id is converted without rewriting the table under an exclusive lock,
+bowel_movements keys are already bigint since 20261017_0012:
+
+1. a bigint shadow column is added and kept in sync by a trigger;
+2. existing rows are backfilled in small committed batches;
+3. NOT NULL is proven with a NOT VALID + VALIDATE check constraint and
+   the unique index is built concurrently;
+4. in one short transaction the old column is dropped, the shadow one renamed
+   and the prebuilt index attached as the primary key.
+
+The downgrade converts the column back in place and rewrites the table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261017_0013"
+down_revision: Union[str, None] = "20261017_0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _backfill(conn, table: str, assignments: str) -> None:
+    bounds = conn.execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if bounds[0] is None:
+        return
+    for low in range(bounds[0], bounds[1] + 1, BATCH_SIZE):
+        conn.execute(
+            sa.text(f"UPDATE {table} SET {assignments} WHERE id >= :low AND id < :high AND id_new IS NULL"),
+            {"low": low, "high": low + BATCH_SIZE},
+        )
+
+
+def _set_not_null(table: str, columns: Sequence[str]) -> None:
+    """SET NOT NULL without a full scan under an exclusive lock"""
+    for column in columns:
+        check = f"{table}_{column}_not_null"
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {check}")
+
+
+def upgrade() -> None:
+    # 1. Shadow column and sync trigger
+    op.execute("ALTER SEQUENCE users_id_seq AS bigint")
+    op.add_column("users", sa.Column("id_new", sa.BigInteger(), nullable=True))
+    op.execute(
+        "CREATE FUNCTION users_sync_id_new() RETURNS trigger AS $$ "
+        "BEGIN NEW.id_new := NEW.id; RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER users_sync_id_new BEFORE INSERT OR UPDATE ON users "
+        "FOR EACH ROW EXECUTE FUNCTION users_sync_id_new()"
+    )
+
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        # 2. Backfill in committed batches
+        _backfill(conn, "users", "id_new = id")
+
+        # 3. Constraint and index that don't block writes
+        _set_not_null("users", ["id_new"])
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY users_id_new_idx ON users (id_new)")
+
+    # 4. Swap in one short transaction
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute("LOCK TABLE users IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER users_sync_id_new ON users")
+    op.execute("DROP FUNCTION users_sync_id_new()")
+
+    op.execute("ALTER SEQUENCE users_id_seq OWNED BY NONE")
+    op.drop_column("users", "id")
+    op.alter_column("users", "id_new", new_column_name="id", server_default=sa.text("nextval('users_id_seq')"))
+    op.execute("ALTER TABLE users ADD CONSTRAINT users_pkey PRIMARY KEY USING INDEX users_id_new_idx")
+    op.execute("ALTER SEQUENCE users_id_seq OWNED BY users.id")
+
+
+def downgrade() -> None:
+    # Rewrites the table, run it in a maintenance window
+    op.alter_column("users", "id", type_=sa.Integer())
+    op.execute("ALTER SEQUENCE users_id_seq AS integer")
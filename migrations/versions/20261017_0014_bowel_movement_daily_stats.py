@@ -0,0 +1,46 @@
+"""bowel_movement_daily_stats rollup
+
+Revision ID: 20261017_0014
+Revises: 20261017_0013
+Create Date: 2026-10-17
+
+Per-user daily counters kept up to date by BowelMovementRepository in the same transaction
+as every create / update / delete. The table is created empty, fill it once the new bot
+version is running with `python -m database.rebuild_stats`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261017_0014"
+down_revision: Union[str, None] = "20261017_0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = (
+    "total",
+    "false_urges",
+    "consistency_liquid",
+    "consistency_mushy",
+    "consistency_normal",
+    "consistency_hard",
+    "with_blood",
+    "with_mucus",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bowel_movement_daily_stats",
+        sa.Column(
+            "user_id", sa.BigInteger(), sa.ForeignKey("users.telegram_id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("local_date", sa.Date(), nullable=False),
+        *(sa.Column(name, sa.Integer(), nullable=False, server_default=sa.text("0")) for name in COUNTERS),
+        sa.PrimaryKeyConstraint("user_id", "local_date", name="bowel_movement_daily_stats_pkey"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("bowel_movement_daily_stats")
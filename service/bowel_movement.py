@@ -1,11 +1,54 @@
-from datetime import date, datetime
-from typing import Optional
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.handlers.constants import BowelMovementCallbackKey
-from database.models.bowel_movement import BowelMovement
+from database.models import BowelMovementDailyStats
+from database.models.bowel_movement import BowelMovement, StoolConsistency
 from database.repository.bowel_movements import BowelMovementRepository
+from database.repository.daily_stats import CONSISTENCY_COUNTERS
+
+
+@dataclass(frozen=True)
+class StatsSummary:
+    """Bowel movement statistics of a user over a period of local dates"""
+    start_date: date
+    end_date: date
+    # Records (false urges included) per day that has any
+    per_day: Dict[date, int]
+    total: int
+    false_urges: int
+    consistency: Dict[StoolConsistency, int]
+    with_blood: int
+    with_mucus: int
+
+    @property
+    def days(self) -> int:
+        return (self.end_date - self.start_date).days + 1
+
+    @property
+    def real(self) -> int:
+        return self.total - self.false_urges
+
+    @classmethod
+    def from_daily_stats(
+            cls, start_date: date, end_date: date, rows: List[BowelMovementDailyStats]
+    ) -> "StatsSummary":
+        return cls(
+            start_date=start_date,
+            end_date=end_date,
+            per_day={row.local_date: row.total for row in rows if row.total},
+            total=sum(row.total for row in rows),
+            false_urges=sum(row.false_urges for row in rows),
+            consistency={
+                consistency: sum(getattr(row, counter) for row in rows)
+                for consistency, counter in CONSISTENCY_COUNTERS.items()
+            },
+            with_blood=sum(row.with_blood for row in rows),
+            with_mucus=sum(row.with_mucus for row in rows),
+        )
 
 
 class BowelMovementService:
@@ -20,7 +63,10 @@ class BowelMovementService:
             movement_date: Optional[date] = None,
             movement_time: Optional[datetime] = None,
             notes: Optional[str] = None,
-            stool_consistency: Optional[int] = None
+            stool_consistency: Optional[int] = None,
+            mucus: Optional[int] = None,
+            blood_lvl: Optional[int] = None,
+            is_false_urge: bool = False,
     ) -> BowelMovement:
         """Create new bowel movement for user"""
         return await self.bowel_movement_repository.create_bowel_movement(
@@ -29,30 +75,26 @@ class BowelMovementService:
             movement_date=movement_date,
             movement_time=movement_time,
             notes=notes,
-            stool_consistency=stool_consistency
+            stool_consistency=stool_consistency,
+            mucus=mucus,
+            blood_lvl=blood_lvl,
+            is_false_urge=is_false_urge,
         )
 
 
-    async def update_bowel_movement(
+    async def get_history_page(
             self,
-            user_id: int,
             session: AsyncSession,
-            bowel_movement_id: int,
-            notes: Optional[str] = None,
-            stool_consistency: Optional[int] = None,
-            blood_lvl: Optional[int] = None,
-            mucus: Optional[int] = None,
-            is_false_urge: Optional[bool] = None,
-    ) -> Optional[BowelMovement]:
-        return await self.bowel_movement_repository.update_bowel_movement(
-            user_id=user_id,
+            user_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 20,
+    ) -> Tuple[List[BowelMovement], Optional[str]]:
+        """Page of the user history and the cursor of the next page"""
+        return await self.bowel_movement_repository.get_bowel_movements_page(
             session=session,
-            movement_id=bowel_movement_id,
-            notes=notes,
-            stool_consistency=stool_consistency,
-            blood_lvl=blood_lvl,
-            mucus=mucus,
-            is_false_urge=is_false_urge
+            user_id=user_id,
+            cursor=cursor,
+            limit=limit,
         )
 
 
@@ -81,6 +123,23 @@ class BowelMovementService:
             user_id=user_id
         )
 
+    async def get_stats(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            end_date: date,
+            days: int = 30,
+    ) -> StatsSummary:
+        """Statistics of the last ``days`` local dates up to ``end_date``, read from the daily rollup"""
+        start_date = end_date - timedelta(days=days - 1)
+        rows = await self.bowel_movement_repository.get_daily_stats(
+            session=session,
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        return StatsSummary.from_daily_stats(start_date, end_date, rows)
+
     @staticmethod
     def parse_optional_int(callback_data: str) -> int | None:
         try:
@@ -1,14 +1,39 @@
-from typing import Optional
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database.cache import LRUCache
 from database.models import User
 from database.repository.user import UserRepository
+from database.session import after_commit
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """Read-only user settings that are safe to cache between updates"""
+    telegram_id: int
+    timezone_offset: Optional[int]
+    language_code: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserProfile":
+        return cls(telegram_id=user.telegram_id, timezone_offset=user.timezone_offset,
+                   language_code=user.language_code)
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+            self,
+            user_repository: UserRepository,
+            profile_cache: Optional[LRUCache] = None,
+            on_profile_change: Optional[Callable[[int], Awaitable[None]]] = None,
+    ):
         self.user_repository = user_repository
+        # Profiles by telegram_id, None disables caching
+        self.profile_cache = profile_cache
+        # Called after a profile change, e.g. to tell other replicas to call invalidate_profile()
+        self.on_profile_change = on_profile_change
 
     async def get_user_by_telegram_id(self, session: AsyncSession, telegram_id: int) -> Optional[User]:
         """Get user by Telegram ID"""
@@ -34,27 +59,47 @@ class UserService:
             timezone_offset: int | None = None
     ) -> User:
         """Get existing user or create new one"""
-        user_opt: Optional[User] = await self.get_user_by_telegram_id(session, telegram_id)
-        if user_opt is None:
-            return await self.create_user(session, telegram_id, language_code, timezone_offset)
-        return user_opt
-
-    async def set_user_hour_timezone(self, session: AsyncSession, telegram_id: int, timezone_offset: int) -> User | None:
-        user = await self.get_user_by_telegram_id(session, telegram_id)
-        if user is None:
-            return None
-        timezone_offset = timezone_offset * 60
-        user.timezone_offset = timezone_offset
-        return await self.user_repository.update_user(session, user)
-
-    async def set_user_minute_timezone(self, session: AsyncSession, telegram_id: int,
-                                       timezone_minutes: int) -> User | None:
-        user = await self.get_user_by_telegram_id(session, telegram_id)
-        if user is None:
-            return None
-        timezone_hours: int = user.timezone_offset
-        offset = timezone_hours + (timezone_minutes if timezone_hours >= 0 else -timezone_minutes)
-        if timezone_hours != offset:
-            user.timezone_offset = offset
-            return await self.user_repository.update_user(session, user)
-        return user
+        if timezone_offset is None:
+            timezone_offset = 0
+        return await self.user_repository.get_or_create_user(session, telegram_id, language_code, timezone_offset)
+
+    async def get_user_profile(self, session: AsyncSession, telegram_id: int) -> UserProfile:
+        """Get user settings, served from the profile cache when possible"""
+        if self.profile_cache is not None:
+            profile: Optional[UserProfile] = self.profile_cache.get(telegram_id)
+            if profile is not None:
+                return profile
+        profile = UserProfile.from_user(await self.get_or_create_user(session, telegram_id))
+        if self.profile_cache is not None:
+            self.profile_cache.set(telegram_id, profile)
+        return profile
+
+    def invalidate_profile(self, telegram_id: int) -> None:
+        if self.profile_cache is not None:
+            self.profile_cache.pop(telegram_id)
+
+    async def _profile_changed(self, telegram_id: int) -> None:
+        # Before the commit a concurrent read would cache the old profile again
+        await after_commit(lambda: self._notify_profile_change(telegram_id))
+
+    async def _notify_profile_change(self, telegram_id: int) -> None:
+        self.invalidate_profile(telegram_id)
+        if self.on_profile_change is not None:
+            await self.on_profile_change(telegram_id)
+
+    @staticmethod
+    def timezone_offset(hours: int, minutes: int = 0) -> int:
+        """Offset in minutes, minutes move it away from UTC like in +05:30 / -03:30"""
+        return hours * 60 + (minutes if hours >= 0 else -minutes)
+
+    async def set_user_timezone(self, session: AsyncSession, telegram_id: int, hours: int,
+                                minutes: int = 0) -> int | None:
+        """Set hours and minutes of the timezone with one write"""
+        offset = await self.user_repository.set_timezone_offset(
+            session, telegram_id, self.timezone_offset(hours, minutes)
+        )
+        if offset is not None:
+            # Rollup days are local dates, recount them once with the final offset
+            await self.user_repository.rebuild_user_daily_stats(session, telegram_id)
+            await self._profile_changed(telegram_id)
+        return offset
@@ -1,3 +1,6 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
 from aiogram.fsm.storage.base import StorageKey
 from aiogram.types import Message, CallbackQuery
 
@@ -13,6 +16,12 @@ def format_timezone(offset_minutes: int | None) -> str:
     return f"UTC{sign}{hours:02d}:{minutes:02d}"
 
 
+def local_today(offset_minutes: int | None, now: Optional[datetime] = None) -> date:
+    """Current date in the timezone with the given UTC offset"""
+    now = now or datetime.now(timezone.utc)
+    return (now + timedelta(minutes=offset_minutes or 0)).date()
+
+
 def build_fsm_key_from_message(message: Message, destiny: str = "default") -> StorageKey:
     return StorageKey(
         bot_id=message.bot.id,
@@ -1,8 +1,9 @@
 """Integration tests for bowel movement handlers"""
-from datetime import datetime
+from datetime import date, datetime, timezone
 from unittest.mock import Mock, AsyncMock
 
 import pytest
+from aiogram.exceptions import TelegramBadRequest
 
 from bot.handlers.bowel_movement import (
     start_bowel_movement_recording,
@@ -17,8 +18,10 @@ from bot.handlers.bowel_movement import (
     back_from_notes_to_blood_record,
     delete_bowel_movement_confirmation,
     back_from_delete_confirmation,
+    delete_bowel_movement,
     set_false_urge_to_bowel_movement,
     stool_consistency_msg,
+    show_stats,
 )
 from bot.handlers.constants import (
     BowelMovementMessageCommand,
@@ -27,7 +30,8 @@ from bot.handlers.constants import (
 )
 from database.models import User
 from database.models.bowel_movement import BowelMovement
-from service.bowel_movement import BowelMovementService
+from database.models.bowel_movement import StoolConsistency
+from service.bowel_movement import BowelMovementService, StatsSummary
 from service.user import UserService
 
 
@@ -36,6 +40,7 @@ def mock_user_service():
     """Fixture for a mocked UserService."""
     service = Mock(spec=UserService)
     service.get_or_create_user = AsyncMock()
+    service.get_user_profile = AsyncMock()
     return service
 
 
@@ -44,156 +49,149 @@ def mock_bowel_movement_service():
     """Fixture for a mocked BowelMovementService."""
     service = Mock(spec=BowelMovementService)
     service.create_bowel_movement = AsyncMock()
-    service.update_bowel_movement = AsyncMock()
     service.get_bowel_movement_by_id = AsyncMock()
+    service.delete_bowel_movement = AsyncMock()
+    service.get_stats = AsyncMock()
     return service
 
 
+STARTED_AT = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+
+
+def draft_data(**fields) -> dict:
+    """FSM data of a draft in progress"""
+    return {
+        'bowel_movement_msg_id': 123,
+        'chat_id': 456,
+        'started_at': STARTED_AT.isoformat(),
+        **fields,
+    }
+
+
+def saved_bowel_movement(**fields) -> Mock:
+    bowel_movement = Mock(spec=BowelMovement)
+    bowel_movement.id = 1
+    bowel_movement.stool_consistency = None
+    bowel_movement.blood_lvl = None
+    bowel_movement.mucus = None
+    bowel_movement.notes = None
+    bowel_movement.is_false_urge = False
+    bowel_movement.time = STARTED_AT
+    for name, value in fields.items():
+        setattr(bowel_movement, name, value)
+    return bowel_movement
+
+
 class TestBowelMovementHandlers:
     """Integration tests for bowel movement handlers"""
 
     @pytest.mark.asyncio
-    async def test_start_bowel_movement_recording_new(self, mock_message, mock_fsm_context, mock_async_session,
-                                                      mock_bowel_movement_service):
-        """Test starting new bowel movement recording"""
+    async def test_start_bowel_movement_recording_new(self, mock_message, mock_fsm_context):
+        """Test starting new bowel movement recording keeps a draft without writing to the database"""
         # Arrange
         mock_message.text = BowelMovementMessageCommand.START_BOWEL_MOVEMENT
         mock_message.from_user.id = 123
         mock_fsm_context.get_state.return_value = None
-
-        mock_bowel_movement = Mock(spec=BowelMovement)
-        mock_bowel_movement.id = 1
-        mock_bowel_movement_service.create_bowel_movement.return_value = mock_bowel_movement
+        sent_msg = mock_message.answer.return_value
+        sent_msg.message_id = 10
+        sent_msg.chat.id = 20
 
         # Act
-        await start_bowel_movement_recording(mock_message, mock_fsm_context, mock_async_session,
-                                             mock_bowel_movement_service)
+        await start_bowel_movement_recording(mock_message, mock_fsm_context)
 
         # Assert
         mock_fsm_context.get_state.assert_called_once()
-        mock_bowel_movement_service.create_bowel_movement.assert_called_once_with(mock_async_session, 123)
-        mock_fsm_context.update_data.assert_called_once()
+        data = mock_fsm_context.set_data.call_args.args[0]
+        assert data['bowel_movement_msg_id'] == 10
+        assert data['chat_id'] == 20
+        assert datetime.fromisoformat(data['started_at']).tzinfo is not None
+        assert 'bowel_movement_id' not in data
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.init_conditional)
 
     @pytest.mark.asyncio
-    async def test_start_bowel_movement_recording_already_in_progress(self, mock_message, mock_fsm_context,
-                                                                      mock_async_session,
-                                                                      mock_bowel_movement_service):
+    async def test_start_bowel_movement_recording_already_in_progress(self, mock_message, mock_fsm_context):
         """Test starting recording when another is already in progress"""
         # Arrange
         mock_message.text = BowelMovementMessageCommand.START_BOWEL_MOVEMENT
         mock_fsm_context.get_state.return_value = BowelMovementStates.stool_consistency.state
 
         # Act
-        await start_bowel_movement_recording(mock_message, mock_fsm_context, mock_async_session,
-                                             mock_bowel_movement_service)
+        await start_bowel_movement_recording(mock_message, mock_fsm_context)
 
         # Assert
         mock_fsm_context.get_state.assert_called_once()
         mock_message.answer.assert_called_once_with(text="Пожалуйста, завершите предыдущую запись")
-        mock_bowel_movement_service.create_bowel_movement.assert_not_called()
+        mock_fsm_context.set_data.assert_not_called()
         mock_fsm_context.set_state.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_add_stool_consistency(self, mock_callback_query, mock_fsm_context, mock_async_session,
-                                         mock_bowel_movement_service):
-        """Test adding stool consistency information"""
+    async def test_add_stool_consistency(self, mock_callback_query, mock_fsm_context):
+        """Test adding stool consistency to the draft"""
         # Arrange
         mock_callback_query.data = f"{BowelMovementCallbackKey.STOOL_CONSISTENCY}:2"
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
 
         # Act
-        await add_stool_consistency(mock_callback_query, mock_fsm_context, mock_async_session,
-                                    mock_bowel_movement_service)
+        await add_stool_consistency(mock_callback_query, mock_fsm_context)
 
         # Assert
-        mock_fsm_context.get_data.assert_called_once()
-        mock_bowel_movement_service.update_bowel_movement.assert_called_once_with(
-            session=mock_async_session,
-            bowel_movement_id=1,
-            stool_consistency=2,
-            user_id=mock_callback_query.from_user.id
-        )
+        mock_fsm_context.update_data.assert_called_once_with(stool_consistency=2)
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.mucus)
 
     @pytest.mark.asyncio
-    async def test_add_stool_mucus(self, mock_callback_query, mock_fsm_context, mock_async_session,
-                                   mock_bowel_movement_service):
-        """Test adding mucus information"""
+    async def test_skip_stool_consistency(self, mock_callback_query, mock_fsm_context):
+        """Test skipping stool consistency leaves the draft unchanged"""
+        # Arrange
+        mock_callback_query.data = f"{BowelMovementCallbackKey.STOOL_CONSISTENCY}:{BowelMovementCallbackKey.SKIP}"
+
+        # Act
+        await add_stool_consistency(mock_callback_query, mock_fsm_context)
+
+        # Assert
+        mock_fsm_context.update_data.assert_not_called()
+        mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.mucus)
+
+    @pytest.mark.asyncio
+    async def test_add_stool_mucus(self, mock_callback_query, mock_fsm_context):
+        """Test adding mucus to the draft"""
         # Arrange
         mock_callback_query.data = f"{BowelMovementCallbackKey.STOOL_MUCUS}:1"
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
 
         # Act
-        await add_stool_mucus(mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service)
+        await add_stool_mucus(mock_callback_query, mock_fsm_context)
 
         # Assert
-        mock_fsm_context.get_data.assert_called_once()
-        mock_bowel_movement_service.update_bowel_movement.assert_called_once_with(
-            session=mock_async_session,
-            bowel_movement_id=1,
-            mucus=1,
-            user_id=mock_callback_query.from_user.id,
-        )
+        mock_fsm_context.update_data.assert_called_once_with(mucus=1)
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.blood)
 
     @pytest.mark.asyncio
-    async def test_add_stool_blood(self, mock_callback_query, mock_fsm_context, mock_async_session,
-                                   mock_bowel_movement_service):
-        """Test adding blood level information"""
+    async def test_add_stool_blood(self, mock_callback_query, mock_fsm_context):
+        """Test adding blood level to the draft"""
         # Arrange
         mock_callback_query.data = f"{BowelMovementCallbackKey.STOOL_BLOOD}:0"
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
 
         # Act
-        await add_stool_blood(mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service)
+        await add_stool_blood(mock_callback_query, mock_fsm_context)
 
         # Assert
-        mock_fsm_context.get_data.assert_called_once()
-        mock_bowel_movement_service.update_bowel_movement.assert_called_once_with(
-            session=mock_async_session,
-            bowel_movement_id=1,
-            blood_lvl=0,
-            user_id=mock_callback_query.from_user.id,
-        )
+        mock_fsm_context.update_data.assert_called_once_with(blood_lvl=0)
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.waiting_for_notes)
 
     @pytest.mark.asyncio
     async def test_save_notes(self, mock_message, mock_fsm_context, mock_async_session, mock_user_service,
                               mock_bowel_movement_service):
-        """Test saving notes for bowel movement"""
+        """Test saving notes inserts the whole draft once"""
         # Arrange
         mock_message.text = "Some notes here"
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
-
-        mock_bowel_movement = Mock(spec=BowelMovement)
-        mock_bowel_movement.stool_consistency = 2
-        mock_bowel_movement.blood_lvl = 0
-        mock_bowel_movement.mucus = 1
-        mock_bowel_movement.created_at = datetime.now()
+        mock_fsm_context.get_data.return_value = draft_data(stool_consistency=2, mucus=1, blood_lvl=0)
         mock_user = Mock(spec=User)
         mock_user.timezone_offset = 180
-        mock_bowel_movement_service.update_bowel_movement.return_value = mock_bowel_movement
-        mock_user_service.get_or_create_user.return_value = mock_user
+        mock_bowel_movement_service.create_bowel_movement.return_value = saved_bowel_movement(
+            stool_consistency=2, mucus=1, blood_lvl=0, notes="Some notes here"
+        )
+        mock_user_service.get_user_profile.return_value = mock_user
 
         # Act
         await save_notes(
@@ -205,64 +203,136 @@ class TestBowelMovementHandlers:
         )
 
         # Assert
-        mock_fsm_context.get_data.assert_called_once()
-        mock_bowel_movement_service.update_bowel_movement.assert_called_once_with(
+        mock_bowel_movement_service.create_bowel_movement.assert_called_once_with(
             session=mock_async_session,
-            bowel_movement_id=1,
-            notes="Some notes here",
             user_id=mock_message.from_user.id,
+            movement_date=STARTED_AT.astimezone().date(),
+            movement_time=STARTED_AT,
+            notes="Some notes here",
+            stool_consistency=2,
+            mucus=1,
+            blood_lvl=0,
+            is_false_urge=False,
         )
-        mock_user_service.get_or_create_user.assert_called_once_with(mock_async_session, mock_message.from_user.id)
+        mock_user_service.get_user_profile.assert_called_once_with(mock_async_session, mock_message.from_user.id)
+        mock_async_session.commit.assert_awaited_once()
         mock_fsm_context.clear.assert_called_once()
         mock_message.bot.edit_message_text.assert_called_once()
+        assert mock_message.bot.edit_message_text.call_args.kwargs['message_id'] == 123
         mock_message.delete.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_save_notes_edit_failure_answers(self, mock_message, mock_fsm_context, mock_async_session,
+                                                   mock_user_service, mock_bowel_movement_service):
+        """Test a failed edit after the record is committed falls back to a new message"""
+        # Arrange
+        mock_message.text = "Some notes here"
+        mock_fsm_context.get_data.return_value = draft_data()
+        mock_user_service.get_user_profile.return_value = Mock(timezone_offset=180)
+        mock_bowel_movement_service.create_bowel_movement.return_value = saved_bowel_movement(notes="Some notes here")
+        mock_message.bot.edit_message_text.side_effect = TelegramBadRequest(
+            method=Mock(), message="message to edit not found"
+        )
+
+        # Act
+        await save_notes(
+            mock_message,
+            mock_fsm_context,
+            mock_async_session,
+            mock_bowel_movement_service,
+            mock_user_service
+        )
+
+        # Assert
+        mock_async_session.commit.assert_awaited_once()
+        mock_fsm_context.clear.assert_called_once()
+        mock_message.answer.assert_called_once()
+        edited_text = mock_message.bot.edit_message_text.call_args.kwargs['text']
+        assert mock_message.answer.call_args.kwargs['text'] == edited_text
+        mock_message.delete.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_save_notes_without_draft(self, mock_message, mock_fsm_context, mock_async_session,
+                                            mock_user_service, mock_bowel_movement_service):
+        """Test saving notes when the draft is gone"""
+        # Arrange
+        mock_message.text = "Some notes here"
+        mock_fsm_context.get_data.return_value = {}
+
+        # Act
+        await save_notes(
+            mock_message,
+            mock_fsm_context,
+            mock_async_session,
+            mock_bowel_movement_service,
+            mock_user_service
+        )
+
+        # Assert
+        mock_bowel_movement_service.create_bowel_movement.assert_not_called()
+        mock_message.answer.assert_called_once()
+        mock_fsm_context.clear.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_skip_notes(self, mock_callback_query, mock_fsm_context, mock_async_session, mock_user_service,
                               mock_bowel_movement_service):
-        """Test skipping notes for bowel movement"""
+        """Test skipping notes inserts the draft as is"""
         # Arrange
         mock_callback_query.data = BowelMovementCallbackKey.SKIP_NOTES.value
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
-
-        mock_bowel_movement = Mock(spec=BowelMovement)
-        mock_bowel_movement.stool_consistency = 3
-        mock_bowel_movement.blood_lvl = 1
-        mock_bowel_movement.mucus = 0
-        mock_bowel_movement.created_at = datetime.now()
+        mock_fsm_context.get_data.return_value = draft_data(stool_consistency=3)
         mock_user = Mock(spec=User)
         mock_user.timezone_offset = 180
-        mock_bowel_movement_service.get_bowel_movement_by_id.return_value = mock_bowel_movement
-        mock_user_service.get_or_create_user.return_value = mock_user
+        mock_bowel_movement_service.create_bowel_movement.return_value = saved_bowel_movement(stool_consistency=3)
+        mock_user_service.get_user_profile.return_value = mock_user
 
         # Act
         await skip_notes(mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service,
                          mock_user_service)
 
         # Assert
-        mock_fsm_context.get_data.assert_called_once()
-        mock_bowel_movement_service.get_bowel_movement_by_id.assert_called_once_with(
-            bowel_movement_id=1,
+        mock_bowel_movement_service.create_bowel_movement.assert_called_once_with(
             session=mock_async_session,
             user_id=mock_callback_query.from_user.id,
+            movement_date=STARTED_AT.astimezone().date(),
+            movement_time=STARTED_AT,
+            notes=None,
+            stool_consistency=3,
+            mucus=None,
+            blood_lvl=None,
+            is_false_urge=False,
         )
-        mock_user_service.get_or_create_user.assert_called_once_with(mock_async_session,
-                                                                      mock_callback_query.from_user.id)
+        mock_bowel_movement_service.get_bowel_movement_by_id.assert_not_called()
+        mock_user_service.get_user_profile.assert_called_once_with(mock_async_session,
+                                                                    mock_callback_query.from_user.id)
+        mock_async_session.commit.assert_awaited_once()
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.clear.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_skip_notes_edit_failure_answers(self, mock_callback_query, mock_fsm_context, mock_async_session,
+                                                   mock_user_service, mock_bowel_movement_service):
+        """Test skipping notes still finishes the record when its message can't be edited"""
+        # Arrange
+        mock_fsm_context.get_data.return_value = draft_data()
+        mock_user_service.get_user_profile.return_value = Mock(timezone_offset=180)
+        mock_bowel_movement_service.create_bowel_movement.return_value = saved_bowel_movement()
+        mock_callback_query.message.edit_text.side_effect = TelegramBadRequest(
+            method=Mock(), message="message can't be edited"
+        )
+
+        # Act
+        await skip_notes(mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service,
+                         mock_user_service)
+
+        # Assert
+        mock_async_session.commit.assert_awaited_once()
+        mock_fsm_context.clear.assert_called_once()
+        mock_callback_query.message.answer.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_back_from_mucus_to_stool_consistency(self, mock_callback_query, mock_fsm_context):
         """Test navigating back from mucus state to stool consistency state"""
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
+        mock_fsm_context.get_data.return_value = draft_data()
         await back_from_mucus_to_stool_consistency(mock_callback_query, mock_fsm_context)
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.stool_consistency)
@@ -285,24 +355,26 @@ class TestBowelMovementHandlers:
     async def test_delete_bowel_movement_confirmation_from_init(
         self, mock_callback_query, mock_fsm_context
     ):
-        """Test delete confirmation from init step with state data"""
-        mock_callback_query.data = f"{BowelMovementCallbackKey.DELETE_CONFIRMATION}:1"
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
+        """Test delete confirmation of a draft"""
+        mock_callback_query.data = BowelMovementCallbackKey.DELETE_CONFIRMATION.value
+        mock_fsm_context.get_data.return_value = draft_data()
 
         await delete_bowel_movement_confirmation(mock_callback_query, mock_fsm_context)
 
         mock_callback_query.message.edit_text.assert_called_once()
+        keyboard = mock_callback_query.message.edit_text.call_args.kwargs['reply_markup']
+        callbacks = [button.callback_data for button in keyboard.inline_keyboard[0]]
+        assert callbacks == [
+            f"{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:{BackFromDeleteBowelMovementToPosition.INIT_STEP}",
+            BowelMovementCallbackKey.DELETE_RECORD.value,
+        ]
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.delete_confirmation)
 
     @pytest.mark.asyncio
     async def test_delete_bowel_movement_confirmation_without_state(
         self, mock_callback_query, mock_fsm_context
     ):
-        """Test delete confirmation when state data is missing"""
+        """Test delete confirmation of a saved record when state data is missing"""
         mock_callback_query.data = f"{BowelMovementCallbackKey.DELETE_CONFIRMATION}:1"
         mock_fsm_context.get_data.return_value = {}
 
@@ -311,6 +383,54 @@ class TestBowelMovementHandlers:
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.delete_confirmation)
 
+    @pytest.mark.asyncio
+    async def test_delete_bowel_movement_confirmation_without_draft_or_id(
+        self, mock_callback_query, mock_fsm_context
+    ):
+        """Test delete confirmation when there is nothing to delete"""
+        mock_callback_query.data = BowelMovementCallbackKey.DELETE_CONFIRMATION.value
+        mock_fsm_context.get_data.return_value = {}
+
+        await delete_bowel_movement_confirmation(mock_callback_query, mock_fsm_context)
+
+        mock_callback_query.message.edit_text.assert_called_once()
+        mock_fsm_context.clear.assert_called_once()
+        mock_fsm_context.set_state.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_draft(
+        self, mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
+    ):
+        """Test deleting a draft doesn't touch the database"""
+        mock_callback_query.data = BowelMovementCallbackKey.DELETE_RECORD.value
+        mock_fsm_context.get_data.return_value = draft_data()
+
+        await delete_bowel_movement(
+            mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
+        )
+
+        mock_bowel_movement_service.delete_bowel_movement.assert_not_called()
+        mock_callback_query.message.edit_text.assert_called_once()
+        mock_fsm_context.clear.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_delete_saved_record(
+        self, mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
+    ):
+        """Test deleting a saved record"""
+        mock_callback_query.data = f"{BowelMovementCallbackKey.DELETE_RECORD}:1"
+
+        await delete_bowel_movement(
+            mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
+        )
+
+        mock_bowel_movement_service.delete_bowel_movement.assert_called_once_with(
+            session=mock_async_session,
+            bowel_movement_id=1,
+            user_id=mock_callback_query.from_user.id,
+        )
+        mock_fsm_context.clear.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_back_from_delete_confirmation_to_init(
         self, mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
@@ -318,8 +438,9 @@ class TestBowelMovementHandlers:
         """Test back from delete confirmation to init step"""
         mock_callback_query.data = (
             f"{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:"
-            f"{BackFromDeleteBowelMovementToPosition.INIT_STEP}|bowel_movement_id:1"
+            f"{BackFromDeleteBowelMovementToPosition.INIT_STEP}"
         )
+        mock_fsm_context.get_data.return_value = draft_data()
 
         await back_from_delete_confirmation(
             mock_callback_query, mock_async_session, mock_fsm_context, mock_bowel_movement_service
@@ -337,14 +458,7 @@ class TestBowelMovementHandlers:
             f"{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:"
             f"{BackFromDeleteBowelMovementToPosition.FINAL_STEP}|bowel_movement_id:1"
         )
-        mock_bowel_movement = Mock(spec=BowelMovement)
-        mock_bowel_movement.id = 1
-        mock_bowel_movement.stool_consistency = None
-        mock_bowel_movement.blood_lvl = None
-        mock_bowel_movement.mucus = None
-        mock_bowel_movement.created_at = datetime.now()
-        mock_bowel_movement.is_false_urge = False
-        mock_bowel_movement_service.get_bowel_movement_by_id.return_value = mock_bowel_movement
+        mock_bowel_movement_service.get_bowel_movement_by_id.return_value = saved_bowel_movement()
 
         await back_from_delete_confirmation(
             mock_callback_query, mock_async_session, mock_fsm_context, mock_bowel_movement_service
@@ -362,28 +476,25 @@ class TestBowelMovementHandlers:
     async def test_false_urge_to_bowel_movement(
         self, mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
     ):
-        """Test handling false urge callback"""
+        """Test false urge inserts the draft once"""
         mock_callback_query.data = BowelMovementCallbackKey.FALSE_URGE
-        mock_fsm_context.get_data.return_value = {
-            'bowel_movement_id': 1,
-            'bowel_movement_msg_id': 123,
-            'chat_id': 456
-        }
-        mock_bowel_movement = Mock(spec=BowelMovement)
-        mock_bowel_movement.id = 1
-        mock_bowel_movement.created_at = datetime.now()
-        mock_bowel_movement.is_false_urge = True
-        mock_bowel_movement_service.update_bowel_movement.return_value = mock_bowel_movement
+        mock_fsm_context.get_data.return_value = draft_data()
+        mock_bowel_movement_service.create_bowel_movement.return_value = saved_bowel_movement(is_false_urge=True)
 
         await set_false_urge_to_bowel_movement(
             mock_callback_query, mock_fsm_context, mock_async_session, mock_bowel_movement_service
         )
 
-        mock_bowel_movement_service.update_bowel_movement.assert_called_once_with(
+        mock_bowel_movement_service.create_bowel_movement.assert_called_once_with(
             session=mock_async_session,
-            bowel_movement_id=1,
-            is_false_urge=True,
             user_id=mock_callback_query.from_user.id,
+            movement_date=STARTED_AT.astimezone().date(),
+            movement_time=STARTED_AT,
+            notes=None,
+            stool_consistency=None,
+            mucus=None,
+            blood_lvl=None,
+            is_false_urge=True,
         )
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.clear.assert_called_once()
@@ -400,6 +511,39 @@ class TestBowelMovementHandlers:
         mock_callback_query.message.edit_text.assert_called_once()
         mock_fsm_context.set_state.assert_called_once_with(BowelMovementStates.stool_consistency)
 
+    @pytest.mark.asyncio
+    async def test_show_stats(self, mock_message, mock_async_session, mock_bowel_movement_service,
+                              mock_user_service):
+        """Test statistics are read for the user's local date"""
+        # Arrange
+        mock_user = Mock(spec=User)
+        mock_user.timezone_offset = 180
+        mock_user_service.get_user_profile.return_value = mock_user
+        mock_bowel_movement_service.get_stats.return_value = StatsSummary(
+            start_date=date(2026, 9, 18),
+            end_date=date(2026, 10, 17),
+            per_day={date(2026, 10, 17): 4},
+            total=4,
+            false_urges=1,
+            consistency={consistency: 1 if consistency == StoolConsistency.MUSHY else 0
+                         for consistency in StoolConsistency},
+            with_blood=1,
+            with_mucus=0,
+        )
+
+        # Act
+        await show_stats(mock_message, mock_async_session, mock_bowel_movement_service, mock_user_service)
+
+        # Assert
+        call = mock_bowel_movement_service.get_stats.call_args
+        assert call.args == (mock_async_session, mock_message.from_user.id)
+        assert isinstance(call.kwargs["end_date"], date)
+        text = mock_message.answer.call_args.kwargs["text"]
+        assert "Статистика за 30 дней" in text
+        assert "Походов в туалет: 3" in text
+        assert "Ложные позывы: 1 (25%)" in text
+        assert "17.10: 4" in text
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
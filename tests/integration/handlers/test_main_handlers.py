@@ -0,0 +1,67 @@
+"""Integration tests for the timezone handlers"""
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from bot.handlers.constants import MainCallbackKey
+from bot.handlers.main_handler import StartStates, set_hour_timezone, set_minute_timezone
+from service.user import UserService
+
+
+@pytest.fixture
+def mock_user_service():
+    """Fixture for a mocked UserService."""
+    service = Mock(spec=UserService)
+    service.set_user_timezone = AsyncMock()
+    return service
+
+
+class TestTimezoneHandlers:
+
+    @pytest.mark.asyncio
+    async def test_hour_is_kept_in_state(self, mock_callback_query, mock_fsm_context):
+        """Test choosing the hours writes nothing to the database"""
+        # Arrange
+        mock_callback_query.data = f"{MainCallbackKey.SET_HOUR_TIMEZONE.value}:5"
+
+        # Act
+        await set_hour_timezone(mock_callback_query, mock_fsm_context)
+
+        # Assert
+        mock_fsm_context.update_data.assert_called_once_with(timezone_hours=5)
+        mock_fsm_context.set_state.assert_called_once_with(StartStates.timezone_minute)
+        mock_callback_query.message.edit_text.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_minutes_save_timezone_once(self, mock_callback_query, mock_fsm_context, mock_async_session,
+                                              mock_user_service):
+        """Test choosing the minutes saves hours and minutes with one call"""
+        # Arrange
+        mock_callback_query.data = f"{MainCallbackKey.SET_MINUTE_TIMEZONE.value}:30"
+        mock_fsm_context.get_value.return_value = 5
+        mock_user_service.set_user_timezone.return_value = 330
+
+        # Act
+        await set_minute_timezone(mock_callback_query, mock_fsm_context, mock_async_session, mock_user_service)
+
+        # Assert
+        mock_user_service.set_user_timezone.assert_awaited_once_with(
+            mock_async_session, mock_callback_query.from_user.id, 5, 30
+        )
+        mock_fsm_context.clear.assert_called_once()
+        assert "+05:30" in mock_callback_query.message.edit_text.call_args.kwargs['text']
+
+    @pytest.mark.asyncio
+    async def test_minutes_without_hours_start_over(self, mock_callback_query, mock_fsm_context, mock_async_session,
+                                                    mock_user_service):
+        """Test a stale minutes keyboard asks for the hours again"""
+        # Arrange
+        mock_callback_query.data = f"{MainCallbackKey.SET_MINUTE_TIMEZONE.value}:{MainCallbackKey.SKIP.value}"
+        mock_fsm_context.get_value.return_value = None
+
+        # Act
+        await set_minute_timezone(mock_callback_query, mock_fsm_context, mock_async_session, mock_user_service)
+
+        # Assert
+        mock_user_service.set_user_timezone.assert_not_called()
+        mock_fsm_context.set_state.assert_called_once_with(StartStates.timezone_hour)
@@ -0,0 +1,11 @@
+"""Unit tests for the bowel movement handlers registration"""
+from bot.handlers.bowel_movement import router, save_notes, show_stats
+
+
+class TestHandlersOrder:
+    """Test cases for the order of message handlers"""
+
+    def test_stats_before_notes_catch_all(self):
+        callbacks = [handler.callback for handler in router.message.handlers]
+
+        assert callbacks.index(show_stats) < callbacks.index(save_notes)
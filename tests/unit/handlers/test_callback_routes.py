@@ -0,0 +1,52 @@
+"""Unit tests for callback routing"""
+from unittest.mock import Mock
+
+import pytest
+
+from bot.handlers.callback_routes import (
+    BOWEL_MOVEMENT, TIMEZONE, CallbackKeyFilter, CallbackRoute, resolve_callback
+)
+from bot.handlers.constants import BowelMovementCallbackKey, MainCallbackKey
+
+
+class TestResolveCallback:
+    """Test cases for resolve_callback"""
+
+    @pytest.mark.parametrize("data, expected", [
+        (f"{BowelMovementCallbackKey.STOOL_BLOOD}:2", CallbackRoute(BOWEL_MOVEMENT, "stool_blood")),
+        (BowelMovementCallbackKey.SKIP_NOTES.value, CallbackRoute(BOWEL_MOVEMENT, "skip_notes")),
+        (f"{BowelMovementCallbackKey.BACK_FROM_DELETE_CONFIRMATION}:init_step|id:5",
+         CallbackRoute(BOWEL_MOVEMENT, "back_from_delete")),
+        (f"{MainCallbackKey.SET_HOUR_TIMEZONE}:{MainCallbackKey.SKIP}", CallbackRoute(TIMEZONE, "set_hour_timezone")),
+        (MainCallbackKey.SETTINGS_TIMEZONE.value, CallbackRoute(TIMEZONE, "settings_timezone")),
+        ("skip", None),
+        ("stool_blood_extra:1", None),
+        (None, None),
+    ])
+    def test_resolve(self, data, expected):
+        assert resolve_callback(data) == expected
+
+
+class TestCallbackKeyFilter:
+    """Test cases for CallbackKeyFilter"""
+
+    @pytest.mark.asyncio
+    async def test_uses_resolved_route(self):
+        callback_filter = CallbackKeyFilter(BowelMovementCallbackKey.STOOL_MUCUS)
+        callback = Mock(data="something_else")
+
+        assert await callback_filter(callback, callback_route=CallbackRoute(BOWEL_MOVEMENT, "stool_mucus"))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("data, expected", [
+        (f"{BowelMovementCallbackKey.STOOL_MUCUS}:1", True),
+        (f"{BowelMovementCallbackKey.STOOL_BLOOD}:1", False),
+    ])
+    async def test_resolves_without_middleware(self, data, expected):
+        callback_filter = CallbackKeyFilter(BowelMovementCallbackKey.STOOL_MUCUS)
+
+        assert await callback_filter(Mock(data=data)) is expected
+
+    def test_unknown_key(self):
+        with pytest.raises(ValueError):
+            CallbackKeyFilter("unknown")
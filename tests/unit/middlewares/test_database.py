@@ -0,0 +1,114 @@
+"""Unit tests for DatabaseMiddleware"""
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from bot.middlewares.database import DatabaseMiddleware
+from database.session import after_commit, after_rollback
+
+
+@pytest.fixture
+def mock_session():
+    """Fixture for a mocked AsyncSession that starts a transaction on execute."""
+    session = AsyncMock()
+    session.in_transaction = Mock(return_value=False)
+
+    async def execute(*args, **kwargs):
+        session.in_transaction.return_value = True
+
+    session.execute.side_effect = execute
+    with patch("database.session._new_session", return_value=session) as new_session:
+        session.factory = new_session
+        yield session
+
+
+class TestDatabaseMiddleware:
+    """Test cases for the DatabaseMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_unused_session_is_not_created(self, mock_session):
+        # Arrange
+        handler = AsyncMock(return_value="ok")
+
+        # Act
+        result = await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        assert result == "ok"
+        mock_session.factory.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_used_session_is_committed(self, mock_session):
+        # Arrange
+        async def handler(event, data):
+            await data["session"].execute("SELECT 1")
+
+        # Act
+        await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        mock_session.factory.assert_called_once()
+        mock_session.commit.assert_awaited_once()
+        mock_session.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_session_without_transaction_is_not_committed(self, mock_session):
+        # Arrange
+        async def handler(event, data):
+            data["session"].in_transaction()
+
+        # Act
+        await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        mock_session.commit.assert_not_called()
+        mock_session.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_handler_rolls_back(self, mock_session):
+        # Arrange
+        async def handler(event, data):
+            await data["session"].execute("SELECT 1")
+            raise RuntimeError("boom")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        mock_session.rollback.assert_awaited_once()
+        mock_session.commit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_commit_hooks_run_after_commit(self, mock_session):
+        # Arrange
+        calls = []
+        mock_session.commit.side_effect = lambda: calls.append("commit")
+
+        async def handler(event, data):
+            await data["session"].execute("SELECT 1")
+            await after_commit(lambda: calls.append("hook"))
+            after_rollback(lambda: calls.append("undo"))
+
+        # Act
+        await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        assert calls == ["commit", "hook"]
+
+    @pytest.mark.asyncio
+    async def test_rollback_hooks_run_on_failure(self, mock_session):
+        # Arrange
+        calls = []
+
+        async def handler(event, data):
+            await after_commit(lambda: calls.append("hook"))
+            after_rollback(lambda: calls.append("undo"))
+            raise RuntimeError("boom")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await DatabaseMiddleware()(handler, Mock(), {})
+
+        # Assert
+        assert calls == ["undo"]
@@ -2,10 +2,13 @@
 from unittest.mock import AsyncMock, Mock
 
 import pytest
+from aiogram.fsm.storage.base import StorageKey
 
 from bot.handlers.constants import MainCallbackKey, BowelMovementMessageCommand
-from bot.middlewares.fsm_destiny import DestinyMiddleware, BOWEL_MOVEMENT, TIMEZONE
+from bot.handlers.callback_routes import BOWEL_MOVEMENT, TIMEZONE
+from bot.middlewares.fsm_destiny import DestinyMiddleware
 from bot.handlers.bowel_movement import BowelMovementStates
+from database.fsm_storage import StateIndex
 
 
 @pytest.fixture
@@ -116,3 +119,55 @@ class TestDestinyMiddleware:
         assert "destiny" in data
         assert data["destiny"] == BOWEL_MOVEMENT
         mock_storage.get_state.assert_called_once()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("waiting, expected_destiny", [
+        (True, BOWEL_MOVEMENT),
+        (False, None),
+    ])
+    async def test_destiny_from_warm_state_index(self, mock_storage, mock_handler, waiting, expected_destiny):
+        """
+        Tests that a warm state index answers without querying the storage.
+        """
+        # Arrange
+        state_index = StateIndex([BowelMovementStates.waiting_for_notes.state])
+        state_index.load([])
+        key = StorageKey(bot_id=123, chat_id=456, user_id=789, destiny=BOWEL_MOVEMENT)
+        if waiting:
+            state_index.update(key, BowelMovementStates.waiting_for_notes.state)
+        middleware = DestinyMiddleware(mock_storage, state_index=state_index)
+        mock_message = Mock()
+        mock_message.text = "This is my note"
+        mock_message.bot.id = 123
+        mock_message.chat.id = 456
+        mock_message.from_user.id = 789
+        event = Mock(message=mock_message, callback_query=None)
+        data = {}
+
+        # Act
+        await middleware(handler=mock_handler, event=event, data=data)
+
+        # Assert
+        assert data.get("destiny") == expected_destiny
+        mock_storage.get_state.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cold_state_index_falls_back_to_storage(self, mock_storage, mock_handler):
+        """
+        Tests that the storage is queried while the state index is not loaded yet.
+        """
+        # Arrange
+        state_index = StateIndex([BowelMovementStates.waiting_for_notes.state])
+        middleware = DestinyMiddleware(mock_storage, state_index=state_index)
+        mock_storage.get_state.return_value = BowelMovementStates.waiting_for_notes.state
+        mock_message = Mock()
+        mock_message.text = "This is my note"
+        event = Mock(message=mock_message, callback_query=None)
+        data = {}
+
+        # Act
+        await middleware(handler=mock_handler, event=event, data=data)
+
+        # Assert
+        assert data["destiny"] == BOWEL_MOVEMENT
+        mock_storage.get_state.assert_called_once()
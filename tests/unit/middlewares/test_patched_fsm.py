@@ -0,0 +1,111 @@
+"""Unit tests for PatchedFSMContextMiddleware"""
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+
+from bot.middlewares.patched_fsm import PatchedFSMContextMiddleware, UnitOfWorkFSMContext
+from database.fsm_storage import FSMRecord, PostgresStorage
+
+
+@pytest.fixture
+def storage_key():
+    return StorageKey(bot_id=1, chat_id=2, user_id=3, destiny="bowel_movement")
+
+
+@pytest.fixture
+def mock_storage():
+    """Fixture for a mocked FSM storage."""
+    storage = Mock(spec=PostgresStorage)
+    storage.get_record = AsyncMock(return_value=FSMRecord(state="some_state", data={"a": 1}))
+    storage.set_record = AsyncMock()
+    return storage
+
+
+@pytest.fixture
+def middleware_data():
+    """Fixture for the data passed to the middleware."""
+    event_context = Mock(chat_id=2, user_id=3, thread_id=None, business_connection_id=None)
+    return {"bot": Mock(id=1), EVENT_CONTEXT_KEY: event_context, "destiny": "bowel_movement"}
+
+
+class TestUnitOfWorkFSMContext:
+    """Test cases for the UnitOfWorkFSMContext."""
+
+    @pytest.mark.asyncio
+    async def test_record_is_loaded_once(self, mock_storage, storage_key):
+        context = UnitOfWorkFSMContext(mock_storage, storage_key)
+
+        assert await context.get_state() == "some_state"
+        assert await context.get_data() == {"a": 1}
+        assert await context.get_value("a") == 1
+
+        mock_storage.get_record.assert_called_once_with(storage_key)
+
+    @pytest.mark.asyncio
+    async def test_mutations_are_flushed_once(self, mock_storage, storage_key):
+        context = UnitOfWorkFSMContext(mock_storage, storage_key)
+
+        assert await context.update_data(b=2) == {"a": 1, "b": 2}
+        await context.set_state("other_state")
+        await context.flush()
+        await context.flush()
+
+        mock_storage.set_record.assert_called_once_with(
+            storage_key, FSMRecord(state="other_state", data={"a": 1, "b": 2})
+        )
+
+    @pytest.mark.asyncio
+    async def test_clear_flushes_empty_record(self, mock_storage, storage_key):
+        context = UnitOfWorkFSMContext(mock_storage, storage_key)
+
+        await context.clear()
+        await context.flush()
+
+        assert await context.get_state() is None
+        assert await context.get_data() == {}
+        mock_storage.set_record.assert_called_once_with(storage_key, FSMRecord())
+
+    @pytest.mark.asyncio
+    async def test_unchanged_record_is_not_written(self, mock_storage, storage_key):
+        context = UnitOfWorkFSMContext(mock_storage, storage_key)
+
+        await context.set_state("some_state")
+        await context.flush()
+
+        mock_storage.set_record.assert_not_called()
+
+
+class TestPatchedFSMContextMiddleware:
+    """Test cases for the PatchedFSMContextMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_changes_are_flushed_after_handler(self, mock_storage, middleware_data):
+        middleware = PatchedFSMContextMiddleware(mock_storage, events_isolation=SimpleEventIsolation())
+
+        async def handler(event, data):
+            await data["state"].set_state("other_state")
+            await data["state"].clear()
+            return "result"
+
+        result = await middleware(handler, Mock(), middleware_data)
+
+        assert result == "result"
+        assert middleware_data["raw_state"] == "some_state"
+        mock_storage.get_record.assert_called_once()
+        mock_storage.set_record.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_changes_are_discarded_on_error(self, mock_storage, middleware_data):
+        middleware = PatchedFSMContextMiddleware(mock_storage, events_isolation=SimpleEventIsolation())
+
+        async def handler(event, data):
+            await data["state"].set_state("other_state")
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            await middleware(handler, Mock(), middleware_data)
+
+        mock_storage.set_record.assert_not_called()
@@ -0,0 +1,159 @@
+"""Unit tests for BowelMovementRepository"""
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database.repository.bowel_movements import (
+    BowelMovementRepository, decode_history_cursor, encode_history_cursor
+)
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestCreateBowelMovement:
+    """Test cases for BowelMovementRepository.create_bowel_movement"""
+
+    @pytest.mark.asyncio
+    async def test_flushes_without_commit(self, mock_async_session):
+        # Arrange
+        mock_async_session.add = Mock()
+
+        # Act
+        bowel_movement = await BowelMovementRepository().create_bowel_movement(mock_async_session, user_id=789)
+
+        # Assert
+        mock_async_session.add.assert_called_once_with(bowel_movement)
+        mock_async_session.flush.assert_awaited_once()
+        mock_async_session.commit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_updates_daily_stats(self, mock_async_session):
+        # Arrange
+        mock_async_session.add = Mock()
+
+        # Act
+        await BowelMovementRepository().create_bowel_movement(
+            mock_async_session, user_id=789, movement_time=datetime(2025, 3, 4, tzinfo=timezone.utc),
+            stool_consistency=1, is_false_urge=False,
+        )
+
+        # Assert
+        stmt = mock_async_session.execute.call_args.args[0]
+        assert compile_sql(stmt).startswith("INSERT INTO bowel_movement_daily_stats")
+        assert "FOR SHARE OF users" in compile_sql(stmt)
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        assert params["telegram_id_1"] == 789
+
+
+class TestDeleteBowelMovement:
+    """Test cases for BowelMovementRepository.delete_bowel_movement"""
+
+    @pytest.mark.asyncio
+    async def test_decrements_daily_stats(self, mock_async_session):
+        # Arrange
+        row = Mock(time=datetime(2025, 3, 4, tzinfo=timezone.utc), stool_consistency=3, blood_lvl=0, mucus=1,
+                   is_false_urge=False)
+        mock_async_session.execute.return_value = Mock(one_or_none=Mock(return_value=row))
+
+        # Act
+        deleted = await BowelMovementRepository().delete_bowel_movement(
+            mock_async_session, bowel_movement_id=1, user_id=789,
+        )
+
+        # Assert
+        assert deleted is True
+        assert compile_sql(mock_async_session.execute.call_args_list[0].args[0]).startswith(
+            "DELETE FROM bowel_movements"
+        )
+        params = mock_async_session.execute.call_args_list[1].args[0].compile(dialect=postgresql.dialect()).params
+        # total, false_urges, liquid, mushy, normal, hard, with_blood, with_mucus
+        assert [params[f"param_{i}"] for i in range(2, 10)] == [-1, 0, 0, 0, -1, 0, 0, -1]
+
+    @pytest.mark.asyncio
+    async def test_not_found(self, mock_async_session):
+        # Arrange
+        mock_async_session.execute.return_value = Mock(one_or_none=Mock(return_value=None))
+
+        # Act
+        deleted = await BowelMovementRepository().delete_bowel_movement(
+            mock_async_session, bowel_movement_id=1, user_id=789,
+        )
+
+        # Assert
+        assert deleted is False
+        mock_async_session.execute.assert_awaited_once()
+
+
+class TestHistoryPagination:
+    """Test cases for keyset pagination of the history"""
+
+    def test_cursor_round_trip(self):
+        # Arrange
+        movement_time = datetime(2025, 3, 4, 5, 6, 7, 890, tzinfo=timezone.utc)
+        bowel_movement = Mock(date=date(2025, 3, 4), time=movement_time, id=2 ** 40)
+
+        # Act
+        cursor = encode_history_cursor(bowel_movement)
+
+        # Assert
+        assert decode_history_cursor(cursor) == (date(2025, 3, 4), movement_time, 2 ** 40)
+        # Fits into callback data together with a callback key
+        assert len(cursor) <= 32
+
+    @pytest.mark.parametrize("cursor", ["", "not a cursor", "AAAA"])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_history_cursor(cursor)
+
+    @pytest.mark.asyncio
+    async def test_page_returns_next_cursor(self, mock_async_session):
+        # Arrange
+        movement_time = datetime(2025, 3, 4, tzinfo=timezone.utc)
+        rows = [Mock(date=date(2025, 3, 4), time=movement_time, id=i) for i in (3, 2, 1)]
+        mock_async_session.execute.return_value = Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=rows))))
+
+        # Act
+        page, cursor = await BowelMovementRepository().get_bowel_movements_page(
+            mock_async_session, user_id=789, limit=2,
+        )
+
+        # Assert
+        assert page == rows[:2]
+        assert decode_history_cursor(cursor)[2] == 2
+        sql = compile_sql(mock_async_session.execute.call_args.args[0])
+        assert "ORDER BY bowel_movements.date DESC, bowel_movements.time DESC, bowel_movements.id DESC" in sql
+
+    @pytest.mark.asyncio
+    async def test_page_after_cursor(self, mock_async_session):
+        # Arrange
+        rows = [Mock(id=1)]
+        mock_async_session.execute.return_value = Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=rows))))
+        cursor = encode_history_cursor(Mock(date=date(2025, 3, 4), time=datetime(2025, 3, 4, tzinfo=timezone.utc), id=2))
+
+        # Act
+        page, next_cursor = await BowelMovementRepository().get_bowel_movements_page(
+            mock_async_session, user_id=789, cursor=cursor, limit=2,
+        )
+
+        # Assert
+        assert page == rows
+        assert next_cursor is None
+        sql = compile_sql(mock_async_session.execute.call_args.args[0])
+        assert "(bowel_movements.date, bowel_movements.time, bowel_movements.id) <" in sql
+
+    @pytest.mark.asyncio
+    async def test_iterates_over_pages(self):
+        # Arrange
+        repository = BowelMovementRepository()
+        repository.get_bowel_movements_page = AsyncMock(side_effect=[(["a", "b"], "next"), (["c"], None)])
+
+        # Act
+        result = [bowel_movement async for bowel_movement in repository.iter_bowel_movements(Mock(), 789)]
+
+        # Assert
+        assert result == ["a", "b", "c"]
+        assert repository.get_bowel_movements_page.await_args_list[1].args[2] == "next"
@@ -0,0 +1,72 @@
+"""Unit tests for the bowel movement daily stats rollup"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database.repository.daily_stats import daily_stats_rollup, rebuild_daily_stats, stats_delta
+
+
+def movement(stool_consistency=None, blood_lvl=None, mucus=None, is_false_urge=False):
+    return SimpleNamespace(
+        stool_consistency=stool_consistency, blood_lvl=blood_lvl, mucus=mucus, is_false_urge=is_false_urge
+    )
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestStatsDelta:
+    """Test cases for stats_delta"""
+
+    def test_counts_every_attribute(self):
+        delta = stats_delta(movement(stool_consistency=2, blood_lvl=3, mucus=1))
+
+        assert delta == {
+            "total": 1,
+            "false_urges": 0,
+            "consistency_liquid": 0,
+            "consistency_mushy": 1,
+            "consistency_normal": 0,
+            "consistency_hard": 0,
+            "with_blood": 1,
+            "with_mucus": 1,
+        }
+
+    def test_false_urge_removed(self):
+        delta = stats_delta(movement(is_false_urge=True, blood_lvl=0), sign=-1)
+
+        assert delta["total"] == -1
+        assert delta["false_urges"] == -1
+        assert delta["with_blood"] == 0
+
+
+class TestRebuildDailyStats:
+    """Test cases for the rollup rebuild"""
+
+    def test_rollup_groups_by_user_and_local_date(self):
+        sql = compile_sql(daily_stats_rollup([1, 2]))
+
+        assert "GROUP BY bowel_movements.user_id, CAST(timezone('UTC', bowel_movements.time)" in sql
+        assert "count(*) FILTER (WHERE bowel_movements.is_false_urge) AS false_urges" in sql
+        assert "bowel_movements.user_id IN" in sql
+
+    @pytest.mark.asyncio
+    async def test_replaces_rows_of_given_users(self):
+        # Arrange
+        conn = Mock()
+        conn.execute = AsyncMock(side_effect=[Mock(), Mock(), Mock(rowcount=5)])
+
+        # Act
+        written = await rebuild_daily_stats(conn, [1, 2])
+
+        # Assert
+        assert written == 5
+        lock_sql, delete_sql, insert_sql = (compile_sql(call.args[0]) for call in conn.execute.call_args_list)
+        assert lock_sql.startswith("SELECT users.telegram_id \nFROM users \nWHERE users.telegram_id IN")
+        assert lock_sql.endswith("ORDER BY users.telegram_id FOR UPDATE")
+        assert delete_sql.startswith("DELETE FROM bowel_movement_daily_stats")
+        assert insert_sql.startswith("INSERT INTO bowel_movement_daily_stats")
+        assert "FROM bowel_movements JOIN users" in insert_sql
@@ -0,0 +1,99 @@
+"""Unit tests for UserRepository"""
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database.repository.user import UserRepository
+
+
+class TestGetOrCreateUser:
+    """Test cases for UserRepository.get_or_create_user"""
+
+    @pytest.mark.asyncio
+    async def test_existing_user_is_selected(self, mock_async_session):
+        # Arrange
+        user = Mock()
+        mock_async_session.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=user))
+
+        # Act
+        result = await UserRepository().get_or_create_user(mock_async_session, 123)
+
+        # Assert
+        assert result is user
+        mock_async_session.execute.assert_awaited_once()
+        mock_async_session.scalars.assert_not_called()
+        sql = str(mock_async_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("SELECT users.")
+        assert "INSERT" not in sql
+
+    @pytest.mark.asyncio
+    async def test_missing_user_is_upserted(self, mock_async_session):
+        # Arrange
+        user = Mock()
+        mock_async_session.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=None))
+        mock_async_session.scalars.return_value = Mock(first=Mock(return_value=user))
+
+        # Act
+        result = await UserRepository().get_or_create_user(mock_async_session, 123)
+
+        # Assert
+        assert result is user
+        mock_async_session.execute.assert_awaited_once()
+        mock_async_session.scalars.assert_awaited_once()
+        sql = str(mock_async_session.scalars.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (telegram_id) DO NOTHING RETURNING" in sql
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_select(self, mock_async_session):
+        # Arrange
+        user = Mock()
+        mock_async_session.execute.side_effect = [
+            Mock(scalar_one_or_none=Mock(return_value=None)),
+            Mock(scalar_one_or_none=Mock(return_value=user)),
+        ]
+        mock_async_session.scalars.return_value = Mock(first=Mock(return_value=None))
+
+        # Act
+        result = await UserRepository().get_or_create_user(mock_async_session, 123)
+
+        # Assert
+        assert result is user
+        assert mock_async_session.execute.await_count == 2
+
+
+class TestTimezoneOffset:
+    """Test cases for the timezone offset update and the stats rebuild"""
+
+    @pytest.mark.asyncio
+    async def test_set_offset_in_one_statement(self, mock_async_session):
+        # Arrange
+        mock_async_session.connection = AsyncMock()
+        mock_async_session.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=180))
+
+        # Act
+        result = await UserRepository().set_timezone_offset(mock_async_session, 123, 180)
+
+        # Assert
+        assert result == 180
+        mock_async_session.execute.assert_awaited_once()
+        sql = str(mock_async_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE users SET updated_at=now(), timezone_offset=")
+        assert sql.endswith("RETURNING users.timezone_offset")
+        mock_async_session.connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_daily_stats_in_same_transaction(self, mock_async_session):
+        # Arrange
+        conn = AsyncMock()
+        mock_async_session.connection = AsyncMock(return_value=conn)
+
+        # Act
+        await UserRepository().rebuild_user_daily_stats(mock_async_session, 123)
+
+        # Assert
+        _, delete_sql, insert_sql = (
+            str(call.args[0].compile(dialect=postgresql.dialect())) for call in conn.execute.call_args_list
+        )
+        assert delete_sql.startswith("DELETE FROM bowel_movement_daily_stats")
+        assert insert_sql.startswith("INSERT INTO bowel_movement_daily_stats")
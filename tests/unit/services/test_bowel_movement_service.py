@@ -1,7 +1,11 @@
 """Unit tests for BowelMovementService"""
+from datetime import date
+
 import pytest
 from unittest.mock import AsyncMock, Mock
 
+from database.models import BowelMovementDailyStats
+from database.models.bowel_movement import StoolConsistency
 from database.repository.bowel_movements import BowelMovementRepository
 from service.bowel_movement import BowelMovementService
 from bot.handlers.constants import BowelMovementCallbackKey
@@ -12,8 +16,8 @@ def mock_bowel_movement_repo():
     """Fixture for a mocked BowelMovementRepository."""
     repo = Mock(spec=BowelMovementRepository)
     repo.create_bowel_movement = AsyncMock()
-    repo.update_bowel_movement = AsyncMock()
     repo.get_bowel_movement_by_id = AsyncMock()
+    repo.get_daily_stats = AsyncMock(return_value=[])
     return repo
 
 
@@ -93,65 +97,68 @@ class TestBowelMovementService:
             movement_date=None,
             movement_time=None,
             notes=None,
-            stool_consistency=None
+            stool_consistency=None,
+            mucus=None,
+            blood_lvl=None,
+            is_false_urge=False,
         )
         assert result == mock_bowel_movement
 
     @pytest.mark.asyncio
-    async def test_update_bowel_movement(self, mock_async_session, mock_bowel_movement_repo):
-        """Test updating bowel movement delegates to the repository"""
+    async def test_get_bowel_movement_by_id(self, mock_async_session, mock_bowel_movement_repo):
+        """Test getting bowel movement by ID delegates to the repository"""
         # Arrange
         service = BowelMovementService(bowel_movement_repository=mock_bowel_movement_repo)
         mock_bowel_movement = Mock()
-        mock_bowel_movement_repo.update_bowel_movement.return_value = mock_bowel_movement
+        mock_bowel_movement_repo.get_bowel_movement_by_id.return_value = mock_bowel_movement
 
         # Act
-        result = await service.update_bowel_movement(
+        result = await service.get_bowel_movement_by_id(
             session=mock_async_session,
             bowel_movement_id=1,
-            notes="Some notes",
-            stool_consistency=2,
-            blood_lvl=1,
-            mucus=0,
-            is_false_urge=False,
             user_id=1,
         )
 
         # Assert
-        mock_bowel_movement_repo.update_bowel_movement.assert_called_once_with(
+        mock_bowel_movement_repo.get_bowel_movement_by_id.assert_called_once_with(
             session=mock_async_session,
-            movement_id=1,
-            notes="Some notes",
-            stool_consistency=2,
-            blood_lvl=1,
-            mucus=0,
-            is_false_urge=False,
-            user_id=1
+            bowel_movement_id=1,
+            user_id=1,
         )
         assert result == mock_bowel_movement
 
     @pytest.mark.asyncio
-    async def test_get_bowel_movement_by_id(self, mock_async_session, mock_bowel_movement_repo):
-        """Test getting bowel movement by ID delegates to the repository"""
+    async def test_get_stats_sums_daily_rows(self, mock_async_session, mock_bowel_movement_repo):
+        """Test statistics are summed from the daily rollup"""
         # Arrange
         service = BowelMovementService(bowel_movement_repository=mock_bowel_movement_repo)
-        mock_bowel_movement = Mock()
-        mock_bowel_movement_repo.get_bowel_movement_by_id.return_value = mock_bowel_movement
+        mock_bowel_movement_repo.get_daily_stats.return_value = [
+            BowelMovementDailyStats(local_date=date(2026, 10, 16), total=3, false_urges=1, consistency_liquid=2,
+                                    consistency_mushy=0, consistency_normal=0, consistency_hard=0, with_blood=1,
+                                    with_mucus=0),
+            BowelMovementDailyStats(local_date=date(2026, 10, 17), total=2, false_urges=0, consistency_liquid=0,
+                                    consistency_mushy=1, consistency_normal=1, consistency_hard=0, with_blood=1,
+                                    with_mucus=2),
+        ]
 
         # Act
-        result = await service.get_bowel_movement_by_id(
-            session=mock_async_session,
-            bowel_movement_id=1,
-            user_id=1,
-        )
+        summary = await service.get_stats(mock_async_session, 123, end_date=date(2026, 10, 17), days=7)
 
         # Assert
-        mock_bowel_movement_repo.get_bowel_movement_by_id.assert_called_once_with(
+        mock_bowel_movement_repo.get_daily_stats.assert_called_once_with(
             session=mock_async_session,
-            bowel_movement_id=1,
-            user_id=1,
+            user_id=123,
+            start_date=date(2026, 10, 11),
+            end_date=date(2026, 10, 17),
         )
-        assert result == mock_bowel_movement
+        assert summary.days == 7
+        assert summary.total == 5
+        assert summary.real == 4
+        assert summary.per_day == {date(2026, 10, 16): 3, date(2026, 10, 17): 2}
+        assert summary.consistency[StoolConsistency.LIQUID] == 2
+        assert summary.consistency[StoolConsistency.HARD] == 0
+        assert summary.with_blood == 2
+        assert summary.with_mucus == 2
 
 
 if __name__ == "__main__":
@@ -3,9 +3,11 @@ from unittest.mock import AsyncMock, Mock
 
 import pytest
 
+from database.cache import LRUCache
 from database.models import User
 from database.repository.user import UserRepository
-from service.user import UserService
+from database.session import transaction_hooks_scope
+from service.user import UserProfile, UserService
 
 
 @pytest.fixture
@@ -15,6 +17,9 @@ def mock_user_repo():
     repo.get_user_by_telegram_id = AsyncMock()
     repo.create_user = AsyncMock()
     repo.update_user = AsyncMock()
+    repo.get_or_create_user = AsyncMock()
+    repo.set_timezone_offset = AsyncMock()
+    repo.rebuild_user_daily_stats = AsyncMock()
     return repo
 
 
@@ -62,82 +67,154 @@ class TestUserService:
         assert result == mock_user
 
     @pytest.mark.asyncio
-    async def test_get_or_create_user_existing(self, mock_async_session, mock_user_repo):
-        """Test get_or_create_user returns existing user."""
+    async def test_get_or_create_user(self, mock_async_session, mock_user_repo):
+        """Test get_or_create_user delegates to the repository upsert."""
         # Arrange
         user_service = UserService(user_repository=mock_user_repo)
         mock_user = Mock(spec=User)
-        mock_user_repo.get_user_by_telegram_id.return_value = mock_user
+        mock_user_repo.get_or_create_user.return_value = mock_user
 
         # Act
         result = await user_service.get_or_create_user(
             session=mock_async_session,
-            telegram_id=123
+            telegram_id=123,
+            language_code='fr',
+            timezone_offset=120
         )
 
         # Assert
-        mock_user_repo.get_user_by_telegram_id.assert_called_once_with(mock_async_session, 123)
-        mock_user_repo.create_user.assert_not_called()
+        mock_user_repo.get_or_create_user.assert_called_once_with(mock_async_session, 123, 'fr', 120)
+        mock_user_repo.get_user_by_telegram_id.assert_not_called()
         assert result == mock_user
 
     @pytest.mark.asyncio
-    async def test_get_or_create_user_new(self, mock_async_session, mock_user_repo):
-        """Test get_or_create_user creates a new user if not exists."""
+    async def test_get_or_create_user_default_timezone(self, mock_async_session, mock_user_repo):
+        """Test get_or_create_user creates users with a zero timezone offset by default."""
         # Arrange
         user_service = UserService(user_repository=mock_user_repo)
-        mock_user = Mock(spec=User)
-        mock_user_repo.get_user_by_telegram_id.return_value = None  # Simulate user not found
-        mock_user_repo.create_user.return_value = mock_user
 
         # Act
-        result = await user_service.get_or_create_user(
-            session=mock_async_session,
-            telegram_id=123,
-            language_code='fr',
-            timezone_offset=120
-        )
+        await user_service.get_or_create_user(session=mock_async_session, telegram_id=123)
 
         # Assert
-        mock_user_repo.get_user_by_telegram_id.assert_called_once_with(mock_async_session, 123)
-        mock_user_repo.create_user.assert_called_once_with(mock_async_session, 123, 'fr', 120)
-        assert result == mock_user
+        mock_user_repo.get_or_create_user.assert_called_once_with(mock_async_session, 123, 'ru', 0)
 
     @pytest.mark.asyncio
-    async def test_set_user_hour_timezone(self, mock_async_session, mock_user_repo):
-        """Test setting user timezone in hours."""
+    @pytest.mark.parametrize("hours, minutes, expected", [(5, 30, 330), (-3, 30, -210), (0, 45, 45)])
+    async def test_set_user_timezone(self, mock_async_session, mock_user_repo, hours, minutes, expected):
+        """Test setting hours and minutes of the timezone with one write."""
         # Arrange
         user_service = UserService(user_repository=mock_user_repo)
-        mock_user = Mock(spec=User)
-        mock_user.timezone_offset = 0
-        mock_user_repo.get_user_by_telegram_id.return_value = mock_user
+        mock_user_repo.set_timezone_offset.return_value = expected
 
         # Act
-        await user_service.set_user_hour_timezone(
-            session=mock_async_session,
-            telegram_id=123,
-            timezone_offset=3
-        )
+        result = await user_service.set_user_timezone(mock_async_session, 123, hours, minutes)
 
         # Assert
-        assert mock_user.timezone_offset == 180  # 3 * 60
-        mock_user_repo.update_user.assert_called_once_with(mock_async_session, mock_user)
+        assert result == expected
+        mock_user_repo.set_timezone_offset.assert_called_once_with(mock_async_session, 123, expected)
+        mock_user_repo.rebuild_user_daily_stats.assert_awaited_once_with(mock_async_session, 123)
 
     @pytest.mark.asyncio
-    async def test_set_user_minute_timezone(self, mock_async_session, mock_user_repo):
-        """Test setting user timezone in minutes."""
+    async def test_set_timezone_of_unknown_user_skips_rebuild(self, mock_async_session, mock_user_repo):
+        """Test that nothing is recounted when the user doesn't exist."""
         # Arrange
         user_service = UserService(user_repository=mock_user_repo)
-        mock_user = Mock(spec=User)
-        mock_user.timezone_offset = 120  # +2 hours
-        mock_user_repo.get_user_by_telegram_id.return_value = mock_user
+        mock_user_repo.set_timezone_offset.return_value = None
 
         # Act
-        await user_service.set_user_minute_timezone(
-            session=mock_async_session,
-            telegram_id=123,
-            timezone_minutes=45
+        result = await user_service.set_user_timezone(mock_async_session, 123, 3)
+
+        # Assert
+        assert result is None
+        mock_user_repo.rebuild_user_daily_stats.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_user_profile_is_cached(self, mock_async_session, mock_user_repo):
+        """Test that the user profile is read from the database only once."""
+        # Arrange
+        user_service = UserService(user_repository=mock_user_repo, profile_cache=LRUCache(max_size=10))
+        mock_user = Mock(spec=User, telegram_id=123, timezone_offset=180, language_code="ru")
+        mock_user_repo.get_or_create_user.return_value = mock_user
+
+        # Act
+        first = await user_service.get_user_profile(mock_async_session, 123)
+        second = await user_service.get_user_profile(mock_async_session, 123)
+
+        # Assert
+        assert first == second == UserProfile(telegram_id=123, timezone_offset=180, language_code="ru")
+        mock_user_repo.get_or_create_user.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_timezone_change_invalidates_profile(self, mock_async_session, mock_user_repo):
+        """Test that setting the timezone drops the cached profile and calls the change hook."""
+        # Arrange
+        on_profile_change = AsyncMock()
+        user_service = UserService(
+            user_repository=mock_user_repo,
+            profile_cache=LRUCache(max_size=10),
+            on_profile_change=on_profile_change,
+        )
+        mock_user = Mock(spec=User, telegram_id=123, timezone_offset=0, language_code="ru")
+        mock_user_repo.get_or_create_user.return_value = mock_user
+        mock_user_repo.set_timezone_offset.return_value = 180
+        await user_service.get_user_profile(mock_async_session, 123)
+        mock_user.timezone_offset = 180
+
+        # Act
+        await user_service.set_user_timezone(mock_async_session, 123, 3)
+        profile = await user_service.get_user_profile(mock_async_session, 123)
+
+        # Assert
+        assert profile.timezone_offset == 180
+        on_profile_change.assert_awaited_once_with(123)
+
+    @pytest.mark.asyncio
+    async def test_profile_invalidated_after_commit(self, mock_async_session, mock_user_repo):
+        """Test that the cached profile is kept until the update is committed."""
+        # Arrange
+        on_profile_change = AsyncMock()
+        cache = LRUCache(max_size=10)
+        user_service = UserService(
+            user_repository=mock_user_repo, profile_cache=cache, on_profile_change=on_profile_change
+        )
+        mock_user_repo.get_or_create_user.return_value = Mock(
+            spec=User, telegram_id=123, timezone_offset=0, language_code="ru"
+        )
+        mock_user_repo.set_timezone_offset.return_value = 180
+        await user_service.get_user_profile(mock_async_session, 123)
+
+        # Act
+        async with transaction_hooks_scope():
+            await user_service.set_user_timezone(mock_async_session, 123, 3)
+            cached_before_commit = cache.get(123)
+
+        # Assert
+        assert cached_before_commit is not None
+        assert cache.get(123) is None
+        on_profile_change.assert_awaited_once_with(123)
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_change_keeps_profile(self, mock_async_session, mock_user_repo):
+        """Test that a rolled back timezone change neither drops the profile nor calls the hook."""
+        # Arrange
+        on_profile_change = AsyncMock()
+        cache = LRUCache(max_size=10)
+        user_service = UserService(
+            user_repository=mock_user_repo, profile_cache=cache, on_profile_change=on_profile_change
         )
+        mock_user_repo.get_or_create_user.return_value = Mock(
+            spec=User, telegram_id=123, timezone_offset=0, language_code="ru"
+        )
+        mock_user_repo.set_timezone_offset.return_value = 180
+        await user_service.get_user_profile(mock_async_session, 123)
+
+        # Act
+        with pytest.raises(RuntimeError):
+            async with transaction_hooks_scope():
+                await user_service.set_user_timezone(mock_async_session, 123, 3)
+                raise RuntimeError("boom")
 
         # Assert
-        assert mock_user.timezone_offset == 165  # 120 + 45
-        mock_user_repo.update_user.assert_called_once_with(mock_async_session, mock_user)
+        assert cache.get(123) is not None
+        on_profile_change.assert_not_called()
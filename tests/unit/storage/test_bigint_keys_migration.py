@@ -0,0 +1,59 @@
+"""Dry-run tests for the bigint keys migration"""
+import importlib.util
+import re
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+MIGRATION = Path(__file__).parents[3] / "migrations" / "versions" / "20261017_0013_bigint_keys.py"
+
+CREATED_NAME = re.compile(r"(?:CREATE (?:UNIQUE )?INDEX (?:CONCURRENTLY )?|ADD CONSTRAINT )(\w+)")
+
+
+@pytest.fixture
+def migration():
+    spec = importlib.util.spec_from_file_location("bigint_keys_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.op = MagicMock()
+    module.op.get_bind.return_value.execute.return_value.one.return_value = (1, 2 * module.BATCH_SIZE + 1)
+    return module
+
+
+def _statements(migration):
+    return [str(call.args[0]) for call in migration.op.execute.call_args_list]
+
+
+class TestBigintKeysMigration:
+    """Test cases for the statements generated by the upgrade"""
+
+    def test_created_names_are_unique(self, migration):
+        # Act
+        migration.upgrade()
+
+        # Assert
+        names = [match.group(1) for sql in _statements(migration) for match in CREATED_NAME.finditer(sql)]
+        assert names
+        assert len(names) == len(set(names))
+
+    def test_bowel_movements_is_not_converted(self, migration):
+        # Act
+        migration.upgrade()
+
+        # Assert
+        assert not [sql for sql in _statements(migration) if "bowel_movements" in sql]
+        assert all(call.args[0] == "users" for call in migration.op.add_column.call_args_list)
+
+    def test_backfill_covers_id_range_in_batches(self, migration):
+        # Act
+        migration.upgrade()
+
+        # Assert
+        conn = migration.op.get_bind.return_value
+        batches = [call.args[1] for call in conn.execute.call_args_list if len(call.args) > 1]
+        assert batches == [
+            {"low": 1, "high": 1 + migration.BATCH_SIZE},
+            {"low": 1 + migration.BATCH_SIZE, "high": 1 + 2 * migration.BATCH_SIZE},
+            {"low": 1 + 2 * migration.BATCH_SIZE, "high": 1 + 3 * migration.BATCH_SIZE},
+        ]
@@ -0,0 +1,157 @@
+"""Unit tests for CachedStorage and LRUCache"""
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from database.cache import LRUCache
+from database.fsm_storage import CachedStorage, FSMRecord, PostgresStorage
+from database.session import transaction_hooks_scope
+
+
+@pytest.fixture
+def storage_key():
+    return StorageKey(bot_id=1, chat_id=2, user_id=3, destiny="bowel_movement")
+
+
+@pytest.fixture
+def mock_postgres_storage():
+    """Fixture for a mocked PostgresStorage."""
+    storage = Mock(spec=PostgresStorage)
+    storage.build_key = PostgresStorage().build_key
+    storage.get_state = AsyncMock(return_value="some_state")
+    storage.get_data = AsyncMock(return_value={"a": 1})
+    storage.get_record = AsyncMock(return_value=FSMRecord(state="some_state", data={"a": 1}))
+    storage.set_state = AsyncMock()
+    storage.set_data = AsyncMock()
+    return storage
+
+
+class TestLRUCache:
+    """Test cases for LRUCache"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.stats.evictions == 1
+
+    def test_expires_entries(self):
+        now = [0.0]
+        cache = LRUCache(max_size=10, ttl=5, clock=lambda: now[0])
+        cache.set("a", 1)
+        now[0] = 6
+
+        assert cache.get("a") is None
+        assert cache.stats.misses == 1
+        assert cache.stats.evictions == 1
+
+
+class TestCachedStorage:
+    """Test cases for CachedStorage"""
+
+    @pytest.mark.asyncio
+    async def test_reads_are_served_from_cache(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+
+        assert await storage.get_state(storage_key) == "some_state"
+        assert await storage.get_state(storage_key) == "some_state"
+
+        mock_postgres_storage.get_state.assert_called_once_with(storage_key)
+        assert storage.cache.stats.hits == 1
+        assert storage.cache.stats.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_record_fills_state_and_data(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+
+        await storage.get_record(storage_key)
+
+        assert await storage.get_state(storage_key) == "some_state"
+        assert await storage.get_data(storage_key) == {"a": 1}
+        mock_postgres_storage.get_state.assert_not_called()
+        mock_postgres_storage.get_data.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_writes_go_through(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+
+        await storage.set_state(storage_key, "new_state")
+        await storage.set_data(storage_key, {"b": 2})
+
+        mock_postgres_storage.set_state.assert_called_once_with(storage_key, "new_state")
+        mock_postgres_storage.set_data.assert_called_once_with(storage_key, {"b": 2})
+        assert await storage.get_state(storage_key) == "new_state"
+        assert await storage.get_data(storage_key) == {"b": 2}
+        mock_postgres_storage.get_state.assert_not_called()
+        mock_postgres_storage.get_data.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_write_invalidates_cache(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+        await storage.get_state(storage_key)
+        mock_postgres_storage.set_state.side_effect = RuntimeError
+
+        with pytest.raises(RuntimeError):
+            await storage.set_state(storage_key, "new_state")
+
+        assert len(storage.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_pop_idle_record_invalidates_key(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+        await storage.get_state(storage_key)
+        record = FSMRecord(state="some_state", data={"a": 1})
+        mock_postgres_storage.pop_idle_record = AsyncMock(return_value=record)
+
+        assert await storage.pop_idle_record(storage_key, ["some_state"], timedelta(hours=1)) is record
+
+        assert len(storage.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_write_invalidates_key(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+        mock_postgres_storage.set_record = AsyncMock()
+
+        with pytest.raises(RuntimeError):
+            async with transaction_hooks_scope():
+                await storage.set_record(storage_key, FSMRecord(state="new_state", data={"b": 2}))
+                assert await storage.get_state(storage_key) == "new_state"
+                raise RuntimeError
+
+        assert len(storage.cache) == 0
+        assert await storage.get_state(storage_key) == "some_state"
+
+    @pytest.mark.asyncio
+    async def test_committed_write_stays_cached(self, mock_postgres_storage, storage_key):
+        storage = CachedStorage(mock_postgres_storage)
+        mock_postgres_storage.set_record = AsyncMock()
+
+        async with transaction_hooks_scope():
+            await storage.set_record(storage_key, FSMRecord(state="new_state", data={"b": 2}))
+
+        assert await storage.get_record(storage_key) == FSMRecord(state="new_state", data={"b": 2})
+        mock_postgres_storage.get_record.assert_not_called()
+
+
+class TestPostgresStorage:
+    """Test cases for PostgresStorage key building"""
+
+    def test_build_key(self, storage_key):
+        assert PostgresStorage().build_key(storage_key) == {
+            "bot_id": 1,
+            "chat_id": 2,
+            "user_id": 3,
+            "thread_id": 0,
+            "destiny": 1,
+        }
+
+    def test_build_key_unknown_destiny(self):
+        with pytest.raises(ValueError):
+            PostgresStorage().build_key(StorageKey(bot_id=1, chat_id=2, user_id=3, destiny="unknown"))
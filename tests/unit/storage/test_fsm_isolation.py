@@ -0,0 +1,94 @@
+"""Unit tests for FSM event isolations"""
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from database.fsm_isolation import LocalEventIsolation, PostgresEventIsolation
+
+
+@pytest.fixture
+def storage_key():
+    return StorageKey(bot_id=1, chat_id=2, user_id=3, destiny="bowel_movement")
+
+
+@pytest.fixture
+def mock_connection():
+    """Fixture for a mocked connection used by the isolation."""
+    conn = Mock()
+    conn.scalar = AsyncMock(return_value=True)
+    conn.execute = AsyncMock()
+
+    @asynccontextmanager
+    async def begin_connection(engine):
+        yield conn
+
+    with patch("database.fsm_isolation.begin_connection", begin_connection):
+        yield conn
+
+
+class TestLocalEventIsolation:
+    """Test cases for LocalEventIsolation"""
+
+    @pytest.mark.asyncio
+    async def test_idle_locks_are_dropped(self, storage_key):
+        isolation = LocalEventIsolation()
+
+        async with isolation.lock(storage_key):
+            assert isolation.size == 1
+
+        assert isolation.size == 0
+
+    @pytest.mark.asyncio
+    async def test_events_for_same_key_are_serialized(self, storage_key):
+        isolation = LocalEventIsolation()
+        order = []
+
+        async def process(name):
+            async with isolation.lock(storage_key):
+                order.append(f"{name} start")
+                await asyncio.sleep(0)
+                order.append(f"{name} end")
+
+        await asyncio.gather(process("first"), process("second"))
+
+        assert order == ["first start", "first end", "second start", "second end"]
+        assert isolation.size == 0
+
+
+class TestPostgresEventIsolation:
+    """Test cases for PostgresEventIsolation"""
+
+    def test_lock_id_is_stable_and_fits_bigint(self, storage_key):
+        lock_id = PostgresEventIsolation.lock_id(storage_key)
+
+        assert lock_id == PostgresEventIsolation.lock_id(StorageKey(bot_id=1, chat_id=2, user_id=3,
+                                                                    destiny="bowel_movement"))
+        assert lock_id != PostgresEventIsolation.lock_id(StorageKey(bot_id=1, chat_id=2, user_id=4,
+                                                                    destiny="bowel_movement"))
+        assert -2 ** 63 <= lock_id < 2 ** 63
+
+    @pytest.mark.asyncio
+    async def test_uncontended_lock(self, mock_connection, storage_key):
+        isolation = PostgresEventIsolation(engine=Mock())
+
+        async with isolation.lock(storage_key):
+            assert isolation.stats.active_holds == 1
+
+        mock_connection.execute.assert_not_called()
+        assert isolation.stats.acquisitions == 1
+        assert isolation.stats.contended == 0
+        assert isolation.stats.active_holds == 0
+
+    @pytest.mark.asyncio
+    async def test_contended_lock_waits(self, mock_connection, storage_key):
+        mock_connection.scalar.return_value = False
+        isolation = PostgresEventIsolation(engine=Mock())
+
+        async with isolation.lock(storage_key):
+            pass
+
+        mock_connection.execute.assert_called_once()
+        assert isolation.stats.contended == 1
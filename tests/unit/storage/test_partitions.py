@@ -0,0 +1,32 @@
+"""Unit tests for bowel_movements partition helpers"""
+from datetime import date
+
+import pytest
+
+from database.partitions import add_months, create_partition_sql, partition_month, partition_name
+
+
+class TestPartitions:
+    """Test cases for partition naming and DDL"""
+
+    @pytest.mark.parametrize("month, months, expected", [
+        (date(2026, 10, 1), 1, date(2026, 11, 1)),
+        (date(2026, 12, 1), 1, date(2027, 1, 1)),
+        (date(2026, 1, 1), -1, date(2025, 12, 1)),
+        (date(2026, 10, 1), -13, date(2025, 9, 1)),
+    ])
+    def test_add_months(self, month, months, expected):
+        assert add_months(month, months) == expected
+
+    def test_partition_name_round_trip(self):
+        name = partition_name(date(2026, 3, 1))
+
+        assert name == "bowel_movements_y2026m03"
+        assert partition_month(name) == date(2026, 3, 1)
+        assert partition_month("bowel_movements_legacy") is None
+
+    def test_create_partition_sql(self):
+        assert create_partition_sql(date(2026, 12, 17)) == (
+            "CREATE TABLE IF NOT EXISTS bowel_movements_y2026m12 PARTITION OF bowel_movements "
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+        )
@@ -0,0 +1,102 @@
+"""Unit tests for StateIndex"""
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from database.fsm_storage import FSMRecord, PostgresStorage, StateIndex
+from database.session import transaction_hooks_scope
+
+WAITING = "BowelMovementStates:waiting_for_notes"
+
+
+@pytest.fixture
+def storage_key():
+    return StorageKey(bot_id=1, chat_id=2, user_id=3, destiny="bowel_movement")
+
+
+@pytest.fixture
+def state_index():
+    index = StateIndex([WAITING])
+    index.load([])
+    return index
+
+
+@pytest.fixture
+def mock_connection():
+    """Patch begin_connection of the storage with a mocked connection."""
+    conn = AsyncMock()
+
+    @asynccontextmanager
+    async def begin_connection(engine):
+        yield conn
+
+    with patch("database.fsm_storage.begin_connection", begin_connection):
+        yield conn
+
+
+class TestStateIndex:
+    """Test cases for StateIndex"""
+
+    def test_unknown_until_loaded(self, storage_key):
+        index = StateIndex([WAITING])
+
+        assert index.contains(storage_key) is None
+        index.load([storage_key])
+        assert index.contains(storage_key) is True
+
+    def test_tracks_watched_states(self, state_index, storage_key):
+        state_index.update(storage_key, WAITING)
+        assert state_index.contains(storage_key) is True
+
+        state_index.update(storage_key, "other_state")
+        assert state_index.contains(storage_key) is False
+
+    def test_thread_id_none_matches_zero(self, state_index, storage_key):
+        state_index.update(storage_key, WAITING)
+
+        assert state_index.contains(
+            StorageKey(bot_id=1, chat_id=2, user_id=3, thread_id=0, destiny="bowel_movement")
+        ) is True
+
+
+class TestPostgresStorageStateIndex:
+    """Test cases for index maintenance in PostgresStorage"""
+
+    @pytest.mark.asyncio
+    async def test_writes_update_index(self, mock_connection, state_index, storage_key):
+        storage = PostgresStorage(state_index=state_index)
+
+        await storage.set_state(storage_key, WAITING)
+        assert state_index.contains(storage_key) is True
+
+        await storage.clear(storage_key)
+        assert state_index.contains(storage_key) is False
+
+        await storage.set_record(storage_key, FSMRecord(state=WAITING, data={"a": 1}))
+        assert state_index.contains(storage_key) is True
+
+        await storage.set_state(storage_key, None)
+        assert state_index.contains(storage_key) is False
+
+    @pytest.mark.asyncio
+    async def test_index_updated_after_commit(self, mock_connection, state_index, storage_key):
+        storage = PostgresStorage(state_index=state_index)
+
+        async with transaction_hooks_scope():
+            await storage.set_state(storage_key, WAITING)
+            assert state_index.contains(storage_key) is False
+
+        assert state_index.contains(storage_key) is True
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_write_keeps_index(self, mock_connection, state_index, storage_key):
+        storage = PostgresStorage(state_index=state_index)
+
+        with pytest.raises(RuntimeError):
+            async with transaction_hooks_scope():
+                await storage.set_record(storage_key, FSMRecord(state=WAITING, data={"a": 1}))
+                raise RuntimeError
+
+        assert state_index.contains(storage_key) is False
@@ -0,0 +1,125 @@
+"""Unit tests for the connection shared by an update"""
+from functools import partial
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+import pytest_asyncio
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from bot.middlewares import ConnectionScopeMiddleware, DatabaseMiddleware
+from bot.middlewares.patched_fsm import PatchedFSMContextMiddleware
+from database.fsm_storage import FSMRecord, PostgresStorage
+from database.session import LazySession, begin_connection, update_connection_scope
+
+
+@pytest_asyncio.fixture
+async def sqlite_engine(tmp_path):
+    """Fixture for an engine of a throwaway SQLite database with one table."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (value INTEGER)"))
+    yield engine
+    await engine.dispose()
+
+
+async def stored_values(engine) -> list:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT value FROM items ORDER BY value"))).scalars().all()
+
+
+class TestUpdateConnectionScope:
+    """Test cases for update_connection_scope"""
+
+    @pytest.mark.asyncio
+    async def test_unused_scope_takes_no_connection(self):
+        engine = Mock()
+
+        async with update_connection_scope(async_engine=engine):
+            pass
+
+        engine.connect.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_session_and_storage_share_the_connection(self, sqlite_engine):
+        async with update_connection_scope(async_engine=sqlite_engine):
+            session = LazySession()
+            await session.execute(text("INSERT INTO items VALUES (1)"))
+            async with begin_connection(sqlite_engine) as conn:
+                await conn.execute(text("INSERT INTO items VALUES (2)"))
+                assert conn.sync_connection is session.get_bind()
+            await session.commit()
+            await session.close()
+
+        assert await stored_values(sqlite_engine) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_failed_update_is_rolled_back(self, sqlite_engine):
+        with pytest.raises(RuntimeError):
+            async with update_connection_scope(async_engine=sqlite_engine):
+                session = LazySession()
+                await session.execute(text("INSERT INTO items VALUES (1)"))
+                await session.commit()
+                await session.close()
+                raise RuntimeError
+
+        assert await stored_values(sqlite_engine) == []
+
+
+class TestConnectionScopeMiddleware:
+    """Test cases for the middleware chain sharing the update transaction"""
+
+    @staticmethod
+    async def run_update(engine, storage) -> None:
+        """Run a handler that saves a record and clears the state through the bot middleware chain"""
+        fsm = PatchedFSMContextMiddleware(storage, events_isolation=SimpleEventIsolation())
+        database = DatabaseMiddleware()
+
+        async def handler(event, data):
+            await data["session"].execute(text("INSERT INTO items VALUES (1)"))
+            await data["session"].commit()
+            await data["state"].clear()
+
+        event_context = Mock(chat_id=2, user_id=3, thread_id=None, business_connection_id=None)
+        data = {"bot": Mock(id=1), EVENT_CONTEXT_KEY: event_context}
+        with patch("bot.middlewares.database.update_connection_scope",
+                   partial(update_connection_scope, async_engine=engine)):
+            await ConnectionScopeMiddleware()(
+                lambda event, data: fsm(lambda event, data: database(handler, event, data), event, data),
+                Mock(),
+                data,
+            )
+
+    @pytest.mark.asyncio
+    async def test_handler_writes_and_fsm_flush_are_committed_together(self, sqlite_engine):
+        # Arrange
+        storage = Mock(spec=PostgresStorage)
+        storage.get_record = AsyncMock(return_value=FSMRecord(state="waiting_for_notes", data={}))
+
+        async def set_record(key, record):
+            async with begin_connection(sqlite_engine) as conn:
+                await conn.execute(text("INSERT INTO items VALUES (2)"))
+
+        storage.set_record = AsyncMock(side_effect=set_record)
+
+        # Act
+        await self.run_update(sqlite_engine, storage)
+
+        # Assert
+        assert await stored_values(sqlite_engine) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_failed_fsm_flush_rolls_back_handler_writes(self, sqlite_engine):
+        # Arrange
+        storage = Mock(spec=PostgresStorage)
+        storage.get_record = AsyncMock(return_value=FSMRecord(state="waiting_for_notes", data={}))
+        storage.set_record = AsyncMock(side_effect=RuntimeError)
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await self.run_update(sqlite_engine, storage)
+
+        # Assert
+        assert await stored_values(sqlite_engine) == []
@@ -0,0 +1,243 @@
+"""Unit tests for the draft reaper task"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.handlers.bowel_movement import BowelMovementStates
+from bot.tasks.draft_reaper import DRAFT_STATES, DraftReaper, run_draft_reaper
+from database.fsm_isolation import LocalEventIsolation
+from database.fsm_storage import FSMRecord, PostgresStorage
+from database.models.bowel_movement import BowelMovement
+from service.bowel_movement import BowelMovementService
+from service.user import UserProfile, UserService
+
+STARTED_AT = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+
+
+def storage_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id, destiny="bowel_movement")
+
+
+def draft_record(state=BowelMovementStates.blood, **fields) -> FSMRecord:
+    return FSMRecord(
+        state=state.state,
+        data={"bowel_movement_msg_id": 10, "chat_id": 20, "started_at": STARTED_AT.isoformat(), **fields},
+    )
+
+
+@asynccontextmanager
+async def no_connection_scope():
+    yield None
+
+
+@pytest.fixture
+def mock_storage():
+    storage = Mock(spec=PostgresStorage)
+    storage.idle_keys = AsyncMock(return_value=[])
+    storage.pop_idle_record = AsyncMock(return_value=None)
+    return storage
+
+
+@pytest.fixture
+def mock_bowel_movement_service():
+    service = Mock(spec=BowelMovementService)
+    bowel_movement = Mock(spec=BowelMovement)
+    bowel_movement.id = 7
+    bowel_movement.time = STARTED_AT
+    bowel_movement.is_false_urge = False
+    bowel_movement.stool_consistency = 2
+    bowel_movement.mucus = None
+    bowel_movement.blood_lvl = None
+    bowel_movement.notes = None
+    service.create_bowel_movement = AsyncMock(return_value=bowel_movement)
+    return service
+
+
+@pytest.fixture
+def mock_user_service():
+    service = Mock(spec=UserService)
+    service.get_user_profile = AsyncMock(
+        return_value=UserProfile(telegram_id=1, timezone_offset=180, language_code="ru")
+    )
+    return service
+
+
+@pytest.fixture
+def reaper(mock_storage, mock_bowel_movement_service, mock_user_service):
+    bot = Mock()
+    bot.edit_message_text = AsyncMock()
+    bot.edit_message_reply_markup = AsyncMock()
+    reaper = DraftReaper(
+        bot,
+        mock_storage,
+        LocalEventIsolation(),
+        bowel_movement_service=mock_bowel_movement_service,
+        user_service=mock_user_service,
+        idle_after=timedelta(hours=1),
+        batch_size=2,
+        concurrency=2,
+    )
+    session = Mock()
+    session.commit = AsyncMock()
+    session.close = AsyncMock()
+    with patch("bot.tasks.draft_reaper.update_connection_scope", no_connection_scope), \
+            patch("bot.tasks.draft_reaper.LazySession", Mock(return_value=session)):
+        yield reaper
+
+
+class TestDraftReaper:
+    """Test cases for DraftReaper"""
+
+    @pytest.mark.asyncio
+    async def test_saves_idle_draft_and_edits_message(self, reaper, mock_storage, mock_bowel_movement_service):
+        # Arrange
+        key = storage_key(1)
+        mock_storage.idle_keys.return_value = [key]
+        mock_storage.pop_idle_record.return_value = draft_record(stool_consistency=2)
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 1
+        mock_storage.idle_keys.assert_called_once_with(DRAFT_STATES, timedelta(hours=1), limit=2)
+        mock_storage.pop_idle_record.assert_called_once_with(key, DRAFT_STATES, timedelta(hours=1))
+        create_kwargs = mock_bowel_movement_service.create_bowel_movement.call_args.kwargs
+        assert create_kwargs["user_id"] == 1
+        assert create_kwargs["stool_consistency"] == 2
+        assert create_kwargs["movement_time"] == STARTED_AT
+        reaper.bot.edit_message_text.assert_called_once()
+        assert reaper.bot.edit_message_text.call_args.kwargs["message_id"] == 10
+        assert reaper.bot.edit_message_text.call_args.kwargs["chat_id"] == 20
+
+    @pytest.mark.asyncio
+    async def test_skips_draft_resumed_by_user(self, reaper, mock_storage, mock_bowel_movement_service):
+        # Arrange
+        mock_storage.idle_keys.return_value = [storage_key(1)]
+        mock_storage.pop_idle_record.return_value = None
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 0
+        mock_bowel_movement_service.create_bowel_movement.assert_not_called()
+        reaper.bot.edit_message_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_drops_draft_waiting_for_delete_confirmation(
+            self, reaper, mock_storage, mock_bowel_movement_service
+    ):
+        # Arrange
+        mock_storage.idle_keys.return_value = [storage_key(1)]
+        mock_storage.pop_idle_record.return_value = draft_record(BowelMovementStates.delete_confirmation)
+
+        # Act
+        await reaper.reap()
+
+        # Assert
+        mock_bowel_movement_service.create_bowel_movement.assert_not_called()
+        assert reaper.bot.edit_message_text.call_args.kwargs["reply_markup"] is None
+
+    @pytest.mark.asyncio
+    async def test_removes_keyboard_of_flow_without_draft(self, reaper, mock_storage, mock_bowel_movement_service):
+        # Arrange
+        mock_storage.idle_keys.return_value = [storage_key(1)]
+        mock_storage.pop_idle_record.return_value = FSMRecord(
+            state=BowelMovementStates.mucus.state,
+            data={"bowel_movement_id": 5, "bowel_movement_msg_id": 10, "chat_id": 20},
+        )
+
+        # Act
+        await reaper.reap()
+
+        # Assert
+        mock_bowel_movement_service.create_bowel_movement.assert_not_called()
+        reaper.bot.edit_message_reply_markup.assert_called_once_with(chat_id=20, message_id=10, reply_markup=None)
+
+    @pytest.mark.asyncio
+    async def test_processes_batches_until_exhausted(self, reaper, mock_storage):
+        # Arrange
+        mock_storage.idle_keys.side_effect = [[storage_key(1), storage_key(2)], [storage_key(3)]]
+        mock_storage.pop_idle_record.side_effect = lambda key, states, older_than: draft_record()
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 3
+        assert mock_storage.idle_keys.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, reaper, mock_storage):
+        # Arrange
+        active = 0
+        max_active = 0
+
+        async def pop_idle_record(key, states, older_than):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0)
+            active -= 1
+            return draft_record()
+
+        reaper.batch_size = 10
+        mock_storage.idle_keys.return_value = [storage_key(user_id) for user_id in range(1, 7)]
+        mock_storage.pop_idle_record.side_effect = pop_idle_record
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 6
+        assert max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_still_counts_draft(self, reaper, mock_storage):
+        # Arrange
+        mock_storage.idle_keys.return_value = [storage_key(1)]
+        mock_storage.pop_idle_record.return_value = draft_record()
+        reaper.bot.edit_message_text.side_effect = TelegramBadRequest(method=Mock(), message="message to edit not found")
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_draft_stops_the_run(self, reaper, mock_storage, mock_bowel_movement_service):
+        # Arrange
+        mock_storage.idle_keys.return_value = [storage_key(1), storage_key(2)]
+        mock_storage.pop_idle_record.side_effect = lambda key, states, older_than: draft_record()
+        saved = mock_bowel_movement_service.create_bowel_movement.return_value
+        mock_bowel_movement_service.create_bowel_movement.side_effect = [RuntimeError, saved]
+
+        # Act
+        reaped = await reaper.reap()
+
+        # Assert
+        assert reaped == 1
+        assert mock_storage.idle_keys.call_count == 1
+
+
+class TestRunDraftReaper:
+    """Test cases for run_draft_reaper"""
+
+    @pytest.mark.asyncio
+    async def test_reaper_survives_errors(self):
+        reaper = Mock(spec=DraftReaper)
+        reaper.reap = AsyncMock(side_effect=[RuntimeError, 0])
+        sleep = AsyncMock(side_effect=[None, asyncio.CancelledError])
+
+        with patch("bot.tasks.draft_reaper.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await run_draft_reaper(reaper, interval=60)
+
+        assert reaper.reap.call_count == 2
@@ -0,0 +1,40 @@
+"""Unit tests for the FSM sweeper task"""
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from bot.tasks.fsm_sweeper import run_fsm_sweeper
+from database.fsm_storage import PostgresStorage
+
+
+@pytest.fixture
+def mock_storage():
+    """Fixture for a mocked PostgresStorage."""
+    storage = Mock(spec=PostgresStorage)
+    storage.delete_expired = AsyncMock(return_value=3)
+    return storage
+
+
+class TestFSMSweeper:
+    """Test cases for run_fsm_sweeper"""
+
+    @pytest.mark.asyncio
+    async def test_sweeper_removes_expired_records(self, mock_storage):
+        with patch("bot.tasks.fsm_sweeper.asyncio.sleep", AsyncMock(side_effect=asyncio.CancelledError)):
+            with pytest.raises(asyncio.CancelledError):
+                await run_fsm_sweeper(mock_storage, ttl=timedelta(hours=1), interval=60, batch_size=10)
+
+        mock_storage.delete_expired.assert_called_once_with(older_than=timedelta(hours=1), batch_size=10)
+
+    @pytest.mark.asyncio
+    async def test_sweeper_survives_errors(self, mock_storage):
+        mock_storage.delete_expired.side_effect = [RuntimeError, 0]
+        sleep = AsyncMock(side_effect=[None, asyncio.CancelledError])
+
+        with patch("bot.tasks.fsm_sweeper.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await run_fsm_sweeper(mock_storage, ttl=timedelta(hours=1), interval=60)
+
+        assert mock_storage.delete_expired.call_count == 2
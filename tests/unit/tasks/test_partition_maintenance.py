@@ -0,0 +1,39 @@
+"""Unit tests for the partition maintenance task"""
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from bot.tasks.partition_maintenance import run_partition_maintenance
+
+
+class TestPartitionMaintenance:
+    """Test cases for run_partition_maintenance"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("retain_months, detaches", [(0, False), (24, True)])
+    async def test_maintenance_run(self, retain_months, detaches):
+        engine = Mock()
+        create = AsyncMock()
+        detach = AsyncMock(return_value=["bowel_movements_y2023m01"])
+
+        with patch("bot.tasks.partition_maintenance.create_future_partitions", create), \
+                patch("bot.tasks.partition_maintenance.detach_old_partitions", detach), \
+                patch("bot.tasks.partition_maintenance.asyncio.sleep", AsyncMock(side_effect=asyncio.CancelledError)):
+            with pytest.raises(asyncio.CancelledError):
+                await run_partition_maintenance(engine, months_ahead=3, retain_months=retain_months, interval=60)
+
+        create.assert_called_once_with(engine, months_ahead=3)
+        assert detach.called is detaches
+
+    @pytest.mark.asyncio
+    async def test_maintenance_survives_errors(self):
+        create = AsyncMock(side_effect=[RuntimeError, None])
+        sleep = AsyncMock(side_effect=[None, asyncio.CancelledError])
+
+        with patch("bot.tasks.partition_maintenance.create_future_partitions", create), \
+                patch("bot.tasks.partition_maintenance.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await run_partition_maintenance(Mock(), months_ahead=3, retain_months=0, interval=60)
+
+        assert create.call_count == 2